@@ -0,0 +1,52 @@
+"""Move verification and reset tokens to a hashed one-time token table
+
+Revision ID: 3f1c9a2b7d40
+Revises: 12345abcdef
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a2b7d40'
+down_revision = '12345abcdef'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create one_time_tokens table (tokens are stored as SHA-256 digests)
+    op.create_table(
+        'one_time_tokens',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('purpose', sa.String(32), nullable=False),
+        sa.Column('token_hash', sa.String(64), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), default=sa.func.now()),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    
+    # Create indexes
+    op.create_index('ix_one_time_tokens_token_hash', 'one_time_tokens', ['token_hash'], unique=True)
+    op.create_index('ix_one_time_tokens_user_id', 'one_time_tokens', ['user_id'])
+    op.create_index('ix_one_time_tokens_expires_at', 'one_time_tokens', ['expires_at'])
+    
+    # Drop plaintext token columns; outstanding tokens are invalidated
+    op.drop_column('users', 'verification_token')
+    op.drop_column('users', 'verification_token_expires')
+    op.drop_column('users', 'reset_password_token')
+    op.drop_column('users', 'reset_token_expires')
+
+
+def downgrade() -> None:
+    # Restore plaintext token columns
+    op.add_column('users', sa.Column('verification_token', sa.String(255), nullable=True))
+    op.add_column('users', sa.Column('verification_token_expires', sa.DateTime(), nullable=True))
+    op.add_column('users', sa.Column('reset_password_token', sa.String(255), nullable=True))
+    op.add_column('users', sa.Column('reset_token_expires', sa.DateTime(), nullable=True))
+    
+    # Drop tables
+    op.drop_table('one_time_tokens')
@@ -0,0 +1,23 @@
+"""Index payments by creation time for date-filtered exports
+
+Revision ID: 5d9a3c7e2f18
+Revises: c4e7a1d95b20
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '5d9a3c7e2f18'
+down_revision = 'c4e7a1d95b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_payments_created_at', 'payments', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payments_created_at', table_name='payments')
@@ -0,0 +1,89 @@
+"""Partition system_logs by day
+
+Revision ID: 7e1b4f9c3a62
+Revises: 5d9a3c7e2f18
+Create Date: 2026-10-19
+
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '7e1b4f9c3a62'
+down_revision = '5d9a3c7e2f18'
+branch_labels = None
+depends_on = None
+
+# Days partitioned ahead here; the maintenance job keeps extending them
+DAYS_AHEAD = 7
+
+
+def _to_days(day) -> int:
+    """MySQL TO_DAYS() of a date."""
+    return day.toordinal() + 365
+
+
+def _indexes():
+    """Name to columns of the indexes on system_logs."""
+    return {
+        index['name']: index['column_names']
+        for index in sa.inspect(op.get_bind()).get_indexes('system_logs')
+    }
+
+
+def upgrade() -> None:
+    # The composite log search indexes replace the single-column level index,
+    # named ix_system_logs_level by the ORM and idx_level by 01-schema.sql
+    indexes = _indexes()
+    for name, columns in indexes.items():
+        if columns == ['level']:
+            op.drop_index(name, table_name='system_logs')
+    # Databases created from the current 01-schema.sql already have them
+    if 'ix_system_logs_level_created_at' not in indexes:
+        op.create_index('ix_system_logs_level_created_at', 'system_logs', ['level', 'created_at'])
+    if 'ix_system_logs_source_created_at' not in indexes:
+        op.create_index('ix_system_logs_source_created_at', 'system_logs', ['source', 'created_at'])
+
+    if op.get_bind().dialect.name != 'mysql':
+        return
+
+    # Every unique key of a partitioned table must include the partitioning
+    # column, so created_at joins the primary key and becomes NOT NULL
+    op.execute("UPDATE system_logs SET created_at = NOW() WHERE created_at IS NULL")
+    op.execute(
+        "ALTER TABLE system_logs "
+        "MODIFY created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP, "
+        "DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)"
+    )
+
+    # Existing rows go to one partition that retention drops as a whole
+    today = datetime.utcnow().date()
+    partitions = [f"PARTITION p_old VALUES LESS THAN ({_to_days(today)})"]
+    for offset in range(DAYS_AHEAD + 1):
+        day = today + timedelta(days=offset)
+        partitions.append(
+            f"PARTITION p{day.strftime('%Y%m%d')} VALUES LESS THAN ({_to_days(day + timedelta(days=1))})"
+        )
+    partitions.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+    op.execute(
+        "ALTER TABLE system_logs PARTITION BY RANGE (TO_DAYS(created_at)) "
+        f"({', '.join(partitions)})"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'mysql':
+        op.execute("ALTER TABLE system_logs REMOVE PARTITIONING")
+        op.execute(
+            "ALTER TABLE system_logs "
+            "DROP PRIMARY KEY, ADD PRIMARY KEY (id), "
+            "MODIFY created_at DATETIME NULL DEFAULT NULL"
+        )
+
+    indexes = _indexes()
+    op.drop_index('ix_system_logs_source_created_at', table_name='system_logs')
+    op.drop_index('ix_system_logs_level_created_at', table_name='system_logs')
+    if ['level'] not in indexes.values():
+        op.create_index('ix_system_logs_level', 'system_logs', ['level'])
@@ -0,0 +1,47 @@
+"""Add hourly tool usage rollups and aggregation watermarks
+
+Revision ID: 8b2d4e6f1a93
+Revises: 3f1c9a2b7d40
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '8b2d4e6f1a93'
+down_revision = '3f1c9a2b7d40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create tool_usage_hourly table (filled by the usage aggregator)
+    op.create_table(
+        'tool_usage_hourly',
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('tool_id', sa.Integer(), nullable=False),
+        sa.Column('plan_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('usage_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['tool_id'], ['tools.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('bucket_start', 'tool_id', 'plan_id')
+    )
+    
+    # Create aggregation_watermarks table
+    op.create_table(
+        'aggregation_watermarks',
+        sa.Column('name', sa.String(50), nullable=False),
+        sa.Column('last_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('processed_until', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), default=sa.func.now(), onupdate=sa.func.now()),
+        sa.PrimaryKeyConstraint('name')
+    )
+    
+    # The aggregator scans tool_usage by id and filters on started_at
+    op.create_index('ix_tool_usage_started_at', 'tool_usage', ['started_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tool_usage_started_at', table_name='tool_usage')
+    op.drop_table('aggregation_watermarks')
+    op.drop_table('tool_usage_hourly')
@@ -0,0 +1,38 @@
+"""Add indexes for admin user search
+
+Revision ID: c4e7a1d95b20
+Revises: 8b2d4e6f1a93
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c4e7a1d95b20'
+down_revision = '8b2d4e6f1a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Filters that keep the id order for keyset pagination
+    op.create_index('ix_users_is_active_id', 'users', ['is_active', 'id'])
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'])
+    
+    # Full-name search (MATCH ... AGAINST)
+    op.create_index('ix_users_full_name_fulltext', 'users', ['full_name'], mysql_prefix='FULLTEXT')
+    
+    # Role and plan filters
+    op.create_index('ix_user_roles_role_id_user_id', 'user_roles', ['role_id', 'user_id'])
+    op.create_index(
+        'ix_subscriptions_plan_id_status_user_id', 'subscriptions', ['plan_id', 'status', 'user_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_subscriptions_plan_id_status_user_id', table_name='subscriptions')
+    op.drop_index('ix_user_roles_role_id_user_id', table_name='user_roles')
+    op.drop_index('ix_users_full_name_fulltext', table_name='users')
+    op.drop_index('ix_users_created_at_id', table_name='users')
+    op.drop_index('ix_users_is_active_id', table_name='users')
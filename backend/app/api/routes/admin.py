@@ -1,13 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import Any, List
-from datetime import datetime, timedelta
-
-from app.core.security import get_current_admin_user, get_password_hash
-from app.db.session import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import func, desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import Any, Dict, List, Literal, Optional
+from datetime import date, datetime, timedelta
+import os
+import redis
+
+from app.core.active_users import count_active
+from app.core.admin_stats import admin_stats
+from app.core.leaderboards import read_leaderboard
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.config import settings
+from app.core.exports import (
+    FORMATS, check_format, create_job, export_filename, export_stream, get_job, job_path,
+)
+from app.core.security import get_current_admin_user, get_password_hash, get_hash_pool_stats
+from app.core.token_cache import token_cache
+from app.core.rate_limit import rate_limiter
+from app.core.usage_analytics import BUCKETS, to_naive_utc, usage_series
+from app.core.user_admin import apply_bulk_action, resolve_bulk_targets, user_filter_conditions
+from app.db.redis import get_redis_pool_stats, redis_breaker
+from app.db.log_handler import db_log_handler
+from app.db.replicas import replica_set
+from app.db.queries import USER_LOAD_OPTIONS
+from app.db.session import get_db, get_read_db, get_db_pool_stats
+from app.db.slow_query import slow_query_recorder, SOURCE as SLOW_QUERY_SOURCE
 from app.models.models import User, Role, Tool, ToolUsage, SystemLog
-from app.schemas.user import User as UserSchema
+from app.schemas.user import User as UserSchema, UserFilter, BulkUserAction
 from app.schemas.tool import Tool as ToolSchema
 
 router = APIRouter()
@@ -15,31 +36,41 @@ router = APIRouter()
 @router.get("/stats", response_model=dict)
 async def read_admin_stats(
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> Any:
     """
     Get admin dashboard statistics.
     """
+    snapshot = await admin_stats.read()
+    if snapshot is not None:
+        return snapshot
+    
+    # No snapshot yet (or Redis is down): count from the database
     # Count total users
-    total_users = db.query(User).count()
+    total_users = await db.scalar(select(func.count(User.id)))
     
     # Count active users (users who have used a tool in the last 30 days)
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    active_users = db.query(User.id).join(ToolUsage).filter(
-        ToolUsage.started_at >= thirty_days_ago
-    ).distinct().count()
+    active_since = datetime.utcnow() - timedelta(days=settings.ADMIN_STATS_ACTIVE_DAYS)
+    active_users = await db.scalar(
+        select(func.count(func.distinct(ToolUsage.user_id))).where(
+            ToolUsage.started_at >= active_since
+        )
+    )
     
     # Count total tools
-    total_tools = db.query(Tool).count()
+    total_tools = await db.scalar(select(func.count(Tool.id)))
     
     # Count total tool usages
-    total_usage = db.query(ToolUsage).count()
+    total_usage = await db.scalar(select(func.count(ToolUsage.id)))
     
+    now = datetime.utcnow()
     return {
         "totalUsers": total_users,
         "activeUsers": active_users,
         "totalTools": total_tools,
         "totalUsage": total_usage,
+        "updatedAt": now,
+        "reconciledAt": now,
     }
 
 @router.get("/users", response_model=List[UserSchema])
@@ -47,42 +78,142 @@ async def read_users(
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Retrieve users.
     """
-    users = db.query(User).offset(skip).limit(limit).all()
+    result = await db.execute(
+        select(User).options(selectinload(User.roles)).offset(skip).limit(limit)
+    )
+    users = result.scalars().all()
     return users
 
+def user_search_item(user: User) -> dict:
+    subscription = user.get_active_subscription()
+    return {
+        "id": user.id,
+        "email": user.email,
+        "full_name": user.full_name,
+        "is_active": user.is_active,
+        "is_verified": user.is_verified,
+        "created_at": user.created_at,
+        "roles": [role.name for role in user.roles],
+        "plan": subscription.plan.name if subscription else None,
+    }
+
+@router.get("/users/search", response_model=dict)
+async def search_users(
+    email: Optional[str] = Query(None, min_length=1, max_length=255, description="Email prefix"),
+    name: Optional[str] = Query(None, min_length=1, max_length=255, description="Words of the full name"),
+    is_active: Optional[bool] = None,
+    is_verified: Optional[bool] = None,
+    role: Optional[str] = None,
+    plan_id: Optional[int] = Query(None, description="Users with an active subscription to this plan"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_read_db),
+) -> Any:
+    """
+    Search users with keyset pagination.
+    Results are ordered by email when searching by email prefix, newest first
+    otherwise; pass next_cursor back as cursor for the following page.
+    """
+    user_filter = UserFilter(
+        email=email,
+        name=name,
+        is_active=is_active,
+        is_verified=is_verified,
+        role=role,
+        plan_id=plan_id,
+        created_from=created_from,
+        created_to=created_to,
+    )
+    query = select(User).options(*USER_LOAD_OPTIONS).where(*user_filter_conditions(user_filter))
+    
+    if email:
+        if cursor:
+            (after_email,) = decode_cursor(cursor, 1)
+            query = query.where(User.email > after_email)
+        query = query.order_by(User.email)
+    else:
+        if cursor:
+            (before_id,) = decode_cursor(cursor, 1)
+            query = query.where(User.id < before_id)
+        query = query.order_by(User.id.desc())
+    
+    # One extra row tells whether there is a next page
+    result = await db.execute(query.limit(limit + 1))
+    users = result.scalars().all()
+    has_more = len(users) > limit
+    users = users[:limit]
+    
+    next_cursor = None
+    if has_more:
+        last = users[-1]
+        next_cursor = encode_cursor([last.email if email else last.id])
+    
+    return {
+        "items": [user_search_item(user) for user in users],
+        "next_cursor": next_cursor,
+    }
+
+@router.post("/users/bulk", response_model=dict)
+async def bulk_update_users(
+    operation: BulkUserAction,
+    current_user: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db),
+) -> Any:
+    """
+    Activate, deactivate, add a role to or remove a role from many users,
+    given as ids or as a search filter. The rules of the single-user
+    endpoints apply per user.
+    """
+    ids = await resolve_bulk_targets(db, operation.user_ids, operation.filter)
+    results = await apply_bulk_action(db, operation.action, operation.role, ids, current_user.id)
+    
+    summary: Dict[str, int] = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    return {"action": operation.action, "summary": summary, "results": results}
+
 @router.post("/users/{user_id}/activate", response_model=UserSchema)
 async def activate_user(
     user_id: int,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Activate a user.
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    result = await db.execute(
+        select(User).options(selectinload(User.roles)).where(User.id == user_id)
+    )
+    user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     user.is_active = True
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 @router.post("/users/{user_id}/deactivate", response_model=UserSchema)
 async def deactivate_user(
     user_id: int,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Deactivate a user.
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    result = await db.execute(
+        select(User).options(selectinload(User.roles)).where(User.id == user_id)
+    )
+    user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -94,20 +225,23 @@ async def deactivate_user(
         raise HTTPException(status_code=400, detail="Cannot deactivate another admin")
     
     user.is_active = False
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 @router.post("/users/{user_id}/make-admin", response_model=UserSchema)
 async def make_user_admin(
     user_id: int,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Make a user an admin.
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    result = await db.execute(
+        select(User).options(selectinload(User.roles)).where(User.id == user_id)
+    )
+    user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -116,25 +250,29 @@ async def make_user_admin(
         raise HTTPException(status_code=400, detail="User is already an admin")
     
     # Get admin role
-    admin_role = db.query(Role).filter(Role.name == "admin").first()
+    result = await db.execute(select(Role).where(Role.name == "admin"))
+    admin_role = result.scalar_one_or_none()
     if not admin_role:
         raise HTTPException(status_code=500, detail="Admin role not found")
     
     user.roles.append(admin_role)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 @router.post("/users/{user_id}/remove-admin", response_model=UserSchema)
 async def remove_user_admin(
     user_id: int,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Remove admin role from a user.
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    result = await db.execute(
+        select(User).options(selectinload(User.roles)).where(User.id == user_id)
+    )
+    user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -143,14 +281,15 @@ async def remove_user_admin(
         raise HTTPException(status_code=400, detail="Cannot remove admin role from yourself")
     
     # Get admin role
-    admin_role = db.query(Role).filter(Role.name == "admin").first()
+    result = await db.execute(select(Role).where(Role.name == "admin"))
+    admin_role = result.scalar_one_or_none()
     if not admin_role:
         raise HTTPException(status_code=500, detail="Admin role not found")
     
     if admin_role in user.roles:
         user.roles.remove(admin_role)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
     else:
         raise HTTPException(status_code=400, detail="User is not an admin")
     
@@ -161,12 +300,13 @@ async def read_admin_tools(
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Retrieve all tools including inactive ones.
     """
-    tools = db.query(Tool).offset(skip).limit(limit).all()
+    result = await db.execute(select(Tool).offset(skip).limit(limit))
+    tools = result.scalars().all()
     return tools
 
 @router.post("/tools", response_model=ToolSchema)
@@ -176,7 +316,7 @@ async def create_tool(
     icon: str = Body(...),
     is_active: bool = Body(True),
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Create a new tool.
@@ -189,8 +329,8 @@ async def create_tool(
     )
     
     db.add(tool)
-    db.commit()
-    db.refresh(tool)
+    await db.commit()
+    await db.refresh(tool)
     
     return tool
 
@@ -202,12 +342,12 @@ async def update_tool(
     icon: str = Body(None),
     is_active: bool = Body(None),
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Update a tool.
     """
-    tool = db.query(Tool).filter(Tool.id == tool_id).first()
+    tool = await db.get(Tool, tool_id)
     if not tool:
         raise HTTPException(status_code=404, detail="Tool not found")
     
@@ -220,21 +360,50 @@ async def update_tool(
     if is_active is not None:
         tool.is_active = is_active
     
-    db.commit()
-    db.refresh(tool)
+    await db.commit()
+    await db.refresh(tool)
     
     return tool
 
+async def _leaderboard_names(db: AsyncSession, model, name_column, entries) -> List[dict]:
+    """Resolve the ids of a leaderboard to names in one query."""
+    ids = [member for member, _ in entries]
+    result = await db.execute(select(model.id, name_column).where(model.id.in_(ids)))
+    names = dict(result.all())
+    return [
+        {"name": names[member], "usage": usage}
+        for member, usage in entries
+        if member in names
+    ]
+
+def _month_range(month: str):
+    """Return the first instant of a YYYY-MM month and of the month after it."""
+    try:
+        start = datetime.strptime(month, "%Y-%m")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid month {month}, expected YYYY-MM")
+    return start, (start + timedelta(days=32)).replace(day=1)
+
 @router.get("/tools/usage", response_model=List[dict])
 async def read_tool_usage_stats(
+    month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="YYYY-MM, all time if omitted"),
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> Any:
     """
     Get tool usage statistics.
     """
-    # Count usage for each tool
-    tool_usage_stats = db.query(
+    month_bounds = _month_range(month) if month else None
+    try:
+        entries = await read_leaderboard("tools", month, None)
+    except redis.RedisError:
+        entries = None
+    if entries is not None:
+        return await _leaderboard_names(db, Tool, Tool.name, entries)
+    
+    # No board for this month, leaderboards not built yet or Redis is down:
+    # count from the database
+    query = select(
         Tool.name.label("name"),
         func.count(ToolUsage.id).label("usage")
     ).join(
@@ -243,20 +412,89 @@ async def read_tool_usage_stats(
         Tool.name
     ).order_by(
         desc("usage")
-    ).all()
+    )
+    if month_bounds:
+        month_start, next_month = month_bounds
+        query = query.where(ToolUsage.started_at >= month_start, ToolUsage.started_at < next_month)
+    result = await db.execute(query)
+    tool_usage_stats = result.all()
     
     return [{"name": stat.name, "usage": stat.usage} for stat in tool_usage_stats]
 
+@router.get("/analytics/usage", response_model=dict)
+async def read_usage_analytics(
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    bucket: Literal["hour", "day", "week"] = "day",
+    tool_id: Optional[int] = None,
+    plan_id: Optional[int] = Query(None, description="0 for users without a subscription"),
+    current_user: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_read_db),
+) -> Any:
+    """
+    Get tool usage counts per time bucket from the hourly rollups.
+    Defaults to the last 30 days.
+    """
+    end = to_naive_utc(to) if to else datetime.utcnow()
+    start = to_naive_utc(from_) if from_ else end - timedelta(days=30)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    if (end - start) / BUCKETS[bucket] > settings.USAGE_ANALYTICS_MAX_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range too large for {bucket} buckets; use a larger bucket or a shorter range",
+        )
+    
+    return await usage_series(db, start, end, bucket, tool_id=tool_id, plan_id=plan_id)
+
+@router.get("/analytics/active-users", response_model=dict)
+async def read_active_users(
+    from_: Optional[date] = Query(None, alias="from"),
+    to: Optional[date] = None,
+    current_user: User = Depends(get_current_admin_user),
+) -> Any:
+    """
+    Estimate distinct active users between two UTC days, both included.
+    Defaults to the last 30 days.
+    """
+    end = to or datetime.utcnow().date()
+    start = from_ or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if (end - start).days >= settings.ACTIVE_USERS_RETENTION_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Active users are kept for {settings.ACTIVE_USERS_RETENTION_DAYS} days",
+        )
+    
+    try:
+        active_users = await count_active(start, end)
+    except redis.RedisError:
+        raise HTTPException(status_code=503, detail="Active user counts are temporarily unavailable")
+    return {"from": start, "to": end, "activeUsers": active_users}
+
 @router.get("/users/activity", response_model=List[dict])
 async def read_user_activity_stats(
+    month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="YYYY-MM, all time if omitted"),
+    limit: int = Query(10, ge=1, le=100),
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> Any:
     """
     Get user activity statistics.
     """
-    # Get the top 10 most active users
-    user_activity = db.query(
+    # Get the top most active users
+    month_bounds = _month_range(month) if month else None
+    try:
+        entries = await read_leaderboard("users", month, limit)
+    except redis.RedisError:
+        entries = None
+    if entries is not None:
+        return await _leaderboard_names(db, User, User.email, entries)
+    
+    # No board for this month, leaderboards not built yet or Redis is down:
+    # count from the database
+    query = select(
         User.email.label("name"),
         func.count(ToolUsage.id).label("usage")
     ).join(
@@ -265,28 +503,263 @@ async def read_user_activity_stats(
         User.email
     ).order_by(
         desc("usage")
-    ).limit(10).all()
+    ).limit(limit)
+    if month_bounds:
+        month_start, next_month = month_bounds
+        query = query.where(ToolUsage.started_at >= month_start, ToolUsage.started_at < next_month)
+    result = await db.execute(query)
+    user_activity = result.all()
     
     return [{"name": stat.name, "usage": stat.usage} for stat in user_activity]
 
+def _export_options(fmt: str, compress: bool, from_: Optional[datetime], to: Optional[datetime]):
+    problem = check_format(fmt, compress)
+    if problem:
+        raise HTTPException(status_code=400, detail=problem)
+    start = to_naive_utc(from_) if from_ else None
+    end = to_naive_utc(to) if to else None
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    return start, end
+
+@router.get("/exports/{dataset}")
+async def export_dataset(
+    dataset: Literal["users", "tool_usage", "payments"],
+    format: Literal["csv", "ndjson", "parquet"] = "csv",
+    gzip: bool = False,
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    current_user: User = Depends(get_current_admin_user),
+) -> Any:
+    """
+    Stream an export of users, tool usages or payments, optionally gzipped.
+    The date filters apply to creation (start for tool usages) time.
+    """
+    start, end = _export_options(format, gzip, from_, to)
+    filename = export_filename(dataset, format, gzip)
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    media_type = "application/gzip" if gzip else FORMATS[format][0]
+    return StreamingResponse(
+        export_stream(dataset, format, gzip, start, end), media_type=media_type, headers=headers
+    )
+
+@router.post("/exports/{dataset}/jobs", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
+async def create_export_job(
+    dataset: Literal["users", "tool_usage", "payments"],
+    format: Literal["csv", "ndjson", "parquet"] = "csv",
+    gzip: bool = False,
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    current_user: User = Depends(get_current_admin_user),
+) -> Any:
+    """
+    Start a background export to a file, for exports too large to stream.
+    Poll the job until it is completed, then fetch its download_url.
+    """
+    start, end = _export_options(format, gzip, from_, to)
+    try:
+        job = await create_job(dataset, format, gzip, start, end, current_user.id)
+    except redis.RedisError:
+        raise HTTPException(status_code=503, detail="Export jobs are temporarily unavailable")
+    return _export_job_item(job)
+
+def _export_job_item(job: dict) -> dict:
+    return {
+        "id": job["id"],
+        "dataset": job["dataset"],
+        "format": job["format"],
+        "gzip": job["gzip"] == "1",
+        "status": job["status"],
+        "error": job.get("error") or None,
+        "size_bytes": int(job["size_bytes"]) if job.get("size_bytes") else None,
+        "created_at": datetime.utcfromtimestamp(float(job["created_at"])),
+        "download_url": f"/admin/exports/jobs/{job['id']}/download" if job["status"] == "completed" else None,
+    }
+
+async def _get_export_job(job_id: str) -> dict:
+    try:
+        job = await get_job(job_id)
+    except redis.RedisError:
+        raise HTTPException(status_code=503, detail="Export jobs are temporarily unavailable")
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+@router.get("/exports/jobs/{job_id}", response_model=dict)
+async def read_export_job(
+    job_id: str,
+    current_user: User = Depends(get_current_admin_user),
+) -> Any:
+    """
+    Get the status of an export job.
+    """
+    return _export_job_item(await _get_export_job(job_id))
+
+@router.get("/exports/jobs/{job_id}/download")
+async def download_export(
+    job_id: str,
+    current_user: User = Depends(get_current_admin_user),
+) -> Any:
+    """
+    Download the file of a completed export job.
+    """
+    job = await _get_export_job(job_id)
+    path = job_path(job)
+    if job["status"] != "completed" or not os.path.exists(path):
+        raise HTTPException(status_code=409, detail=f"Export is {job['status']}, not ready for download")
+    return FileResponse(path, filename=job["filename"].split("-", 1)[1])
+
 @router.get("/logs", response_model=List[dict])
 async def read_system_logs(
     skip: int = 0,
     limit: int = 100,
     level: str = None,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> Any:
     """
     Retrieve system logs.
     """
-    query = db.query(SystemLog)
+    query = select(SystemLog)
     
     if level:
-        query = query.filter(SystemLog.level == level)
+        query = query.where(SystemLog.level == level)
     
-    logs = query.order_by(SystemLog.created_at.desc()).offset(skip).limit(limit).all()
+    result = await db.execute(query.order_by(SystemLog.created_at.desc()).offset(skip).limit(limit))
+    logs = result.scalars().all()
     
     return [{"id": log.id, "level": log.level, "message": log.message, 
              "source": log.source, "created_at": log.created_at,
-             "additional_data": log.additional_data} for log in logs]
\ No newline at end of file
+             "additional_data": log.additional_data} for log in logs]
+
+@router.get("/logs/search", response_model=dict)
+async def search_system_logs(
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    level: Optional[str] = None,
+    source: Optional[str] = None,
+    q: Optional[str] = Query(None, min_length=1, max_length=200, description="Text in the message"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_read_db),
+) -> Any:
+    """
+    Search system logs in a time range, newest first, with keyset pagination.
+    Defaults to the last 24 hours; pass next_cursor back as cursor for the
+    following page.
+    """
+    end = to_naive_utc(to) if to else datetime.utcnow()
+    start = to_naive_utc(from_) if from_ else end - timedelta(days=1)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    if end - start > timedelta(days=settings.SYSTEM_LOG_SEARCH_MAX_DAYS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range too large; search at most {settings.SYSTEM_LOG_SEARCH_MAX_DAYS} days at a time",
+        )
+    
+    # The created_at bounds let MySQL prune the query to the partitions of those days
+    query = select(SystemLog).where(SystemLog.created_at >= start, SystemLog.created_at < end)
+    if level:
+        query = query.where(SystemLog.level == level.upper())
+    if source:
+        query = query.where(SystemLog.source == source)
+    if q:
+        # Partitioned tables cannot have FULLTEXT indexes, so this is a
+        # substring scan limited to the pruned partitions
+        escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        query = query.where(SystemLog.message.like(f"%{escaped}%", escape="\\"))
+    if cursor:
+        before_created_at, before_id = decode_cursor(cursor, 2)
+        try:
+            before_created_at = datetime.fromisoformat(before_created_at)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(
+            (SystemLog.created_at < before_created_at)
+            | ((SystemLog.created_at == before_created_at) & (SystemLog.id < before_id))
+        )
+    
+    # One extra row tells whether there is a next page
+    result = await db.execute(
+        query.order_by(SystemLog.created_at.desc(), SystemLog.id.desc()).limit(limit + 1)
+    )
+    logs = result.scalars().all()
+    has_more = len(logs) > limit
+    logs = logs[:limit]
+    
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor([logs[-1].created_at.isoformat(), logs[-1].id])
+    
+    return {
+        "items": [{"id": log.id, "level": log.level, "message": log.message,
+                   "source": log.source, "created_at": log.created_at,
+                   "additional_data": log.additional_data} for log in logs],
+        "next_cursor": next_cursor,
+    }
+
+@router.get("/slow-queries", response_model=List[dict])
+async def read_slow_queries(
+    hours: int = Query(24, ge=1, le=24 * 30),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_read_db),
+) -> Any:
+    """
+    Get the query shapes that spent the most time in slow queries.
+    """
+    since = datetime.utcnow() - timedelta(hours=hours)
+    duration = SystemLog.additional_data["duration_ms"].as_float()
+    # Each row stands for 1 / sample_rate slow executions
+    weight = 1.0 / SystemLog.additional_data["sample_rate"].as_float()
+    estimated_time = func.sum(duration * weight)
+
+    result = await db.execute(
+        select(
+            SystemLog.message,
+            func.count(SystemLog.id).label("samples"),
+            func.sum(weight).label("estimated_count"),
+            estimated_time.label("estimated_total_ms"),
+            func.avg(duration).label("avg_ms"),
+            func.max(duration).label("max_ms"),
+            func.max(SystemLog.created_at).label("last_seen"),
+        )
+        .where(SystemLog.source == SLOW_QUERY_SOURCE, SystemLog.created_at >= since)
+        .group_by(SystemLog.message)
+        .order_by(desc(estimated_time))
+        .limit(limit)
+    )
+
+    return [
+        {
+            "shape": row.message,
+            "samples": row.samples,
+            "estimated_count": round(row.estimated_count or 0),
+            "estimated_total_ms": round(row.estimated_total_ms or 0, 1),
+            "avg_ms": round(row.avg_ms or 0, 1),
+            "max_ms": row.max_ms,
+            "last_seen": row.last_seen,
+        }
+        for row in result
+    ]
+
+@router.get("/metrics", response_model=dict)
+async def read_metrics(
+    current_user: User = Depends(get_current_admin_user),
+) -> Any:
+    """
+    Get runtime metrics for this worker.
+    """
+    return {
+        "jwt_cache": token_cache.stats(),
+        "password_hash_pool": get_hash_pool_stats(),
+        "redis_pool": get_redis_pool_stats(),
+        "redis_breaker": redis_breaker.stats(),
+        "db_pool": get_db_pool_stats(),
+        "db_replicas": replica_set.stats(),
+        "slow_queries": slow_query_recorder.stats(),
+        "db_log_handler": db_log_handler.stats(),
+        "rate_limiter": rate_limiter.stats(),
+    }
@@ -1,19 +1,28 @@
 from fastapi import APIRouter, Body, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from typing import Any
 
 from app.core.security import (
     create_access_token,
     create_refresh_token,
-    verify_password,
-    get_password_hash,
+    verify_and_update_password_async,
+    get_password_hash_async,
     generate_verification_token,
     generate_password_reset_token,
+    store_one_time_token,
+    consume_one_time_token,
     get_current_user,
 )
 from app.core.config import settings
+from app.core.login_throttle import (
+    get_lockout_remaining,
+    record_failed_login,
+    reset_failed_logins,
+)
+from app.db.queries import USER_BY_ID, USER_LOAD_OPTIONS
 from app.db.session import get_db
 from app.models.models import User, RefreshToken, Role
 from app.schemas.auth import (
@@ -37,14 +46,33 @@ async def login_options():
 
 @router.post("login", response_model=Token)
 async def login_access_token(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests.
     """
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if user is None or not verify_password(form_data.password, user.hashed_password):
+    client_ip = request.client.host if request.client else "unknown"
+    
+    # Reject locked out accounts and IPs before doing any hashing work
+    retry_after = await get_lockout_remaining(form_data.username, client_ip)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts, please try again later",
+            headers={"Retry-After": str(retry_after)},
+        )
+    
+    result = await db.execute(
+        select(User).options(*USER_LOAD_OPTIONS).where(User.email == form_data.username)
+    )
+    user = result.scalar_one_or_none()
+    is_valid, new_hash = (False, None)
+    if user is not None:
+        is_valid, new_hash = await verify_and_update_password_async(form_data.password, user.hashed_password)
+    if not is_valid:
+        await record_failed_login(form_data.username, client_ip)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -53,19 +81,27 @@ async def login_access_token(
     if not user.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
     
-    # Get user roles
+    await reset_failed_logins(form_data.username)
+    
+    # Transparently upgrade hashes made with an outdated scheme or cost;
+    # saved by the commit in create_refresh_token below
+    if new_hash:
+        user.hashed_password = new_hash
+    
+    # Get user roles and plan (the plan sets the user's rate limit tier)
     user_roles = [role.name for role in user.roles]
+    plan = user.get_subscription_plan()
     
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         subject=user.id,
         expires_delta=access_token_expires,
-        additional_data={"roles": user_roles, "email": user.email}
+        additional_data={"roles": user_roles, "email": user.email, "plan": plan.name if plan else None}
     )
     
     # Create refresh token
-    refresh_token = create_refresh_token(user_id=user.id, db=db)
+    refresh_token = await create_refresh_token(user_id=user.id, db=db)
     
     return {
         "access_token": access_token,
@@ -80,16 +116,19 @@ async def refresh_options():
 @router.post("refresh", response_model=Token)
 async def refresh_token(
     token_data: TokenRefresh = Body(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Any:
     """
     Refresh access token.
     """
-    refresh_token = db.query(RefreshToken).filter(
-        RefreshToken.token == token_data.refresh_token,
-        RefreshToken.is_revoked == False,
-        RefreshToken.expires_at > datetime.utcnow()
-    ).first()
+    result = await db.execute(
+        select(RefreshToken).where(
+            RefreshToken.token == token_data.refresh_token,
+            RefreshToken.is_revoked == False,
+            RefreshToken.expires_at > datetime.utcnow()
+        )
+    )
+    refresh_token = result.scalar_one_or_none()
     
     if not refresh_token:
         raise HTTPException(
@@ -97,28 +136,30 @@ async def refresh_token(
             detail="Invalid or expired refresh token",
         )
     
-    user = db.query(User).filter(User.id == refresh_token.user_id).first()
+    result = await db.execute(USER_BY_ID, {"user_id": refresh_token.user_id})
+    user = result.scalar_one_or_none()
     if not user or not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found or inactive",
         )
     
-    # Get user roles
+    # Get user roles and plan (the plan sets the user's rate limit tier)
     user_roles = [role.name for role in user.roles]
+    plan = user.get_subscription_plan()
     
     # Create new access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         subject=user.id,
         expires_delta=access_token_expires,
-        additional_data={"roles": user_roles, "email": user.email}
+        additional_data={"roles": user_roles, "email": user.email, "plan": plan.name if plan else None}
     )
     
     # Create new refresh token and invalidate old one
-    new_refresh_token = create_refresh_token(user_id=user.id, db=db)
+    new_refresh_token = await create_refresh_token(user_id=user.id, db=db)
     refresh_token.is_revoked = True
-    db.commit()
+    await db.commit()
     
     return {
         "access_token": access_token,
@@ -133,14 +174,15 @@ async def register_options():
 @router.post("register", response_model=UserSchema)
 async def register_user(
     user_in: UserCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     request: Request = None,
 ) -> Any:
     """
     Register a new user.
     """
     # Check if user already exists
-    user = db.query(User).filter(User.email == user_in.email).first()
+    result = await db.execute(select(User).where(User.email == user_in.email))
+    user = result.scalar_one_or_none()
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -154,22 +196,23 @@ async def register_user(
     # Create new user
     user = User(
         email=user_in.email,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await get_password_hash_async(user_in.password),
         full_name=user_in.full_name,
         is_active=True,
         is_verified=False,
-        verification_token=verification_token,
-        verification_token_expires=verification_token_expires,
     )
+    await store_one_time_token(db, user, "verify_email", verification_token, verification_token_expires)
     
     # Add user role
-    user_role = db.query(Role).filter(Role.name == "user").first()
+    result = await db.execute(select(Role).where(Role.name == "user"))
+    user_role = result.scalar_one_or_none()
     if user_role:
         user.roles.append(user_role)
     
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    await db.refresh(user, attribute_names=["roles"])
     
     # Send verification email
     base_url = str(request.base_url)
@@ -184,15 +227,12 @@ async def verify_email_options():
 @router.post("verify-email", response_model=UserSchema)
 async def verify_email(
     verify_data: VerifyEmail,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Verify user email using the token sent to their email.
     """
-    user = db.query(User).filter(
-        User.verification_token == verify_data.token,
-        User.verification_token_expires > datetime.utcnow()
-    ).first()
+    user = await consume_one_time_token(db, verify_data.token, "verify_email")
     
     if not user:
         raise HTTPException(
@@ -202,11 +242,9 @@ async def verify_email(
     
     # Update user
     user.is_verified = True
-    user.verification_token = None
-    user.verification_token_expires = None
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     return user
 
@@ -217,13 +255,14 @@ async def password_reset_request_options():
 @router.post("password-reset-request")
 async def request_password_reset(
     reset_request: PasswordResetRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     request: Request = None,
 ) -> Any:
     """
     Request password reset email.
     """
-    user = db.query(User).filter(User.email == reset_request.email).first()
+    result = await db.execute(select(User).where(User.email == reset_request.email))
+    user = result.scalar_one_or_none()
     
     # Always return success to prevent email enumeration
     if not user:
@@ -233,11 +272,10 @@ async def request_password_reset(
     reset_token = generate_password_reset_token()
     reset_token_expires = datetime.utcnow() + timedelta(hours=24)
     
-    # Update user
-    user.reset_password_token = reset_token
-    user.reset_token_expires = reset_token_expires
+    # Store the token hash, replacing any earlier reset request
+    await store_one_time_token(db, user, "reset_password", reset_token, reset_token_expires)
     
-    db.commit()
+    await db.commit()
     
     # Send password reset email
     base_url = str(request.base_url)
@@ -252,15 +290,12 @@ async def reset_password_options():
 @router.post("reset-password")
 async def reset_password(
     reset_data: PasswordReset,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Reset password using token sent to email.
     """
-    user = db.query(User).filter(
-        User.reset_password_token == reset_data.token,
-        User.reset_token_expires > datetime.utcnow()
-    ).first()
+    user = await consume_one_time_token(db, reset_data.token, "reset_password")
     
     if not user:
         raise HTTPException(
@@ -269,15 +304,14 @@ async def reset_password(
         )
     
     # Update user password
-    user.hashed_password = get_password_hash(reset_data.new_password)
-    user.reset_password_token = None
-    user.reset_token_expires = None
+    user.hashed_password = await get_password_hash_async(reset_data.new_password)
     
     # Revoke all refresh tokens
-    for token in user.refresh_tokens:
-        token.is_revoked = True
+    await db.execute(
+        update(RefreshToken).where(RefreshToken.user_id == user.id).values(is_revoked=True)
+    )
     
-    db.commit()
+    await db.commit()
     
     return {"message": "Password has been reset successfully"}
 
@@ -288,19 +322,22 @@ async def logout_options():
 @router.post("logout")
 async def logout(
     token_data: TokenRefresh = Body(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Logout and revoke refresh token.
     """
-    refresh_token = db.query(RefreshToken).filter(
-        RefreshToken.token == token_data.refresh_token,
-        RefreshToken.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(RefreshToken).where(
+            RefreshToken.token == token_data.refresh_token,
+            RefreshToken.user_id == current_user.id
+        )
+    )
+    refresh_token = result.scalar_one_or_none()
     
     if refresh_token:
         refresh_token.is_revoked = True
-        db.commit()
+        await db.commit()
     
     return {"message": "Successfully logged out"}
\ No newline at end of file
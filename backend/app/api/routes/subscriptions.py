@@ -1,5 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Body
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import Any, List, Optional
 from datetime import datetime
 
@@ -30,19 +32,20 @@ router = APIRouter()
 # Public endpoints
 @router.get("/plans", response_model=List[SubscriptionPlanSchema])
 async def get_subscription_plans(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Get all active subscription plans.
     """
-    plans = db.query(SubscriptionPlan).filter(SubscriptionPlan.is_active == True).all()
+    result = await db.execute(select(SubscriptionPlan).where(SubscriptionPlan.is_active == True))
+    plans = result.scalars().all()
     return plans
 
 # User endpoints
 @router.get("/my-subscription", response_model=SubscriptionSchema)
 async def get_my_subscription(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Get current user's active subscription.
@@ -60,16 +63,19 @@ async def create_subscription_checkout(
     checkout_data: CheckoutSessionCreate,
     request: Request,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Create a checkout session for a subscription.
     """
     # Get the subscription plan
-    plan = db.query(SubscriptionPlan).filter(
-        SubscriptionPlan.id == checkout_data.plan_id,
-        SubscriptionPlan.is_active == True
-    ).first()
+    result = await db.execute(
+        select(SubscriptionPlan).where(
+            SubscriptionPlan.id == checkout_data.plan_id,
+            SubscriptionPlan.is_active == True
+        )
+    )
+    plan = result.scalar_one_or_none()
     
     if not plan:
         raise HTTPException(
@@ -81,7 +87,7 @@ async def create_subscription_checkout(
     if not current_user.stripe_customer_id:
         customer = get_stripe_customer(current_user.email, current_user.full_name)
         current_user.stripe_customer_id = customer["id"]
-        db.commit()
+        await db.commit()
     
     # Get the price ID based on billing interval
     price_id = plan.stripe_price_id_monthly
@@ -114,7 +120,7 @@ async def create_subscription_billing_portal(
     portal_data: BillingPortalCreate,
     request: Request,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Create a billing portal session for subscription management.
@@ -140,7 +146,7 @@ async def create_subscription_billing_portal(
 async def cancel_subscription(
     at_period_end: bool = True,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Cancel the current subscription.
@@ -158,8 +164,8 @@ async def cancel_subscription(
         subscription.status = "canceled"
         subscription.end_date = datetime.utcnow()
     
-    db.commit()
-    db.refresh(subscription)
+    await db.commit()
+    await db.refresh(subscription)
     
     return subscription
 
@@ -168,15 +174,15 @@ async def cancel_subscription(
 async def create_subscription_plan(
     plan_data: SubscriptionPlanCreate,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Create a new subscription plan (admin only).
     """
     plan = SubscriptionPlan(**plan_data.model_dump())
     db.add(plan)
-    db.commit()
-    db.refresh(plan)
+    await db.commit()
+    await db.refresh(plan)
     
     return plan
 
@@ -185,12 +191,12 @@ async def update_subscription_plan(
     plan_id: int,
     plan_data: SubscriptionPlanUpdate,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Update a subscription plan (admin only).
     """
-    plan = db.query(SubscriptionPlan).filter(SubscriptionPlan.id == plan_id).first()
+    plan = await db.get(SubscriptionPlan, plan_id)
     if not plan:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -201,8 +207,8 @@ async def update_subscription_plan(
     for key, value in plan_data.model_dump(exclude_unset=True).items():
         setattr(plan, key, value)
     
-    db.commit()
-    db.refresh(plan)
+    await db.commit()
+    await db.refresh(plan)
     
     return plan
 
@@ -210,12 +216,12 @@ async def update_subscription_plan(
 async def delete_subscription_plan(
     plan_id: int,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> None:
     """
     Delete a subscription plan (admin only).
     """
-    plan = db.query(SubscriptionPlan).filter(SubscriptionPlan.id == plan_id).first()
+    plan = await db.get(SubscriptionPlan, plan_id)
     if not plan:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -224,7 +230,7 @@ async def delete_subscription_plan(
     
     # Instead of deleting, mark as inactive
     plan.is_active = False
-    db.commit()
+    await db.commit()
     
     return None
 
@@ -234,24 +240,25 @@ async def get_all_subscriptions(
     limit: int = 100,
     status: Optional[str] = None,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Get all subscriptions (admin only).
     """
-    query = db.query(Subscription)
+    query = select(Subscription).options(selectinload(Subscription.plan))
     
     if status:
-        query = query.filter(Subscription.status == status)
+        query = query.where(Subscription.status == status)
     
-    subscriptions = query.offset(skip).limit(limit).all()
+    result = await db.execute(query.offset(skip).limit(limit))
+    subscriptions = result.scalars().all()
     return subscriptions
 
 # Webhook endpoint
 @router.post("/webhook", status_code=status.HTTP_200_OK)
 async def stripe_webhook(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Handle Stripe webhook events.
@@ -298,7 +305,7 @@ async def stripe_webhook(
         )
 
 # Webhook handlers
-async def handle_subscription_created(subscription_data: dict, db: Session) -> None:
+async def handle_subscription_created(subscription_data: dict, db: AsyncSession) -> None:
     """
     Handle subscription created event.
     """
@@ -306,7 +313,8 @@ async def handle_subscription_created(subscription_data: dict, db: Session) -> N
     customer_id = subscription_data["customer"]
     
     # Find the user by Stripe customer ID
-    user = db.query(User).filter(User.stripe_customer_id == customer_id).first()
+    result = await db.execute(select(User).where(User.stripe_customer_id == customer_id))
+    user = result.scalar_one_or_none()
     if not user:
         print(f"User not found for Stripe customer ID: {customer_id}")
         return
@@ -317,10 +325,12 @@ async def handle_subscription_created(subscription_data: dict, db: Session) -> N
     # Find the plan by price ID
     plan = None
     if subscription_data["items"]["data"][0]["plan"]["interval"] == "month":
-        plan = db.query(SubscriptionPlan).filter(SubscriptionPlan.stripe_price_id_monthly == price_id).first()
+        result = await db.execute(select(SubscriptionPlan).where(SubscriptionPlan.stripe_price_id_monthly == price_id))
+        plan = result.scalars().first()
         billing_interval = "monthly"
     else:
-        plan = db.query(SubscriptionPlan).filter(SubscriptionPlan.stripe_price_id_yearly == price_id).first()
+        result = await db.execute(select(SubscriptionPlan).where(SubscriptionPlan.stripe_price_id_yearly == price_id))
+        plan = result.scalars().first()
         billing_interval = "yearly"
     
     if not plan:
@@ -342,16 +352,19 @@ async def handle_subscription_created(subscription_data: dict, db: Session) -> N
         subscription.trial_end = datetime.fromtimestamp(subscription_data["trial_end"])
     
     db.add(subscription)
-    db.commit()
+    await db.commit()
 
-async def handle_subscription_updated(subscription_data: dict, db: Session) -> None:
+async def handle_subscription_updated(subscription_data: dict, db: AsyncSession) -> None:
     """
     Handle subscription updated event.
     """
     # Find subscription by Stripe ID
-    subscription = db.query(Subscription).filter(
-        Subscription.stripe_subscription_id == subscription_data["id"]
-    ).first()
+    result = await db.execute(
+        select(Subscription).where(
+            Subscription.stripe_subscription_id == subscription_data["id"]
+        )
+    )
+    subscription = result.scalar_one_or_none()
     
     if not subscription:
         print(f"Subscription not found for Stripe ID: {subscription_data['id']}")
@@ -374,25 +387,30 @@ async def handle_subscription_updated(subscription_data: dict, db: Session) -> N
     price_id = subscription_data["items"]["data"][0]["price"]["id"]
     
     if subscription_data["items"]["data"][0]["plan"]["interval"] == "month":
-        plan = db.query(SubscriptionPlan).filter(SubscriptionPlan.stripe_price_id_monthly == price_id).first()
+        result = await db.execute(select(SubscriptionPlan).where(SubscriptionPlan.stripe_price_id_monthly == price_id))
+        plan = result.scalars().first()
         subscription.billing_interval = "monthly"
     else:
-        plan = db.query(SubscriptionPlan).filter(SubscriptionPlan.stripe_price_id_yearly == price_id).first()
+        result = await db.execute(select(SubscriptionPlan).where(SubscriptionPlan.stripe_price_id_yearly == price_id))
+        plan = result.scalars().first()
         subscription.billing_interval = "yearly"
     
     if plan and plan.id != subscription.plan_id:
         subscription.plan_id = plan.id
     
-    db.commit()
+    await db.commit()
 
-async def handle_subscription_deleted(subscription_data: dict, db: Session) -> None:
+async def handle_subscription_deleted(subscription_data: dict, db: AsyncSession) -> None:
     """
     Handle subscription deleted event.
     """
     # Find subscription by Stripe ID
-    subscription = db.query(Subscription).filter(
-        Subscription.stripe_subscription_id == subscription_data["id"]
-    ).first()
+    result = await db.execute(
+        select(Subscription).where(
+            Subscription.stripe_subscription_id == subscription_data["id"]
+        )
+    )
+    subscription = result.scalar_one_or_none()
     
     if not subscription:
         print(f"Subscription not found for Stripe ID: {subscription_data['id']}")
@@ -402,9 +420,9 @@ async def handle_subscription_deleted(subscription_data: dict, db: Session) -> N
     subscription.status = "canceled"
     subscription.end_date = datetime.utcnow()
     
-    db.commit()
+    await db.commit()
 
-async def handle_invoice_payment_succeeded(invoice_data: dict, db: Session) -> None:
+async def handle_invoice_payment_succeeded(invoice_data: dict, db: AsyncSession) -> None:
     """
     Handle invoice payment succeeded event.
     """
@@ -413,9 +431,12 @@ async def handle_invoice_payment_succeeded(invoice_data: dict, db: Session) -> N
         return
     
     # Find subscription by Stripe ID
-    subscription = db.query(Subscription).filter(
-        Subscription.stripe_subscription_id == invoice_data["subscription"]
-    ).first()
+    result = await db.execute(
+        select(Subscription).where(
+            Subscription.stripe_subscription_id == invoice_data["subscription"]
+        )
+    )
+    subscription = result.scalar_one_or_none()
     
     if not subscription:
         print(f"Subscription not found for Stripe ID: {invoice_data['subscription']}")
@@ -438,9 +459,9 @@ async def handle_invoice_payment_succeeded(invoice_data: dict, db: Session) -> N
     )
     
     db.add(payment)
-    db.commit()
+    await db.commit()
 
-async def handle_invoice_payment_failed(invoice_data: dict, db: Session) -> None:
+async def handle_invoice_payment_failed(invoice_data: dict, db: AsyncSession) -> None:
     """
     Handle invoice payment failed event.
     """
@@ -449,9 +470,12 @@ async def handle_invoice_payment_failed(invoice_data: dict, db: Session) -> None
         return
     
     # Find subscription by Stripe ID
-    subscription = db.query(Subscription).filter(
-        Subscription.stripe_subscription_id == invoice_data["subscription"]
-    ).first()
+    result = await db.execute(
+        select(Subscription).where(
+            Subscription.stripe_subscription_id == invoice_data["subscription"]
+        )
+    )
+    subscription = result.scalar_one_or_none()
     
     if not subscription:
         print(f"Subscription not found for Stripe ID: {invoice_data['subscription']}")
@@ -479,4 +503,4 @@ async def handle_invoice_payment_failed(invoice_data: dict, db: Session) -> None
     )
     
     db.add(payment)
-    db.commit()
\ No newline at end of file
+    await db.commit()
\ No newline at end of file
@@ -1,10 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Body, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import Any, List, Dict, Optional
 from datetime import datetime, timedelta
 
 from app.core.security import get_current_user, get_current_active_user
+from app.db.queries import (
+    ACTIVE_TOOL_BY_ID,
+    PLAN_TOOL,
+    PLAN_TOOLS_FOR_PLAN,
+    USAGE_COUNT_SINCE,
+    USAGE_COUNTS_BY_TOOL_SINCE,
+)
 from app.db.session import get_db
 from app.models.models import User, Tool, ToolUsage, SavedProgress, Subscription, SubscriptionPlan, PlanTool
 from app.schemas.tool import Tool as ToolSchema, ToolUsage as ToolUsageSchema, SavedProgress as SavedProgressSchema
@@ -12,12 +20,29 @@ from app.core.config import settings
 
 router = APIRouter()
 
-async def check_tool_access(user: User, tool_id: int, db: Session):
+async def get_monthly_usage_counts(user: User, db: AsyncSession) -> Dict[int, int]:
+    """
+    Return the user's tool usage counts for the current month, keyed by tool id.
+    """
+    start_of_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    result = await db.execute(USAGE_COUNTS_BY_TOOL_SINCE, {"user_id": user.id, "since": start_of_month})
+    return dict(result.all())
+
+async def get_plan_tools(plan: Optional[SubscriptionPlan], db: AsyncSession) -> Dict[int, PlanTool]:
+    """
+    Return the plan's tool entries keyed by tool id, loaded in one query.
+    """
+    if not plan:
+        return {}
+    result = await db.execute(PLAN_TOOLS_FOR_PLAN, {"plan_id": plan.id})
+    return {plan_tool.tool_id: plan_tool for plan_tool in result.scalars()}
+
+async def check_tool_access(user: User, tool_id: int, db: AsyncSession):
     """
     Check if user has access to the tool based on their subscription.
     Returns (has_access, reason, remaining_uses).
     """
-    tool = db.query(Tool).filter(Tool.id == tool_id).first()
+    tool = await db.get(Tool, tool_id)
     if not tool:
         return (False, "Tool not found", 0)
     
@@ -32,11 +57,9 @@ async def check_tool_access(user: User, tool_id: int, db: Session):
         # Free tier user - check usage limits
         # Count uses in the current month
         start_of_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        usage_count = db.query(func.count(ToolUsage.id)).filter(
-            ToolUsage.user_id == user.id,
-            ToolUsage.tool_id == tool_id,
-            ToolUsage.started_at >= start_of_month
-        ).scalar()
+        usage_count = await db.scalar(
+            USAGE_COUNT_SINCE, {"user_id": user.id, "tool_id": tool_id, "since": start_of_month}
+        )
         
         remaining = tool.usage_limit_free - usage_count
         
@@ -49,10 +72,8 @@ async def check_tool_access(user: User, tool_id: int, db: Session):
     plan = subscription.plan
     
     # Check if the tool is in the plan
-    plan_tool = db.query(PlanTool).filter(
-        PlanTool.plan_id == plan.id,
-        PlanTool.tool_id == tool_id
-    ).first()
+    result = await db.execute(PLAN_TOOL, {"plan_id": plan.id, "tool_id": tool_id})
+    plan_tool = result.scalars().first()
     
     if not plan_tool:
         return (False, f"This tool is not included in your {plan.name} plan", 0)
@@ -61,11 +82,9 @@ async def check_tool_access(user: User, tool_id: int, db: Session):
     if plan_tool.usage_limit != -1:
         # Count uses in the current month
         start_of_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        usage_count = db.query(func.count(ToolUsage.id)).filter(
-            ToolUsage.user_id == user.id,
-            ToolUsage.tool_id == tool_id,
-            ToolUsage.started_at >= start_of_month
-        ).scalar()
+        usage_count = await db.scalar(
+            USAGE_COUNT_SINCE, {"user_id": user.id, "tool_id": tool_id, "since": start_of_month}
+        )
         
         remaining = plan_tool.usage_limit - usage_count
         
@@ -82,27 +101,23 @@ async def read_tools(
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Retrieve tools with access information.
     """
-    tools = db.query(Tool).filter(Tool.is_active == True).offset(skip).limit(limit).all()
+    result = await db.execute(
+        select(Tool).where(Tool.is_active == True).offset(skip).limit(limit)
+    )
+    tools = result.scalars().all()
     
     # Get the user's subscription plan
     subscription = current_user.get_active_subscription()
     plan = subscription.plan if subscription else None
     
-    # Get tool usage counts for the current month
-    start_of_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    usage_counts = {}
-    for usage in db.query(ToolUsage).filter(
-        ToolUsage.user_id == current_user.id,
-        ToolUsage.started_at >= start_of_month
-    ).all():
-        if usage.tool_id not in usage_counts:
-            usage_counts[usage.tool_id] = 0
-        usage_counts[usage.tool_id] += 1
+    # Get tool usage counts for the current month and the plan's limits
+    usage_counts = await get_monthly_usage_counts(current_user, db)
+    plan_tools = await get_plan_tools(plan, db)
     
     result = []
     for tool in tools:
@@ -121,10 +136,7 @@ async def read_tools(
                     reason = "Free tier usage limit reached"
             else:
                 # Paid subscription
-                plan_tool = db.query(PlanTool).filter(
-                    PlanTool.plan_id == plan.id,
-                    PlanTool.tool_id == tool.id
-                ).first()
+                plan_tool = plan_tools.get(tool.id)
                 
                 if not plan_tool:
                     has_access = False
@@ -160,12 +172,13 @@ async def read_tools(
 async def read_tool(
     tool_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Get tool by ID with access information.
     """
-    tool = db.query(Tool).filter(Tool.id == tool_id, Tool.is_active == True).first()
+    result = await db.execute(ACTIVE_TOOL_BY_ID, {"tool_id": tool_id})
+    tool = result.scalar_one_or_none()
     if not tool:
         raise HTTPException(status_code=404, detail="Tool not found")
     
@@ -194,7 +207,7 @@ async def start_tool_usage(
     tool_id: int,
     input_data: dict = Body(...),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Start using a tool and record usage.
@@ -208,7 +221,8 @@ async def start_tool_usage(
             detail=reason or "You don't have access to this tool"
         )
     
-    tool = db.query(Tool).filter(Tool.id == tool_id, Tool.is_active == True).first()
+    result = await db.execute(ACTIVE_TOOL_BY_ID, {"tool_id": tool_id})
+    tool = result.scalar_one_or_none()
     if not tool:
         raise HTTPException(status_code=404, detail="Tool not found")
     
@@ -221,8 +235,9 @@ async def start_tool_usage(
     )
     
     db.add(tool_usage)
-    db.commit()
-    db.refresh(tool_usage)
+    await db.commit()
+    await db.refresh(tool_usage)
+    await db.refresh(tool_usage, attribute_names=["tool"])
     
     return tool_usage
 
@@ -233,16 +248,19 @@ async def update_tool_usage(
     status: str = Body(...),
     result_data: dict = Body(None),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Update tool usage status and results.
     """
-    tool_usage = db.query(ToolUsage).filter(
-        ToolUsage.id == usage_id,
-        ToolUsage.tool_id == tool_id,
-        ToolUsage.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(ToolUsage).options(selectinload(ToolUsage.tool)).where(
+            ToolUsage.id == usage_id,
+            ToolUsage.tool_id == tool_id,
+            ToolUsage.user_id == current_user.id
+        )
+    )
+    tool_usage = result.scalar_one_or_none()
     
     if not tool_usage:
         raise HTTPException(status_code=404, detail="Tool usage not found")
@@ -258,8 +276,8 @@ async def update_tool_usage(
     if status in ["COMPLETED", "FAILED"]:
         tool_usage.completed_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(tool_usage)
+    await db.commit()
+    await db.refresh(tool_usage)
     
     return tool_usage
 
@@ -268,7 +286,7 @@ async def save_tool_progress(
     tool_id: int,
     form_data: dict = Body(...),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Save progress on a tool form.
@@ -282,15 +300,19 @@ async def save_tool_progress(
             detail=reason or "You don't have access to this tool"
         )
     
-    tool = db.query(Tool).filter(Tool.id == tool_id, Tool.is_active == True).first()
+    result = await db.execute(ACTIVE_TOOL_BY_ID, {"tool_id": tool_id})
+    tool = result.scalar_one_or_none()
     if not tool:
         raise HTTPException(status_code=404, detail="Tool not found")
     
     # Check if there's already saved progress for this tool
-    saved_progress = db.query(SavedProgress).filter(
-        SavedProgress.tool_id == tool_id,
-        SavedProgress.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(SavedProgress).options(selectinload(SavedProgress.tool)).where(
+            SavedProgress.tool_id == tool_id,
+            SavedProgress.user_id == current_user.id
+        )
+    )
+    saved_progress = result.scalars().first()
     
     if saved_progress:
         # Update existing saved progress
@@ -306,8 +328,9 @@ async def save_tool_progress(
         )
         db.add(saved_progress)
     
-    db.commit()
-    db.refresh(saved_progress)
+    await db.commit()
+    await db.refresh(saved_progress)
+    await db.refresh(saved_progress, attribute_names=["tool"])
     
     return saved_progress
 
@@ -315,15 +338,18 @@ async def save_tool_progress(
 async def get_saved_progress(
     tool_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Get saved progress for a tool.
     """
-    saved_progress = db.query(SavedProgress).filter(
-        SavedProgress.tool_id == tool_id,
-        SavedProgress.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(SavedProgress).options(selectinload(SavedProgress.tool)).where(
+            SavedProgress.tool_id == tool_id,
+            SavedProgress.user_id == current_user.id
+        )
+    )
+    saved_progress = result.scalars().first()
     
     if not saved_progress:
         raise HTTPException(status_code=404, detail="No saved progress found")
@@ -333,32 +359,22 @@ async def get_saved_progress(
 @router.get("/usage-stats", response_model=Dict)
 async def get_usage_stats(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Get usage statistics for the current user.
     """
-    # Get the current month's start date
-    start_of_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    
     # Get count of tool usages by tool in the current month
-    tool_usage_counts = {}
-    usages = db.query(ToolUsage).filter(
-        ToolUsage.user_id == current_user.id,
-        ToolUsage.started_at >= start_of_month
-    ).all()
-    
-    for usage in usages:
-        if usage.tool_id not in tool_usage_counts:
-            tool_usage_counts[usage.tool_id] = 0
-        tool_usage_counts[usage.tool_id] += 1
+    tool_usage_counts = await get_monthly_usage_counts(current_user, db)
     
     # Get all active tools
-    tools = db.query(Tool).filter(Tool.is_active == True).all()
+    result = await db.execute(select(Tool).where(Tool.is_active == True))
+    tools = result.scalars().all()
     
     # Get user's subscription and plan
     subscription = current_user.get_active_subscription()
     plan = subscription.plan if subscription else None
+    plan_tools = await get_plan_tools(plan, db)
     
     # Build the response
     result = {
@@ -368,7 +384,7 @@ async def get_usage_stats(
             "renewal_date": subscription.end_date if subscription and subscription.end_date else None
         },
         "usage_this_month": [],
-        "total_usage_count": len(usages)
+        "total_usage_count": sum(tool_usage_counts.values())
     }
     
     # Add usage stats for each tool
@@ -383,10 +399,7 @@ async def get_usage_stats(
                 remaining = limit - usage_count
             else:
                 # Check plan_tool for limit
-                plan_tool = db.query(PlanTool).filter(
-                    PlanTool.plan_id == plan.id,
-                    PlanTool.tool_id == tool.id
-                ).first()
+                plan_tool = plan_tools.get(tool.id)
                 
                 if plan_tool:
                     limit = plan_tool.usage_limit
@@ -414,14 +427,15 @@ async def get_usage_stats(
 async def save_checklist_progress(
     checklist_data: List = Body(...),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Save production checklist progress.
     """
     try:
         # Find the Production Checklist tool
-        tool = db.query(Tool).filter(Tool.name == "Production Checklist").first()
+        result = await db.execute(select(Tool).where(Tool.name == "Production Checklist"))
+        tool = result.scalars().first()
         if not tool:
             raise HTTPException(status_code=404, detail="Production Checklist tool not found")
         
@@ -435,11 +449,14 @@ async def save_checklist_progress(
             )
         
         # Check if there's an existing usage record
-        tool_usage = db.query(ToolUsage).filter(
-            ToolUsage.user_id == current_user.id,
-            ToolUsage.tool_id == tool.id,
-            ToolUsage.status.in_(["STARTED", "IN_PROGRESS"])
-        ).order_by(ToolUsage.started_at.desc()).first()
+        result = await db.execute(
+            select(ToolUsage).where(
+                ToolUsage.user_id == current_user.id,
+                ToolUsage.tool_id == tool.id,
+                ToolUsage.status.in_(["STARTED", "IN_PROGRESS"])
+            ).order_by(ToolUsage.started_at.desc()).limit(1)
+        )
+        tool_usage = result.scalar_one_or_none()
         
         if not tool_usage:
             # Create a new usage record
@@ -456,14 +473,18 @@ async def save_checklist_progress(
             tool_usage.input_data = {"checklist": checklist_data}
             tool_usage.status = "IN_PROGRESS"
         
-        db.commit()
-        db.refresh(tool_usage)
+        await db.commit()
+        await db.refresh(tool_usage)
+        await db.refresh(tool_usage, attribute_names=["tool"])
         
         # Also save to SavedProgress for compatibility
-        saved_progress = db.query(SavedProgress).filter(
-            SavedProgress.tool_id == tool.id,
-            SavedProgress.user_id == current_user.id
-        ).first()
+        result = await db.execute(
+            select(SavedProgress).where(
+                SavedProgress.tool_id == tool.id,
+                SavedProgress.user_id == current_user.id
+            )
+        )
+        saved_progress = result.scalars().first()
         
         if saved_progress:
             saved_progress.form_data = {"checklist": checklist_data}
@@ -477,25 +498,26 @@ async def save_checklist_progress(
             )
             db.add(saved_progress)
         
-        db.commit()
+        await db.commit()
         
         return tool_usage
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error saving checklist: {str(e)}")
 
 @router.post("/production-checklist/complete", response_model=ToolUsageSchema)
 async def complete_checklist(
     checklist_data: List = Body(...),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Mark production checklist as completed.
     """
     try:
         # Find the Production Checklist tool
-        tool = db.query(Tool).filter(Tool.name == "Production Checklist").first()
+        result = await db.execute(select(Tool).where(Tool.name == "Production Checklist"))
+        tool = result.scalars().first()
         if not tool:
             raise HTTPException(status_code=404, detail="Production Checklist tool not found")
         
@@ -509,11 +531,14 @@ async def complete_checklist(
             )
         
         # Check if there's an existing usage record
-        tool_usage = db.query(ToolUsage).filter(
-            ToolUsage.user_id == current_user.id,
-            ToolUsage.tool_id == tool.id,
-            ToolUsage.status.in_(["STARTED", "IN_PROGRESS"])
-        ).order_by(ToolUsage.started_at.desc()).first()
+        result = await db.execute(
+            select(ToolUsage).where(
+                ToolUsage.user_id == current_user.id,
+                ToolUsage.tool_id == tool.id,
+                ToolUsage.status.in_(["STARTED", "IN_PROGRESS"])
+            ).order_by(ToolUsage.started_at.desc()).limit(1)
+        )
+        tool_usage = result.scalar_one_or_none()
         
         if not tool_usage:
             # Create a new usage record and mark it as completed
@@ -534,21 +559,25 @@ async def complete_checklist(
             tool_usage.status = "COMPLETED"
             tool_usage.completed_at = datetime.utcnow()
         
-        db.commit()
-        db.refresh(tool_usage)
+        await db.commit()
+        await db.refresh(tool_usage)
+        await db.refresh(tool_usage, attribute_names=["tool"])
         
         # Also update SavedProgress
-        saved_progress = db.query(SavedProgress).filter(
-            SavedProgress.tool_id == tool.id,
-            SavedProgress.user_id == current_user.id
-        ).first()
+        result = await db.execute(
+            select(SavedProgress).where(
+                SavedProgress.tool_id == tool.id,
+                SavedProgress.user_id == current_user.id
+            )
+        )
+        saved_progress = result.scalars().first()
         
         if saved_progress:
             saved_progress.form_data = {"checklist": checklist_data, "completed": True}
             saved_progress.saved_at = datetime.utcnow()
-            db.commit()
+            await db.commit()
         
         return tool_usage
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error completing checklist: {str(e)}")
\ No newline at end of file
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import Any, List, Dict, Optional
 
-from app.core.security import get_current_user, get_current_active_user, get_password_hash, verify_password
-from app.db.session import get_db
+from app.core.security import get_current_user, get_current_active_user, get_password_hash_async, verify_password_async
+from app.db.session import get_db, get_read_db
 from app.models.models import User, ToolUsage, Subscription
 from app.schemas.user import User as UserSchema, UserUpdate
 from sqlalchemy import desc
@@ -13,7 +15,7 @@ router = APIRouter()
 @router.get("/me", response_model=UserSchema)
 async def read_current_user(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Get current user information including subscription details.
@@ -32,7 +34,7 @@ async def read_current_user(
 async def update_current_user(
     user_in: UserUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Update own user information.
@@ -42,15 +44,15 @@ async def update_current_user(
     
     if user_in.password is not None and user_in.new_password is not None:
         # Check if current password is correct
-        if not verify_password(user_in.password, current_user.hashed_password):
+        if not await verify_password_async(user_in.password, current_user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Incorrect password",
             )
-        current_user.hashed_password = get_password_hash(user_in.new_password)
+        current_user.hashed_password = await get_password_hash_async(user_in.new_password)
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
     
     # Get user's active subscription
     subscription = current_user.get_active_subscription()
@@ -67,14 +69,17 @@ async def read_current_user_activity(
     current_user: User = Depends(get_current_active_user),
     skip: int = 0,
     limit: int = 10,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> Any:
     """
     Get current user's activity history.
     """
-    activities = db.query(ToolUsage).filter(
-        ToolUsage.user_id == current_user.id
-    ).order_by(desc(ToolUsage.started_at)).offset(skip).limit(limit).all()
+    result = await db.execute(
+        select(ToolUsage).options(selectinload(ToolUsage.tool)).where(
+            ToolUsage.user_id == current_user.id
+        ).order_by(desc(ToolUsage.started_at)).offset(skip).limit(limit)
+    )
+    activities = result.scalars().all()
     
     result = []
     for activity in activities:
@@ -98,27 +103,33 @@ async def read_current_user_activity(
 @router.get("/me/stats", response_model=Dict)
 async def read_current_user_stats(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> Any:
     """
     Get current user's usage statistics.
     """
     # Count total tool usages
-    total_tools = db.query(ToolUsage).filter(
-        ToolUsage.user_id == current_user.id
-    ).count()
+    total_tools = await db.scalar(
+        select(func.count(ToolUsage.id)).where(
+            ToolUsage.user_id == current_user.id
+        )
+    )
     
     # Count completed tool usages
-    completed_tools = db.query(ToolUsage).filter(
-        ToolUsage.user_id == current_user.id,
-        ToolUsage.status == "COMPLETED"
-    ).count()
+    completed_tools = await db.scalar(
+        select(func.count(ToolUsage.id)).where(
+            ToolUsage.user_id == current_user.id,
+            ToolUsage.status == "COMPLETED"
+        )
+    )
     
     # Count in-progress tool usages
-    in_progress_tools = db.query(ToolUsage).filter(
-        ToolUsage.user_id == current_user.id,
-        ToolUsage.status.in_(["STARTED", "IN_PROGRESS"])
-    ).count()
+    in_progress_tools = await db.scalar(
+        select(func.count(ToolUsage.id)).where(
+            ToolUsage.user_id == current_user.id,
+            ToolUsage.status.in_(["STARTED", "IN_PROGRESS"])
+        )
+    )
     
     # Get subscription details
     subscription = current_user.get_active_subscription()
@@ -145,16 +156,19 @@ async def read_current_user_stats(
 async def get_activity_details(
     activity_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> Any:
     """
     Get details of a specific activity.
     """
     # Find the activity
-    activity = db.query(ToolUsage).filter(
-        ToolUsage.id == activity_id,
-        ToolUsage.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(ToolUsage).options(selectinload(ToolUsage.tool)).where(
+            ToolUsage.id == activity_id,
+            ToolUsage.user_id == current_user.id
+        )
+    )
+    activity = result.scalar_one_or_none()
     
     if not activity:
         raise HTTPException(
@@ -0,0 +1,61 @@
+"""
+Distinct active users per UTC day, kept as Redis HyperLogLogs.
+
+Each day has one HLL key that every user starting a tool usage that day is
+added to. A key costs at most 12 KB however many users it holds, and the
+number of distinct users over any range of days is one PFCOUNT across the
+day keys, with a standard error of 0.81%.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List
+
+from app.core.config import settings
+from app.db.redis import get_redis, redis_call
+
+PFADD_CHUNK = 5000
+
+
+def day_key(day: date) -> str:
+    return f"active_users:{day.isoformat()}"
+
+
+def day_keys(start: date, end: date) -> List[str]:
+    """Keys of the days from start to end, both included."""
+    return [day_key(start + timedelta(days=offset)) for offset in range((end - start).days + 1)]
+
+
+def add_active(pipe, active: Dict[int, float]) -> None:
+    """Queue PFADDs on pipe for user ids mapped to the epoch time they were active."""
+    by_day: Dict[str, List[int]] = {}
+    for user_id, timestamp in active.items():
+        by_day.setdefault(day_key(datetime.utcfromtimestamp(timestamp).date()), []).append(user_id)
+    for key, user_ids in by_day.items():
+        pipe.pfadd(key, *user_ids)
+        pipe.expire(key, settings.ACTIVE_USERS_RETENTION_DAYS * 86400)
+
+
+async def seed_day(day: date, user_ids: Iterable[int]) -> None:
+    """Add users to a day's HLL; adding a user twice has no effect."""
+    user_ids = list(user_ids)
+    key = day_key(day)
+    for start in range(0, len(user_ids), PFADD_CHUNK):
+        async with get_redis().pipeline(transaction=False) as pipe:
+            pipe.pfadd(key, *user_ids[start:start + PFADD_CHUNK])
+            pipe.expire(key, settings.ACTIVE_USERS_RETENTION_DAYS * 86400)
+            await redis_call(pipe.execute)
+
+
+async def count_active(start: date, end: date) -> int:
+    """Estimate distinct users active between start and end, both included."""
+    # PFCOUNT over several keys counts their union without storing a merged key
+    return await redis_call(get_redis().pfcount, *day_keys(start, end))
+
+
+def rolling_windows(today: date) -> Dict[str, List[str]]:
+    """Day keys of the DAU, WAU and MAU windows ending today."""
+    return {
+        "dau": day_keys(today, today),
+        "wau": day_keys(today - timedelta(days=6), today),
+        "mau": day_keys(today - timedelta(days=29), today),
+    }
@@ -0,0 +1,182 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+import logging
+import time
+
+from sqlalchemy import event, func, select
+import redis
+
+from app.core.active_users import add_active, day_keys, rolling_windows, seed_day
+from app.core.config import settings
+from app.core.leaderboards import add_usages
+from app.db.redis import get_redis, redis_call, RedisUnavailableError
+from app.db.replicas import replica_set
+from app.db.session import AsyncSessionLocal, RoutingSession, after_commit_hook
+from app.models.models import Tool, ToolUsage, User
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_KEY = "admin_stats:counters"
+RECONCILE_LOCK_KEY = "admin_stats:reconcile_lock"
+
+# Counter field per model whose inserts and deletes are tracked
+_COUNTED_MODELS = {User: "users", Tool: "tools", ToolUsage: "usage"}
+
+
+def _epoch(value: datetime) -> float:
+    """Timestamps are stored as naive UTC."""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _collect_changes(session, flush_context):
+    """Accumulate counter deltas and active users in the session until commit."""
+    for objects, sign in ((session.new, 1), (session.deleted, -1)):
+        for obj in objects:
+            field = _COUNTED_MODELS.get(type(obj))
+            if field is None:
+                continue
+            # Only created once a counted model changed, so other writes publish nothing
+            changes = session.info.setdefault("admin_stats", {"deltas": {}, "usages": []})
+            changes["deltas"][field] = changes["deltas"].get(field, 0) + sign
+            if sign > 0 and isinstance(obj, ToolUsage) and obj.started_at is not None:
+                changes["usages"].append((obj.user_id, obj.tool_id, _epoch(obj.started_at)))
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("admin_stats", None)
+
+
+@after_commit_hook
+async def _publish_changes(info: Dict) -> None:
+    changes = info.pop("admin_stats", None)
+    if changes is None:
+        return
+    # Inserts and deletes within the transaction may have cancelled out
+    deltas = {field: delta for field, delta in changes["deltas"].items() if delta}
+    if deltas or changes["usages"]:
+        await admin_stats.apply(deltas, changes["usages"])
+
+
+class AdminStats:
+    """
+    Dashboard totals kept in Redis so /admin/stats is a couple of O(1) reads.
+
+    Committed inserts and deletes of users, tools and tool usages adjust the
+    counters, and each usage adds its user to that day's active users
+    HyperLogLog (see app.core.active_users) and counts towards the
+    leaderboards (see app.core.leaderboards). reconcile() recounts everything
+    from the database periodically, which seeds the snapshot and corrects
+    drift from missed updates (Redis outages, writes made outside the async
+    sessions).
+    """
+
+    async def apply(self, deltas: Dict[str, int], usages: List[Tuple[int, int, float]]) -> None:
+        """Apply committed changes to the snapshot, active users and leaderboards."""
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                for field, delta in deltas.items():
+                    if delta:
+                        pipe.hincrby(COUNTERS_KEY, field, delta)
+                add_active(pipe, {user_id: started for user_id, _, started in usages})
+                add_usages(pipe, usages)
+                pipe.hset(COUNTERS_KEY, "updated_at", time.time())
+                await redis_call(pipe.execute)
+        except redis.RedisError as e:
+            if not isinstance(e, RedisUnavailableError):
+                logger.error(f"Redis error updating admin stats: {e}")
+
+    async def read(self) -> Optional[Dict]:
+        """Return the snapshot, or None when it has not been reconciled or Redis is unavailable."""
+        today = datetime.utcnow().date()
+        windows = rolling_windows(today)
+        active_keys = day_keys(today - timedelta(days=settings.ADMIN_STATS_ACTIVE_DAYS - 1), today)
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                pipe.hgetall(COUNTERS_KEY)
+                pipe.pfcount(*active_keys)
+                for keys in windows.values():
+                    pipe.pfcount(*keys)
+                counters, active_users, *window_counts = await redis_call(pipe.execute)
+        except redis.RedisError as e:
+            if not isinstance(e, RedisUnavailableError):
+                logger.error(f"Redis error reading admin stats: {e}")
+            return None
+
+        if "reconciled_at" not in counters:
+            return None
+        return {
+            "totalUsers": int(counters.get("users", 0)),
+            "activeUsers": active_users,
+            **dict(zip(windows, window_counts)),
+            "totalTools": int(counters.get("tools", 0)),
+            "totalUsage": int(counters.get("usage", 0)),
+            "updatedAt": datetime.utcfromtimestamp(float(counters["updated_at"])),
+            "reconciledAt": datetime.utcfromtimestamp(float(counters["reconciled_at"])),
+        }
+
+    async def reconcile(self) -> None:
+        """Recount the snapshot from the database; one worker at a time."""
+        lock_ttl = max(60, int(settings.ADMIN_STATS_RECONCILE_INTERVAL_SECONDS / 2))
+        # The HLLs cover the MAU window as well as the active users window
+        today = datetime.utcnow().date()
+        days = max(settings.ADMIN_STATS_ACTIVE_DAYS, 30)
+        try:
+            if not await redis_call(get_redis().set, RECONCILE_LOCK_KEY, 1, nx=True, ex=lock_ttl):
+                return
+            async with get_redis().pipeline(transaction=False) as pipe:
+                pipe.hexists(COUNTERS_KEY, "reconciled_at")
+                pipe.exists(*day_keys(today - timedelta(days=days - 1), today))
+                reconciled, existing_days = await redis_call(pipe.execute)
+        except redis.RedisError as e:
+            if not isinstance(e, RedisUnavailableError):
+                logger.error(f"Redis error taking admin stats reconcile lock: {e}")
+            return
+
+        # Older days no longer change, so once seeded only today and yesterday
+        # (usages committed around midnight) are reseeded. The whole window is
+        # seeded on the first run or after Redis lost the keys.
+        if not reconciled or not existing_days:
+            seed_days = days
+        else:
+            seed_days = 2
+        active_since = datetime.combine(today - timedelta(days=seed_days - 1), datetime.min.time())
+        # Recounting can read slightly stale data, so any usable replica will do
+        async with AsyncSessionLocal(info={"replica": replica_set.choose()}) as db:
+            total_users = await db.scalar(select(func.count(User.id)))
+            total_tools = await db.scalar(select(func.count(Tool.id)))
+            total_usage = await db.scalar(select(func.count(ToolUsage.id)))
+            result = await db.execute(
+                select(func.date(ToolUsage.started_at), ToolUsage.user_id)
+                .where(ToolUsage.started_at >= active_since)
+                .distinct()
+            )
+            active_by_day: Dict[str, Set[int]] = {}
+            for day, user_id in result:
+                # DATE() comes back as a date from MySQL and a string from SQLite
+                active_by_day.setdefault(str(day)[:10], set()).add(user_id)
+
+        now = time.time()
+        try:
+            # Adding to an HLL is idempotent, so reseeding never double counts
+            for day, user_ids in active_by_day.items():
+                await seed_day(datetime.strptime(day, "%Y-%m-%d").date(), user_ids)
+            await redis_call(get_redis().hset, COUNTERS_KEY, mapping={
+                "users": total_users,
+                "tools": total_tools,
+                "usage": total_usage,
+                "updated_at": now,
+                "reconciled_at": now,
+            })
+        except redis.RedisError as e:
+            if not isinstance(e, RedisUnavailableError):
+                logger.error(f"Redis error writing admin stats: {e}")
+            return
+        logger.info(
+            f"Reconciled admin stats: {total_users} users, {total_tools} tools, "
+            f"{total_usage} usages, active users reseeded for the last {seed_days} days"
+        )
+
+
+admin_stats = AdminStats()
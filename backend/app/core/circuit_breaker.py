@@ -0,0 +1,95 @@
+from typing import Dict, Optional
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    are refused without touching the dependency. Once reset_timeout seconds
+    have passed a single probe call is let through (half-open): success
+    closes the circuit again, failure re-opens it. A probe that ends any
+    other way must be released with abandon_probe(); one that is never
+    resolved stops blocking new probes after reset_timeout.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    # Numeric gauge values for the metrics endpoint
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self.rejected_calls = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._probe_started_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Return whether a call may go through to the dependency."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                logger.info(f"Circuit {self.name} half-open, probing")
+
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN and (
+                not self._probe_in_flight or now - self._probe_started_at >= self.reset_timeout
+            ):
+                self._probe_in_flight = True
+                self._probe_started_at = now
+                return True
+
+            self.rejected_calls += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit {self.name} closed")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def abandon_probe(self) -> None:
+        """Release a call that ended without a verdict (cancelled, or failed for an unrelated reason)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    logger.error(f"Circuit {self.name} opened after {self.consecutive_failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict:
+        """Return breaker state for the metrics endpoint."""
+        with self._lock:
+            return {
+                "state": self.state,
+                "state_value": self.STATE_VALUES[self.state],
+                "consecutive_failures": self.consecutive_failures,
+                "times_opened": self.times_opened,
+                "rejected_calls": self.rejected_calls,
+            }
@@ -19,10 +19,51 @@ class Settings(BaseSettings):
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
     REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+    ONE_TIME_TOKEN_PURGE_INTERVAL_SECONDS: int = int(os.getenv("ONE_TIME_TOKEN_PURGE_INTERVAL_SECONDS", "3600"))
+    JWT_CACHE_SIZE: int = int(os.getenv("JWT_CACHE_SIZE", "10000"))  # 0 disables the cache
     
     # Database settings
     DATABASE_URL: str = os.getenv("DATABASE_URL", "mysql+pymysql://user:password@db:3306/appdb")
+    # Used by request handlers; startup and background threads keep the sync DATABASE_URL
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", DATABASE_URL.replace("+pymysql", "+aiomysql", 1))
+    # Pool sizing applies to each engine in each worker
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "5"))  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+    DB_SLOW_CHECKOUT_MS: float = float(os.getenv("DB_SLOW_CHECKOUT_MS", "100"))  # log checkouts that wait longer
+    # Comma separated async URLs of read replicas; empty sends every read to the primary
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    DB_REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+    DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS: float = float(os.getenv("DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS", "5"))
+    DB_READ_YOUR_WRITES_SECONDS: int = int(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "10"))  # primary pin after a user's write
+    # Counts statements per request and returns X-Query-Count; on by default in development
+    QUERY_COUNT_ENABLED: bool = os.getenv("QUERY_COUNT_ENABLED", str(DEBUG)).lower() == "true"
+    N_PLUS_ONE_THRESHOLD: int = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))  # warn when one query shape repeats this often
+    SLOW_QUERY_ENABLED: bool = os.getenv("SLOW_QUERY_ENABLED", "true").lower() == "true"
+    SLOW_QUERY_THRESHOLD_MS: float = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+    SLOW_QUERY_SAMPLE_RATE: float = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "0.2"))  # fraction of slow queries recorded
+    SLOW_QUERY_BUFFER_SIZE: int = int(os.getenv("SLOW_QUERY_BUFFER_SIZE", "1000"))  # recorded queries held between flushes
+    SLOW_QUERY_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("SLOW_QUERY_FLUSH_INTERVAL_SECONDS", "10"))
+    DB_LOG_ENABLED: bool = os.getenv("DB_LOG_ENABLED", "true").lower() == "true"  # copy log records to system_logs
+    DB_LOG_LEVEL: str = os.getenv("DB_LOG_LEVEL", "WARNING")
+    DB_LOG_EXCLUDED_LOGGERS: str = os.getenv("DB_LOG_EXCLUDED_LOGGERS", "sqlalchemy,uvicorn.access")  # comma separated prefixes
+    DB_LOG_QUEUE_SIZE: int = int(os.getenv("DB_LOG_QUEUE_SIZE", "10000"))  # records waiting to be written; more are dropped
+    DB_LOG_BATCH_SIZE: int = int(os.getenv("DB_LOG_BATCH_SIZE", "200"))  # rows per insert
+    DB_LOG_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("DB_LOG_FLUSH_INTERVAL_SECONDS", "2"))
+    SYSTEM_LOG_RETENTION_DAYS: int = int(os.getenv("SYSTEM_LOG_RETENTION_DAYS", "30"))
+    SYSTEM_LOG_PARTITIONS_AHEAD_DAYS: int = int(os.getenv("SYSTEM_LOG_PARTITIONS_AHEAD_DAYS", "7"))
+    SYSTEM_LOG_MAINTENANCE_INTERVAL_SECONDS: float = float(os.getenv("SYSTEM_LOG_MAINTENANCE_INTERVAL_SECONDS", "3600"))
+    SYSTEM_LOG_SEARCH_MAX_DAYS: int = int(os.getenv("SYSTEM_LOG_SEARCH_MAX_DAYS", "31"))  # widest time range one search may scan
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://redis:6379/0")
+    REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+    REDIS_POOL_TIMEOUT: float = float(os.getenv("REDIS_POOL_TIMEOUT", "0.1"))  # seconds to wait for a free connection
+    REDIS_SOCKET_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.1"))
+    REDIS_CONNECT_TIMEOUT: float = float(os.getenv("REDIS_CONNECT_TIMEOUT", "0.25"))
+    REDIS_CALL_TIMEOUT: float = float(os.getenv("REDIS_CALL_TIMEOUT", "0.25"))  # whole operation, including pool wait
+    REDIS_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("REDIS_BREAKER_FAILURE_THRESHOLD", "5"))
+    REDIS_BREAKER_RESET_SECONDS: float = float(os.getenv("REDIS_BREAKER_RESET_SECONDS", "5"))
+    REDIS_HEALTH_CHECK_INTERVAL: int = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
     
     # Admin user creation
     ADMIN_EMAIL: EmailStr = os.getenv("ADMIN_EMAIL", "admin@example.com")
@@ -38,6 +79,60 @@ class Settings(BaseSettings):
     # Rate limiting
     RATE_LIMIT_PER_MINUTE: int = 60
     RATE_LIMIT_AUTH_PER_MINUTE: int = 5
+    # Per-minute limits for authenticated users, by subscription plan name
+    RATE_LIMIT_PLAN_TIERS: Dict[str, int] = json.loads(os.getenv(
+        "RATE_LIMIT_PLAN_TIERS",
+        '{"Free": 60, "Professional": 300, "Team": 600, "Enterprise": 1200}'
+    ))
+    RATE_LIMIT_DEFAULT_TIER: str = os.getenv("RATE_LIMIT_DEFAULT_TIER", "Free")  # tier for users without a plan
+    RATE_LIMIT_LOCAL_ENABLED: bool = os.getenv("RATE_LIMIT_LOCAL_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_LOCAL_ERROR_BOUND: float = float(os.getenv("RATE_LIMIT_LOCAL_ERROR_BOUND", "0.1"))  # fraction of the limit
+    RATE_LIMIT_LOCAL_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_LOCAL_MAX_KEYS", "10000"))
+    RATE_LIMIT_DEGRADED_WORKERS: int = int(os.getenv("RATE_LIMIT_DEGRADED_WORKERS", os.getenv("WEB_CONCURRENCY", "1")))  # limit is split across workers while Redis is down
+    RATE_LIMIT_SYNC_INTERVAL_SECONDS: float = float(os.getenv("RATE_LIMIT_SYNC_INTERVAL_SECONDS", "1.0"))
+    
+    # Login throttling
+    LOGIN_FAILURE_WINDOW_SECONDS: int = int(os.getenv("LOGIN_FAILURE_WINDOW_SECONDS", "900"))
+    LOGIN_MAX_FAILURES_PER_ACCOUNT: int = int(os.getenv("LOGIN_MAX_FAILURES_PER_ACCOUNT", "5"))
+    LOGIN_MAX_FAILURES_PER_IP: int = int(os.getenv("LOGIN_MAX_FAILURES_PER_IP", "20"))
+    LOGIN_LOCKOUT_BASE_SECONDS: int = int(os.getenv("LOGIN_LOCKOUT_BASE_SECONDS", "30"))
+    LOGIN_LOCKOUT_MAX_SECONDS: int = int(os.getenv("LOGIN_LOCKOUT_MAX_SECONDS", "3600"))
+    
+    # Admin dashboard stats snapshot
+    ADMIN_STATS_RECONCILE_INTERVAL_SECONDS: float = float(os.getenv("ADMIN_STATS_RECONCILE_INTERVAL_SECONDS", "900"))  # full recount
+    ADMIN_STATS_ACTIVE_DAYS: int = int(os.getenv("ADMIN_STATS_ACTIVE_DAYS", "30"))  # window for active users
+    LEADERBOARD_RECONCILE_INTERVAL_SECONDS: float = float(os.getenv("LEADERBOARD_RECONCILE_INTERVAL_SECONDS", "3600"))
+    LEADERBOARD_MONTHS_KEPT: int = int(os.getenv("LEADERBOARD_MONTHS_KEPT", "13"))
+    ACTIVE_USERS_RETENTION_DAYS: int = int(os.getenv("ACTIVE_USERS_RETENTION_DAYS", "400"))  # per-day HLLs kept for range queries
+    
+    # Admin bulk user operations
+    ADMIN_BULK_MAX_USERS: int = int(os.getenv("ADMIN_BULK_MAX_USERS", "10000"))
+    ADMIN_BULK_CHUNK_SIZE: int = int(os.getenv("ADMIN_BULK_CHUNK_SIZE", "1000"))  # ids per statement and commit
+    
+    # Admin exports
+    EXPORT_DIR: str = os.getenv("EXPORT_DIR", "/tmp/exports")  # shared between workers when jobs are downloaded elsewhere
+    EXPORT_CHUNK_SIZE: int = int(os.getenv("EXPORT_CHUNK_SIZE", "5000"))  # rows fetched from the cursor at a time
+    EXPORT_MAX_CONCURRENT_JOBS: int = int(os.getenv("EXPORT_MAX_CONCURRENT_JOBS", "2"))  # per worker
+    EXPORT_RETENTION_HOURS: float = float(os.getenv("EXPORT_RETENTION_HOURS", "24"))
+    EXPORT_PURGE_INTERVAL_SECONDS: float = float(os.getenv("EXPORT_PURGE_INTERVAL_SECONDS", "3600"))
+    
+    # Usage analytics rollups
+    USAGE_AGGREGATE_INTERVAL_SECONDS: float = float(os.getenv("USAGE_AGGREGATE_INTERVAL_SECONDS", "60"))
+    USAGE_AGGREGATE_BATCH_SIZE: int = int(os.getenv("USAGE_AGGREGATE_BATCH_SIZE", "5000"))  # source rows per transaction
+    USAGE_AGGREGATE_MAX_BATCHES: int = int(os.getenv("USAGE_AGGREGATE_MAX_BATCHES", "20"))  # per run, bounds backfill work
+    USAGE_AGGREGATE_SETTLE_SECONDS: int = int(os.getenv("USAGE_AGGREGATE_SETTLE_SECONDS", "60"))  # wait for in-flight inserts to commit
+    USAGE_ANALYTICS_MAX_POINTS: int = int(os.getenv("USAGE_ANALYTICS_MAX_POINTS", "2000"))
+    
+    # Password hashing pool
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+    PASSWORD_HASH_QUEUE_MAX: int = int(os.getenv("PASSWORD_HASH_QUEUE_MAX", "16"))  # queued hashes before shedding load
+    PASSWORD_HASH_SCHEME: str = os.getenv("PASSWORD_HASH_SCHEME", "bcrypt")  # bcrypt or argon2
+    PASSWORD_HASH_CALIBRATE: bool = os.getenv("PASSWORD_HASH_CALIBRATE", "true").lower() == "true"  # once per deployment, shared through Redis
+    PASSWORD_HASH_TARGET_MS: float = float(os.getenv("PASSWORD_HASH_TARGET_MS", "250"))
+    PASSWORD_HASH_CALIBRATION_VERSION: str = os.getenv("PASSWORD_HASH_CALIBRATION_VERSION", "1")  # bump to recalibrate, e.g. on new hardware
+    BCRYPT_MIN_ROUNDS: int = int(os.getenv("BCRYPT_MIN_ROUNDS", "10"))
+    BCRYPT_MAX_ROUNDS: int = int(os.getenv("BCRYPT_MAX_ROUNDS", "16"))
+    ARGON2_MIN_TIME_COST: int = int(os.getenv("ARGON2_MIN_TIME_COST", "2"))
     
     # Stripe settings
     STRIPE_SECRET_KEY: str = os.getenv("STRIPE_SECRET_KEY", "")
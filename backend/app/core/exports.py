@@ -0,0 +1,356 @@
+"""
+Admin exports of users, tool usages and payments as CSV, NDJSON or Parquet.
+
+Rows are read from a read replica when one is usable, through a server-side
+cursor in chunks of EXPORT_CHUNK_SIZE, and each chunk is encoded and
+handed on before the next is fetched, so memory stays constant however
+large the export. Exports are either streamed straight into the response
+or written to EXPORT_DIR by a background job whose state lives in Redis.
+"""
+
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+import secrets
+import time
+import zlib
+
+from sqlalchemy import Boolean, DateTime, Float, Integer, select
+import redis
+
+from app.core.config import settings
+from app.db.redis import get_redis, redis_call, RedisUnavailableError
+from app.db.replicas import replica_set
+from app.db.session import AsyncSessionLocal
+from app.models.models import Payment, ToolUsage, User
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional, only needed for Parquet exports
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+# Exported columns and the column the date filters apply to. Secrets and
+# free-form JSON (password hashes, tool inputs, payment details) stay out.
+DATASETS = {
+    "users": {
+        "columns": [
+            User.id, User.email, User.full_name, User.is_active, User.is_verified,
+            User.created_at, User.updated_at,
+        ],
+        "date_column": User.created_at,
+    },
+    "tool_usage": {
+        "columns": [
+            ToolUsage.id, ToolUsage.user_id, ToolUsage.tool_id, ToolUsage.status,
+            ToolUsage.started_at, ToolUsage.completed_at,
+        ],
+        "date_column": ToolUsage.started_at,
+    },
+    "payments": {
+        "columns": [
+            Payment.id, Payment.user_id, Payment.subscription_id, Payment.stripe_payment_id,
+            Payment.amount, Payment.currency, Payment.status, Payment.payment_method,
+            Payment.created_at,
+        ],
+        "date_column": Payment.created_at,
+    },
+}
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+JOB_KEY_PREFIX = "export:job:"
+
+# Limits concurrent export jobs in this worker
+_job_slots: Optional[asyncio.Semaphore] = None
+_running_jobs: Dict[str, asyncio.Task] = {}
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class CsvEncoder:
+    def __init__(self, names: List[str]):
+        self.names = names
+        self.header_written = False
+
+    def encode(self, rows: Sequence) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not self.header_written:
+            writer.writerow(self.names)
+            self.header_written = True
+        writer.writerows([_iso(value) for value in row] for row in rows)
+        return buffer.getvalue().encode()
+
+    def finish(self) -> bytes:
+        # An empty export still gets its header
+        return self.encode([]) if not self.header_written else b""
+
+
+class NdjsonEncoder:
+    def __init__(self, names: List[str]):
+        self.names = names
+
+    def encode(self, rows: Sequence) -> bytes:
+        return "".join(
+            json.dumps(dict(zip(self.names, row)), default=_iso) + "\n" for row in rows
+        ).encode()
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _ChunkSink:
+    """Write-only file object collecting what the Parquet writer emits until drained."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+class ParquetEncoder:
+    """Writes each chunk as a row group, so only the footer waits for the end."""
+
+    ARROW_TYPES = {Integer: "int64", Float: "float64", Boolean: "bool_", DateTime: "timestamp"}
+
+    def __init__(self, columns: List):
+        fields = []
+        for column in columns:
+            arrow_type = pyarrow.string()
+            for sql_type, name in self.ARROW_TYPES.items():
+                if isinstance(column.type, sql_type):
+                    arrow_type = pyarrow.timestamp("us") if name == "timestamp" else getattr(pyarrow, name)()
+                    break
+            fields.append(pyarrow.field(column.name, arrow_type))
+        self.schema = pyarrow.schema(fields)
+        self.sink = _ChunkSink()
+        self.writer = pyarrow.parquet.ParquetWriter(self.sink, self.schema, compression="snappy")
+
+    def encode(self, rows: Sequence) -> bytes:
+        if rows:
+            columns = list(zip(*rows))
+            self.writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+                schema=self.schema,
+            ))
+        return self.sink.drain()
+
+    def finish(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+
+def check_format(fmt: str, compress: bool) -> Optional[str]:
+    """Return why an export in this format cannot be produced, or None."""
+    if fmt == "parquet":
+        if pyarrow is None:
+            return "Parquet exports need pyarrow installed"
+        if compress:
+            return "Parquet files are compressed internally; gzip is only available for csv and ndjson"
+    return None
+
+
+def export_filename(dataset: str, fmt: str, compress: bool) -> str:
+    name = f"{dataset}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.{FORMATS[fmt][1]}"
+    return f"{name}.gz" if compress else name
+
+
+async def _row_chunks(dataset: str, start: Optional[datetime], end: Optional[datetime]) -> AsyncIterator[List]:
+    spec = DATASETS[dataset]
+    date_column = spec["date_column"]
+    primary_key = spec["columns"][0]
+    # Ordered along the date column's index so the scan is streamed, not sorted
+    query = select(*spec["columns"]).order_by(date_column, primary_key)
+    if start is not None:
+        query = query.where(date_column >= start)
+    if end is not None:
+        query = query.where(date_column < end)
+
+    # Exports never need read-your-writes, so any usable replica will do
+    async with AsyncSessionLocal(info={"replica": replica_set.choose()}) as db:
+        result = await db.stream(query.execution_options(yield_per=settings.EXPORT_CHUNK_SIZE))
+        async for rows in result.partitions():
+            yield rows
+
+
+async def export_stream(
+    dataset: str,
+    fmt: str,
+    compress: bool = False,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> AsyncIterator[bytes]:
+    """Yield the encoded export, gzipped when compress is set, one chunk of rows at a time."""
+    columns = DATASETS[dataset]["columns"]
+    if fmt == "csv":
+        encoder = CsvEncoder([column.name for column in columns])
+    elif fmt == "ndjson":
+        encoder = NdjsonEncoder([column.name for column in columns])
+    else:
+        encoder = ParquetEncoder(columns)
+    # wbits=31 produces a gzip container rather than a raw zlib stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    async for rows in _row_chunks(dataset, start, end):
+        data = encoder.encode(rows)
+        if compressor is not None:
+            data = compressor.compress(data)
+        if data:
+            yield data
+    data = encoder.finish()
+    if compressor is not None:
+        data = compressor.compress(data) + compressor.flush()
+    if data:
+        yield data
+
+
+def _job_key(job_id: str) -> str:
+    return f"{JOB_KEY_PREFIX}{job_id}"
+
+
+def job_path(job: Dict) -> str:
+    return os.path.join(settings.EXPORT_DIR, job["filename"])
+
+
+async def _update_job(job_id: str, **fields) -> None:
+    try:
+        await redis_call(get_redis().hset, _job_key(job_id), mapping={
+            name: "" if value is None else value for name, value in fields.items()
+        })
+    except redis.RedisError as e:
+        if not isinstance(e, RedisUnavailableError):
+            logger.error(f"Redis error updating export job {job_id}: {e}")
+
+
+async def get_job(job_id: str) -> Optional[Dict]:
+    """Return the job's state, or None when it does not exist or has expired."""
+    job = await redis_call(get_redis().hgetall, _job_key(job_id))
+    return job or None
+
+
+async def _run_job(job_id: str, job: Dict) -> None:
+    global _job_slots
+    if _job_slots is None:
+        _job_slots = asyncio.Semaphore(settings.EXPORT_MAX_CONCURRENT_JOBS)
+    path = job_path(job)
+    partial_path = f"{path}.part"
+    async with _job_slots:
+        await _update_job(job_id, status="running", started_at=time.time())
+        try:
+            os.makedirs(settings.EXPORT_DIR, exist_ok=True)
+            with open(partial_path, "wb") as output:
+                async for data in export_stream(
+                    job["dataset"],
+                    job["format"],
+                    job["gzip"] == "1",
+                    datetime.fromisoformat(job["from"]) if job["from"] else None,
+                    datetime.fromisoformat(job["to"]) if job["to"] else None,
+                ):
+                    await asyncio.to_thread(output.write, data)
+            # Renamed only when complete so a download never sees a partial file
+            os.replace(partial_path, path)
+        except asyncio.CancelledError:
+            await _update_job(job_id, status="failed", error="Interrupted by shutdown", finished_at=time.time())
+            raise
+        except Exception as e:
+            logger.error(f"Export job {job_id} failed: {e}")
+            await _update_job(job_id, status="failed", error=str(e), finished_at=time.time())
+        else:
+            await _update_job(
+                job_id, status="completed", size_bytes=os.path.getsize(path), finished_at=time.time()
+            )
+            logger.info(f"Export job {job_id} wrote {job['filename']}")
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            _running_jobs.pop(job_id, None)
+
+
+async def create_job(
+    dataset: str,
+    fmt: str,
+    compress: bool,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    user_id: int,
+) -> Dict:
+    """Record a queued export job in Redis and start it in this worker."""
+    job_id = secrets.token_urlsafe(16)
+    job = {
+        "id": job_id,
+        "dataset": dataset,
+        "format": fmt,
+        "gzip": "1" if compress else "0",
+        "from": start.isoformat() if start else "",
+        "to": end.isoformat() if end else "",
+        "filename": f"{job_id}-{export_filename(dataset, fmt, compress)}",
+        "status": "queued",
+        "created_by": user_id,
+        "created_at": time.time(),
+    }
+    async with get_redis().pipeline(transaction=False) as pipe:
+        pipe.hset(_job_key(job_id), mapping=job)
+        pipe.expire(_job_key(job_id), int(settings.EXPORT_RETENTION_HOURS * 3600))
+        await redis_call(pipe.execute)
+    _running_jobs[job_id] = asyncio.get_running_loop().create_task(
+        _run_job(job_id, job), name=f"export_{job_id}"
+    )
+    return job
+
+
+async def cancel_jobs() -> None:
+    """Cancel the jobs running in this worker, marking them failed."""
+    for task in list(_running_jobs.values()):
+        task.cancel()
+    await asyncio.gather(*_running_jobs.values(), return_exceptions=True)
+    _running_jobs.clear()
+
+
+async def purge_expired_exports() -> None:
+    """Delete export files older than EXPORT_RETENTION_HOURS, whose jobs have expired too."""
+    if not os.path.isdir(settings.EXPORT_DIR):
+        return
+    cutoff = time.time() - settings.EXPORT_RETENTION_HOURS * 3600
+    removed = 0
+    with os.scandir(settings.EXPORT_DIR) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+    if removed:
+        logger.info(f"Removed {removed} expired export files")
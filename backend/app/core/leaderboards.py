@@ -0,0 +1,119 @@
+"""
+Top tools and top users by tool usages, all time and per UTC month, kept as
+Redis sorted sets scored by usage count.
+
+Usage starts are added with ZINCRBY after commit, and reads are a
+ZREVRANGE, so neither depends on the size of tool_usage. reconcile()
+rebuilds the sets from the database periodically to correct drift; usages
+committed while it runs can be missed until the next run.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from sqlalchemy import func, select
+import redis
+
+from app.core.config import settings
+from app.db.redis import get_redis, redis_call, RedisUnavailableError
+from app.db.replicas import replica_set
+from app.db.session import AsyncSessionLocal
+from app.models.models import ToolUsage
+
+logger = logging.getLogger(__name__)
+
+RECONCILED_KEY = "leaderboard:reconciled_at"
+RECONCILE_LOCK_KEY = "leaderboard:reconcile_lock"
+ZADD_CHUNK = 1000
+SUBJECTS = {"tools": ToolUsage.tool_id, "users": ToolUsage.user_id}
+
+
+def leaderboard_key(subject: str, month: Optional[str] = None) -> str:
+    """Key of the all-time board, or of a month's board when month is YYYY-MM."""
+    return f"leaderboard:{subject}:{month or 'all'}"
+
+
+def _month_expire_seconds() -> int:
+    return settings.LEADERBOARD_MONTHS_KEPT * 31 * 86400
+
+
+def add_usages(pipe, usages: List[Tuple[int, int, float]]) -> None:
+    """Queue ZINCRBYs on pipe for (user_id, tool_id, started epoch) usages."""
+    expire_seconds = _month_expire_seconds()
+    for user_id, tool_id, timestamp in usages:
+        month = datetime.utcfromtimestamp(timestamp).strftime("%Y-%m")
+        for subject, member in (("tools", tool_id), ("users", user_id)):
+            pipe.zincrby(leaderboard_key(subject), 1, member)
+            pipe.zincrby(leaderboard_key(subject, month), 1, member)
+            pipe.expire(leaderboard_key(subject, month), expire_seconds)
+
+
+async def read_leaderboard(subject: str, month: Optional[str], limit: Optional[int]) -> Optional[List[Tuple[int, int]]]:
+    """
+    Return [(id, usage count)] from a board, highest first, or None when the
+    boards have not been built yet or the requested board does not exist.
+    reconcile() only builds the all-time and current month boards, so
+    earlier months, and months whose key expired, are not served from here.
+    """
+    key = leaderboard_key(subject, month)
+    async with get_redis().pipeline(transaction=False) as pipe:
+        pipe.exists(RECONCILED_KEY)
+        pipe.exists(key)
+        pipe.zrevrange(key, 0, (limit or 0) - 1, withscores=True)
+        reconciled, board_exists, entries = await redis_call(pipe.execute)
+    if not reconciled or not board_exists:
+        return None
+    return [(int(member), int(score)) for member, score in entries]
+
+
+async def _write_board(key: str, counts: Dict[int, int], expire_seconds: Optional[int] = None) -> None:
+    # Built under a staging key and renamed so readers never see it half filled
+    staging_key = f"{key}:staging"
+    await redis_call(get_redis().delete, staging_key)
+    items = list(counts.items())
+    for start in range(0, len(items), ZADD_CHUNK):
+        await redis_call(get_redis().zadd, staging_key, dict(items[start:start + ZADD_CHUNK]))
+    if not items:
+        await redis_call(get_redis().delete, key)
+        return
+    await redis_call(get_redis().rename, staging_key, key)
+    if expire_seconds:
+        await redis_call(get_redis().expire, key, expire_seconds)
+
+
+async def reconcile() -> None:
+    """Rebuild the all-time and current month boards from tool_usage; one worker at a time."""
+    lock_ttl = max(60, int(settings.LEADERBOARD_RECONCILE_INTERVAL_SECONDS / 2))
+    try:
+        if not await redis_call(get_redis().set, RECONCILE_LOCK_KEY, 1, nx=True, ex=lock_ttl):
+            return
+    except redis.RedisError as e:
+        if not isinstance(e, RedisUnavailableError):
+            logger.error(f"Redis error taking leaderboard reconcile lock: {e}")
+        return
+
+    month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    month = month_start.strftime("%Y-%m")
+    boards: Dict[str, Tuple[Dict[int, int], Optional[int]]] = {}
+    # The boards only have to be eventually right, so any usable replica will do
+    async with AsyncSessionLocal(info={"replica": replica_set.choose()}) as db:
+        for subject, column in SUBJECTS.items():
+            result = await db.execute(select(column, func.count(ToolUsage.id)).group_by(column))
+            boards[leaderboard_key(subject)] = (dict(result.all()), None)
+            result = await db.execute(
+                select(column, func.count(ToolUsage.id))
+                .where(ToolUsage.started_at >= month_start)
+                .group_by(column)
+            )
+            boards[leaderboard_key(subject, month)] = (dict(result.all()), _month_expire_seconds())
+
+    try:
+        for key, (counts, expire_seconds) in boards.items():
+            await _write_board(key, counts, expire_seconds)
+        await redis_call(get_redis().set, RECONCILED_KEY, datetime.utcnow().isoformat())
+    except redis.RedisError as e:
+        if not isinstance(e, RedisUnavailableError):
+            logger.error(f"Redis error writing leaderboards: {e}")
+        return
+    logger.info(f"Reconciled leaderboards for all time and {month}")
@@ -0,0 +1,99 @@
+import logging
+import time
+import uuid
+
+import redis
+
+from app.core.config import settings
+from app.db.redis import get_redis, redis_call, RedisUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+def _failures_key(scope: str, identifier: str) -> str:
+    return f"login:failures:{scope}:{identifier}"
+
+
+def _lock_key(scope: str, identifier: str) -> str:
+    return f"login:lock:{scope}:{identifier}"
+
+
+def _lockouts_key(scope: str, identifier: str) -> str:
+    return f"login:lockouts:{scope}:{identifier}"
+
+
+async def get_lockout_remaining(account: str, ip_address: str) -> int:
+    """
+    Return the number of seconds the account or IP is still locked out for,
+    or 0 if a login attempt is allowed.
+    """
+    account = account.lower()
+    try:
+        async with get_redis().pipeline(transaction=False) as pipe:
+            pipe.ttl(_lock_key("account", account))
+            pipe.ttl(_lock_key("ip", ip_address))
+            account_ttl, ip_ttl = await redis_call(pipe.execute)
+    except redis.RedisError as e:
+        # Fail open: the per-IP rate limiter still applies
+        if not isinstance(e, RedisUnavailableError):
+            logger.error(f"Redis error in login throttle: {e}")
+        return 0
+
+    return max(account_ttl or 0, ip_ttl or 0, 0)
+
+
+async def _record(scope: str, identifier: str, max_failures: int, now: float) -> None:
+    """Add a failure to a sliding window and lock the key out if it overflows."""
+    window = settings.LOGIN_FAILURE_WINDOW_SECONDS
+    failures_key = _failures_key(scope, identifier)
+
+    client = get_redis()
+    async with client.pipeline(transaction=True) as pipe:
+        pipe.zremrangebyscore(failures_key, 0, now - window)
+        pipe.zadd(failures_key, {f"{now}:{uuid.uuid4().hex[:8]}": now})
+        pipe.zcard(failures_key)
+        pipe.expire(failures_key, window)
+        _, _, failures, _ = await redis_call(pipe.execute)
+
+    if failures < max_failures:
+        return
+
+    # Each consecutive lockout doubles the previous one, up to the cap
+    lockouts_key = _lockouts_key(scope, identifier)
+    lockouts = await redis_call(client.incr, lockouts_key)
+    await redis_call(client.expire, lockouts_key, settings.LOGIN_LOCKOUT_MAX_SECONDS * 2)
+    duration = min(
+        settings.LOGIN_LOCKOUT_BASE_SECONDS * (2 ** (lockouts - 1)),
+        settings.LOGIN_LOCKOUT_MAX_SECONDS,
+    )
+
+    async with client.pipeline(transaction=False) as pipe:
+        pipe.set(_lock_key(scope, identifier), 1, ex=duration)
+        pipe.delete(failures_key)
+        await redis_call(pipe.execute)
+    logger.warning(f"Login locked out for {scope} {identifier} for {duration}s after {failures} failures")
+
+
+async def record_failed_login(account: str, ip_address: str) -> None:
+    """Record a failed login attempt against both the account and the IP."""
+    now = time.time()
+    try:
+        await _record("account", account.lower(), settings.LOGIN_MAX_FAILURES_PER_ACCOUNT, now)
+        await _record("ip", ip_address, settings.LOGIN_MAX_FAILURES_PER_IP, now)
+    except redis.RedisError as e:
+        if not isinstance(e, RedisUnavailableError):
+            logger.error(f"Redis error in login throttle: {e}")
+
+
+async def reset_failed_logins(account: str) -> None:
+    """
+    Clear the failure history of an account after a successful login.
+    The per-IP history is kept so one valid account cannot be used to
+    launder failures against other accounts from the same address.
+    """
+    account = account.lower()
+    try:
+        await redis_call(get_redis().delete, _failures_key("account", account), _lockouts_key("account", account))
+    except redis.RedisError as e:
+        if not isinstance(e, RedisUnavailableError):
+            logger.error(f"Redis error in login throttle: {e}")
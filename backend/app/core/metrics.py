@@ -0,0 +1,50 @@
+from typing import Dict, Sequence
+import threading
+
+# Default latency buckets in milliseconds
+DEFAULT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class Histogram:
+    """Cumulative latency histogram reported by the metrics endpoint."""
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = [0] * (len(self.buckets_ms) + 1)
+            self.count = 0
+            self.total_ms = 0.0
+            self.max_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Record one observation given in seconds."""
+        value_ms = seconds * 1000
+        with self._lock:
+            index = len(self.buckets_ms)
+            for i, bound in enumerate(self.buckets_ms):
+                if value_ms <= bound:
+                    index = i
+                    break
+            self._counts[index] += 1
+            self.count += 1
+            self.total_ms += value_ms
+            self.max_ms = max(self.max_ms, value_ms)
+
+    def snapshot(self) -> Dict:
+        """Return counts per upper bound ("le" in milliseconds) plus totals."""
+        with self._lock:
+            buckets = {}
+            cumulative = 0
+            for bound, count in zip(list(self.buckets_ms) + ["inf"], self._counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            return {
+                "count": self.count,
+                "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+                "max_ms": round(self.max_ms, 3),
+                "le_ms": buckets,
+            }
@@ -0,0 +1,315 @@
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+import logging
+import math
+import time
+
+import redis
+
+from app.core.config import settings
+from app.db.redis import get_redis, redis_call, RedisUnavailableError
+
+logger = logging.getLogger(__name__)
+
+# Sliding window counter evaluated atomically in a single round trip.
+# The previous fixed window is weighted by how much of it still overlaps the
+# sliding window, and the hit is only counted when it is allowed.
+# Returns {allowed, remaining, reset_ms, current, previous}; on a denial
+# reset_ms is the time until the request would be allowed again.
+SLIDING_WINDOW_SCRIPT = """
+local current_key = KEYS[1]
+local previous_key = KEYS[2]
+local limit = tonumber(ARGV[1])
+local window_ms = tonumber(ARGV[2])
+local now_ms = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+
+local elapsed = now_ms % window_ms
+local weight = (window_ms - elapsed) / window_ms
+local previous = tonumber(redis.call('GET', previous_key) or '0')
+local current = tonumber(redis.call('GET', current_key) or '0')
+local estimate = previous * weight + current
+
+if estimate + cost > limit then
+    local retry_ms = window_ms - elapsed
+    if previous > 0 and current + cost <= limit then
+        local target_weight = (limit - current - cost) / previous
+        retry_ms = math.ceil((weight - target_weight) * window_ms)
+    end
+    return {0, 0, retry_ms, current, previous}
+end
+
+redis.call('INCRBY', current_key, cost)
+redis.call('PEXPIRE', current_key, window_ms * 2)
+return {1, math.floor(limit - estimate - cost), window_ms - elapsed, current + cost, previous}
+"""
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float  # seconds until the window resets, or until retry on a denial
+
+
+class _LocalState:
+    """Last known global counts for a key plus hits not yet pushed to Redis."""
+
+    __slots__ = ("limit", "window", "window_index", "current", "previous", "pending", "local_budget", "synced_at")
+
+    def __init__(self, limit: int, window: int, window_index: int, current: int, previous: int, synced_at: float):
+        self.limit = limit
+        self.window = window
+        self.window_index = window_index
+        self.current = current
+        self.previous = previous
+        self.pending = 0
+        self.local_budget = 0
+        self.synced_at = synced_at
+
+
+class SlidingWindowRateLimiter:
+    """
+    Two-tier sliding window rate limiter.
+
+    Each worker answers from a local copy of a key's global count while the
+    key is comfortably below its limit, and pushes the hits it admitted to
+    Redis in one pipeline every RATE_LIMIT_SYNC_INTERVAL_SECONDS. Once a key
+    gets within RATE_LIMIT_LOCAL_ERROR_BOUND of its limit, or its local copy
+    is stale, every hit goes through the exact single-EVALSHA path instead.
+    Between syncs one worker can admit at most error_bound * limit hits for
+    a key on its own, which bounds the overshoot per worker.
+
+    While Redis is unavailable (errors, timeouts or an open circuit) hits are
+    counted in a purely local window with the limit split across
+    RATE_LIMIT_DEGRADED_WORKERS workers.
+    """
+
+    def __init__(self, prefix: str = "rate_limit"):
+        self.prefix = prefix
+        self.local_enabled = settings.RATE_LIMIT_LOCAL_ENABLED
+        self.error_bound = settings.RATE_LIMIT_LOCAL_ERROR_BOUND
+        self.max_keys = settings.RATE_LIMIT_LOCAL_MAX_KEYS
+        self.sync_interval = settings.RATE_LIMIT_SYNC_INTERVAL_SECONDS
+        self.degraded_workers = max(1, settings.RATE_LIMIT_DEGRADED_WORKERS)
+        self._script = None
+        # Local-only [window_index, current, previous] counts used while Redis is down
+        self._degraded: "OrderedDict[str, list]" = OrderedDict()
+        self._states: "OrderedDict[str, _LocalState]" = OrderedDict()
+        # Hits admitted locally in a window that has since rolled over
+        self._unflushed: Dict[Tuple[str, int, int], int] = {}
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.degraded_hits = 0
+        self.syncs = 0
+
+    def _get_script(self):
+        # Bind the script to the shared client once it exists (EVALSHA with EVAL fallback)
+        client = get_redis()
+        if self._script is None or self._script.registered_client is not client:
+            self._script = client.register_script(SLIDING_WINDOW_SCRIPT)
+        return self._script
+
+    def window_keys(self, key: str, window: int, index: int):
+        """Return the Redis keys of a fixed window and the one before it."""
+        # The hash tag keeps both windows of a key in the same cluster slot
+        return (
+            f"{self.prefix}:{{{key}}}:{index}",
+            f"{self.prefix}:{{{key}}}:{index - 1}",
+        )
+
+    def _try_local(self, key: str, limit: int, window: int, cost: int, now: float) -> Optional[RateLimitResult]:
+        """Admit the hit from local state if it is fresh and far from the limit."""
+        state = self._states.get(key)
+        if state is None or state.window != window or state.limit != limit:
+            return None
+
+        if state.window_index != int(now // window):
+            # Window rolled over: re-read the new window through the exact path
+            self._drop(key, state)
+            return None
+
+        if now - state.synced_at > self.sync_interval * 2 or state.local_budget < cost:
+            return None
+
+        elapsed = now % window
+        weight = (window - elapsed) / window
+        estimate = state.previous * weight + state.current + state.pending
+        if estimate + cost > limit * (1 - self.error_bound):
+            return None
+
+        state.pending += cost
+        state.local_budget -= cost
+        self._states.move_to_end(key)
+        self.local_hits += 1
+        return RateLimitResult(
+            allowed=True,
+            limit=limit,
+            remaining=max(0, math.floor(limit - estimate - cost)),
+            reset_after=math.ceil(window - elapsed),
+        )
+
+    def _remember(self, key: str, limit: int, window: int, index: int, current: int, previous: int, now: float) -> None:
+        """Refresh the local copy of a key's global counts after an exact check."""
+        state = self._states.get(key)
+        if state is not None and (state.limit, state.window, state.window_index) != (limit, window, index):
+            # Counts of another window or limit (rollover, plan change) cannot be reused
+            self._drop(key, state)
+            state = None
+        if state is None:
+            if len(self._states) >= self.max_keys and not self._evict_one():
+                return
+            state = _LocalState(limit, window, index, current, previous, now)
+            state.local_budget = self._local_allowance(limit)
+            self._states[key] = state
+        else:
+            # The budget is only refilled by sync(), once the hits admitted
+            # against it have reached Redis; refilling it here would let a
+            # worker admit error_bound * limit hits after every exact check
+            state.current = current
+            state.previous = previous
+            state.synced_at = now
+        self._states.move_to_end(key)
+
+    def _drop(self, key: str, state: _LocalState) -> None:
+        """Forget a key's local state, parking its pending hits for the next sync."""
+        if state.pending:
+            parked = (key, state.window, state.window_index)
+            self._unflushed[parked] = self._unflushed.get(parked, 0) + state.pending
+        del self._states[key]
+
+    def _local_allowance(self, limit: int) -> int:
+        """Hits one worker may admit for a key between two syncs."""
+        return max(1, math.floor(limit * self.error_bound))
+
+    def _evict_one(self) -> bool:
+        """Drop the least recently used key that has nothing left to flush."""
+        for key, state in self._states.items():
+            if not state.pending:
+                del self._states[key]
+                return True
+        return False
+
+    def _degraded_hit(self, key: str, limit: int, window: int, cost: int, now: float) -> RateLimitResult:
+        """Count a hit in a local-only sliding window while Redis is unavailable."""
+        local_limit = max(1, limit // self.degraded_workers)
+        index = int(now // window)
+
+        counts = self._degraded.get(key)
+        if counts is None or counts[0] < index - 1:
+            counts = [index, 0, 0]
+        elif counts[0] == index - 1:
+            counts = [index, 0, counts[1]]
+        self._degraded[key] = counts
+        self._degraded.move_to_end(key)
+        while len(self._degraded) > self.max_keys:
+            self._degraded.popitem(last=False)
+
+        elapsed = now % window
+        estimate = counts[2] * (window - elapsed) / window + counts[1]
+        self.degraded_hits += 1
+        if estimate + cost > local_limit:
+            return RateLimitResult(allowed=False, limit=limit, remaining=0, reset_after=math.ceil(window - elapsed))
+
+        counts[1] += cost
+        return RateLimitResult(
+            allowed=True,
+            limit=limit,
+            remaining=max(0, math.floor(local_limit - estimate - cost)),
+            reset_after=math.ceil(window - elapsed),
+        )
+
+    async def hit(self, key: str, limit: int, window: int, cost: int = 1) -> RateLimitResult:
+        """Count a hit against key and return whether it is allowed."""
+        now = time.time()
+
+        if self.local_enabled:
+            result = self._try_local(key, limit, window, cost, now)
+            if result is not None:
+                return result
+
+        index = int(now // window)
+        try:
+            allowed, remaining, reset_ms, current, previous = await redis_call(
+                self._get_script(),
+                keys=self.window_keys(key, window, index),
+                args=[limit, window * 1000, int(now * 1000), cost],
+            )
+        except redis.RedisError as e:
+            if not isinstance(e, RedisUnavailableError):
+                logger.error(f"Redis error in rate limiter: {e}")
+            return self._degraded_hit(key, limit, window, cost, now)
+        self.redis_hits += 1
+
+        if self.local_enabled:
+            self._remember(key, limit, window, index, int(current), int(previous), now)
+
+        return RateLimitResult(
+            allowed=bool(allowed),
+            limit=limit,
+            remaining=max(0, int(remaining)),
+            reset_after=math.ceil(int(reset_ms) / 1000),
+        )
+
+    async def sync(self) -> None:
+        """Push locally admitted hits to Redis and refresh global counts in one pipeline."""
+        flushes = []
+        for key, state in self._states.items():
+            if state.pending:
+                flushes.append((key, state.window, state.window_index, state.pending, state))
+        for (key, window, index), pending in self._unflushed.items():
+            flushes.append((key, window, index, pending, None))
+        unflushed, self._unflushed = self._unflushed, {}
+
+        if not flushes:
+            return
+
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                for key, window, index, pending, _ in flushes:
+                    current_key, previous_key = self.window_keys(key, window, index)
+                    pipe.incrby(current_key, pending)
+                    pipe.pexpire(current_key, window * 2000)
+                    pipe.get(previous_key)
+                results = await redis_call(pipe.execute)
+        except redis.RedisError as e:
+            # Keep everything pending and retry on the next sync
+            for parked, pending in unflushed.items():
+                self._unflushed[parked] = self._unflushed.get(parked, 0) + pending
+            if not isinstance(e, RedisUnavailableError):
+                logger.error(f"Redis error in rate limit sync: {e}")
+            return
+
+        now = time.time()
+        for i, (key, window, index, pending, state) in enumerate(flushes):
+            if state is None:
+                continue
+            if self._states.get(key) is not state or state.window_index != index:
+                # The window rolled over mid-sync and parked these hits again
+                parked = (key, window, index)
+                if parked in self._unflushed:
+                    self._unflushed[parked] -= pending
+                    if self._unflushed[parked] <= 0:
+                        del self._unflushed[parked]
+                continue
+            # Hits admitted while the pipeline was in flight stay pending
+            state.pending -= pending
+            state.current = int(results[i * 3])
+            state.previous = int(results[i * 3 + 2] or 0)
+            state.local_budget = self._local_allowance(state.limit) - state.pending
+            state.synced_at = now
+        self.syncs += 1
+
+    def stats(self) -> Dict:
+        """Return counters for the metrics endpoint."""
+        return {
+            "local_enabled": self.local_enabled,
+            "local_keys": len(self._states),
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "degraded_hits": self.degraded_hits,
+            "syncs": self.syncs,
+        }
+
+
+rate_limiter = SlidingWindowRateLimiter()
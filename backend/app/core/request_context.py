@@ -0,0 +1,24 @@
+from contextvars import ContextVar
+from typing import Optional
+
+# Per-request values set by the ASGI middleware. Pure ASGI middleware runs in
+# the same task as the endpoint, so these are visible to route handlers,
+# dependencies and anything they call.
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+route_var: ContextVar[Optional[str]] = ContextVar("route", default=None)
+user_id_var: ContextVar[Optional[str]] = ContextVar("user_id", default=None)
+
+
+def get_request_id() -> Optional[str]:
+    """Return the id of the request being handled, if any."""
+    return request_id_var.get()
+
+
+def get_route() -> Optional[str]:
+    """Return the route template of the request being handled, e.g. /tools/{tool_id}."""
+    return route_var.get()
+
+
+def get_user_id() -> Optional[str]:
+    """Return the authenticated user id of the request being handled, if known."""
+    return user_id_var.get()
@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Any, Dict, Optional, Union
 
@@ -5,23 +6,50 @@ from jose import jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import json
 import logging
+import math
+import threading
+import time
+
+import redis
 
 from app.core.config import settings
+from app.core.token_cache import token_cache
+from app.db.redis import get_redis, redis_call, RedisUnavailableError
+from app.db.queries import USER_BY_ID
 from app.db.session import get_db
-from app.models.models import User, RefreshToken, Role
+from app.models.models import User, RefreshToken, Role, OneTimeToken
+import hashlib
 import secrets
 import string
 
 logger = logging.getLogger(__name__)
 
-# Password hashing context
+# Password hashing context, re-tuned at startup by configure_password_hashing()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Cost calibrated by the first worker, shared with the others through Redis
+PASSWORD_HASH_COST_KEY_PREFIX = "password_hash:cost:"
+
+# Cost parameters currently in use, reported by the metrics endpoint
+hash_cost: Dict[str, Any] = {"scheme": "bcrypt", "rounds": None, "measured_ms": None}
+
 # OAuth2 password bearer for FastAPI
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Dedicated pool for password hashing so bcrypt never runs on the event loop
+hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+# Hashes queued or running in the pool; the pool's threads release them
+_hashes_in_flight = 0
+_hashes_lock = threading.Lock()
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash."""
     return pwd_context.verify(plain_password, hashed_password)
@@ -30,6 +58,172 @@ def get_password_hash(password: str) -> str:
     """Hash a password."""
     return pwd_context.hash(password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    """
+    Verify a password and return (is_valid, new_hash).
+    new_hash is set when the stored hash uses an outdated scheme or cost.
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def _time_hash(context: CryptContext, samples: int = 3) -> float:
+    """Return the best of a few hash timings in milliseconds."""
+    best = None
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.hash("calibration-password")
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def _apply_hash_cost(scheme: str, rounds: int, measured: Optional[float]) -> Dict[str, Any]:
+    """Reconfigure pwd_context to hash with scheme at the given cost."""
+    if scheme == "argon2":
+        pwd_context.update(
+            schemes=["argon2", "bcrypt"],
+            default="argon2",
+            deprecated=["bcrypt"],
+            argon2__rounds=rounds,
+            argon2__min_rounds=rounds,
+        )
+    else:
+        pwd_context.update(
+            schemes=["bcrypt"],
+            default="bcrypt",
+            bcrypt__rounds=rounds,
+            bcrypt__min_rounds=rounds,
+        )
+    hash_cost.update({
+        "scheme": scheme,
+        "rounds": rounds,
+        "measured_ms": round(measured, 1) if measured is not None else None,
+    })
+    return dict(hash_cost)
+
+def _hash_scheme() -> str:
+    scheme = settings.PASSWORD_HASH_SCHEME
+    if scheme == "argon2" and not CryptContext(schemes=["argon2"]).handler().has_backend():
+        logger.error("argon2 requested but argon2-cffi is not installed, falling back to bcrypt")
+        scheme = "bcrypt"
+    return scheme
+
+def calibrate_password_hashing(target_ms: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Pick the hashing cost that lands closest to target_ms per hash on this
+    machine and reconfigure pwd_context with it.
+    Hashes below the chosen cost are flagged by needs_update and upgraded
+    on the user's next successful login.
+    """
+    target_ms = target_ms or settings.PASSWORD_HASH_TARGET_MS
+    scheme = _hash_scheme()
+    
+    if scheme == "argon2":
+        # Argon2 time cost scales linearly with the number of passes
+        probe = CryptContext(schemes=["argon2"], argon2__rounds=1)
+        measured = _time_hash(probe)
+        rounds = max(settings.ARGON2_MIN_TIME_COST, round(target_ms / measured))
+    else:
+        # bcrypt cost is logarithmic: every extra round doubles the work
+        min_rounds = settings.BCRYPT_MIN_ROUNDS
+        probe = CryptContext(schemes=["bcrypt"], bcrypt__rounds=min_rounds)
+        measured = _time_hash(probe)
+        extra = math.floor(math.log2(max(target_ms / measured, 1)))
+        rounds = min(min_rounds + extra, settings.BCRYPT_MAX_ROUNDS)
+        measured = measured * (2 ** (rounds - min_rounds))
+    
+    cost = _apply_hash_cost(scheme, rounds, measured)
+    logger.info(f"Password hashing calibrated: {scheme} cost {rounds} (~{measured:.0f} ms per hash, target {target_ms} ms)")
+    return cost
+
+async def configure_password_hashing() -> Dict[str, Any]:
+    """
+    Apply the hashing cost shared by all workers.
+    The first worker to start calibrates and stores its cost in Redis; the
+    others, and later restarts, reuse it. Calibrating in every worker would
+    give each a slightly different cost, and since hashes below the cost
+    are upgraded on login, users would be rehashed back and forth as their
+    requests land on different workers.
+    
+    The stored cost does not expire, as a worker recalibrating on its own
+    would disagree with the others again. Changing the scheme or target, or
+    bumping PASSWORD_HASH_CALIBRATION_VERSION after moving to different
+    hardware, makes the next worker to start calibrate under a new key; the
+    others pick the new cost up when they restart.
+    """
+    scheme = _hash_scheme()
+    key = (
+        f"{PASSWORD_HASH_COST_KEY_PREFIX}v{settings.PASSWORD_HASH_CALIBRATION_VERSION}:"
+        f"{scheme}:{settings.PASSWORD_HASH_TARGET_MS:g}"
+    )
+    try:
+        stored = await redis_call(get_redis().get, key)
+        if stored is None:
+            cost = await asyncio.to_thread(calibrate_password_hashing)
+            if await redis_call(get_redis().set, key, json.dumps(cost), nx=True):
+                return cost
+            # Another worker stored its cost first
+            stored = await redis_call(get_redis().get, key)
+    except redis.RedisError as e:
+        if not isinstance(e, RedisUnavailableError):
+            logger.error(f"Redis error reading the password hashing cost: {e}")
+        # The default context upgrades no hashes, unlike a cost of this
+        # worker's own that other workers would disagree with
+        logger.warning("Password hashing cost unavailable, keeping the default cost")
+        return dict(hash_cost)
+    
+    cost = json.loads(stored)
+    return _apply_hash_cost(cost["scheme"], cost["rounds"], cost["measured_ms"])
+
+async def _run_in_hash_pool(func, *args):
+    """
+    Run a hashing function in the hash pool.
+    Sheds load with a 503 instead of queueing once every worker is busy
+    and PASSWORD_HASH_QUEUE_MAX hashes are already waiting.
+    """
+    global _hashes_in_flight
+    
+    with _hashes_lock:
+        if _hashes_in_flight >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_MAX:
+            logger.warning("Password hash pool saturated, shedding request")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        _hashes_in_flight += 1
+    
+    # Released when the pool is done with the hash rather than when the
+    # caller stops waiting: a cancelled request leaves bcrypt running
+    future = hash_executor.submit(func, *args)
+    future.add_done_callback(_release_hash_slot)
+    return await asyncio.wrap_future(future)
+
+def _release_hash_slot(future) -> None:
+    global _hashes_in_flight
+    
+    with _hashes_lock:
+        _hashes_in_flight -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against a hash without blocking the event loop."""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str):
+    """Verify a password and compute an upgraded hash if needed, off the event loop."""
+    return await _run_in_hash_pool(verify_and_update_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password without blocking the event loop."""
+    return await _run_in_hash_pool(get_password_hash, password)
+
+def get_hash_pool_stats() -> Dict[str, int]:
+    """Return hash pool occupancy for the metrics endpoint."""
+    return {
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        "queue_max": settings.PASSWORD_HASH_QUEUE_MAX,
+        "in_flight": _hashes_in_flight,
+        "cost": dict(hash_cost),
+    }
+
 def create_access_token(
     subject: Union[str, Any], 
     expires_delta: Optional[timedelta] = None,
@@ -49,9 +243,9 @@ def create_access_token(
     
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
-def create_refresh_token(
+async def create_refresh_token(
     user_id: int, 
-    db: Session,
+    db: AsyncSession,
     device_info: Optional[str] = None,
     ip_address: Optional[str] = None
 ) -> str:
@@ -68,13 +262,27 @@ def create_refresh_token(
     )
     
     db.add(db_token)
-    db.commit()
+    await db.commit()
     
     return token
 
+def decode_access_token(token: str) -> Dict[str, Any]:
+    """
+    Decode and verify a JWT access token.
+    Verified claims are cached per token until expiry so the signature is
+    only checked once per token per worker.
+    """
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+    
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    token_cache.set(token, payload)
+    return payload
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> User:
     """Get current user from JWT token."""
     credentials_exception = HTTPException(
@@ -84,14 +292,15 @@ async def get_current_user(
     )
     
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_access_token(token)
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
     except jwt.JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
+    result = await db.execute(USER_BY_ID, {"user_id": int(user_id)})
+    user = result.scalar_one_or_none()
     if user is None:
         raise credentials_exception
     if not user.is_active:
@@ -122,6 +331,81 @@ def generate_password_reset_token() -> str:
     """Generate a password reset token."""
     return secrets.token_urlsafe(32)
 
+def hash_one_time_token(token: str) -> str:
+    """Hash a one-time token for storage and lookup."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+async def store_one_time_token(
+    db: AsyncSession,
+    user: User,
+    purpose: str,
+    token: str,
+    expires_at: datetime
+) -> None:
+    """
+    Store the hash of a one-time token for a user, replacing any outstanding
+    token with the same purpose. The caller commits.
+    """
+    if user.id is not None:
+        await db.execute(
+            delete(OneTimeToken).where(
+                OneTimeToken.user_id == user.id,
+                OneTimeToken.purpose == purpose
+            ).execution_options(synchronize_session=False)
+        )
+    
+    db.add(OneTimeToken(
+        user=user,
+        purpose=purpose,
+        token_hash=hash_one_time_token(token),
+        expires_at=expires_at
+    ))
+
+async def consume_one_time_token(db: AsyncSession, token: str, purpose: str) -> Optional[User]:
+    """
+    Look up a one-time token by its hash and delete it.
+    Returns the owning user, or None if the token is unknown, expired or
+    already used. The caller commits.
+    """
+    conditions = (
+        OneTimeToken.token_hash == hash_one_time_token(token),
+        OneTimeToken.purpose == purpose,
+        OneTimeToken.expires_at > datetime.utcnow(),
+    )
+    user_id = await db.scalar(select(OneTimeToken.user_id).where(*conditions))
+    if user_id is None:
+        return None
+    
+    # The DELETE is what claims the token: a concurrent request with the
+    # same token waits on the row lock and then deletes nothing
+    result = await db.execute(
+        delete(OneTimeToken).where(*conditions).execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return None
+    
+    result = await db.execute(USER_BY_ID, {"user_id": user_id})
+    return result.scalar_one()
+
+def _purge_expired_one_time_tokens() -> int:
+    from app.db.session import SessionLocal
+    
+    db = SessionLocal()
+    try:
+        deleted = db.query(OneTimeToken).filter(
+            OneTimeToken.expires_at <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+async def purge_expired_one_time_tokens() -> None:
+    """Delete expired one-time tokens."""
+    deleted = await asyncio.to_thread(_purge_expired_one_time_tokens)
+    if deleted:
+        logger.info(f"Purged {deleted} expired one-time tokens")
+
 async def create_admin_user():
     """Create admin user if it doesn't exist yet."""
     from app.db.session import SessionLocal
@@ -0,0 +1,37 @@
+from typing import Awaitable, Callable, List
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Background tasks started by this worker
+_tasks: List[asyncio.Task] = []
+
+
+async def _run_periodic(name: str, interval_seconds: float, func: Callable[[], Awaitable[None]]) -> None:
+    """Run func forever, sleeping interval_seconds between runs."""
+    while True:
+        try:
+            await func()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Periodic task {name} failed: {e}")
+        await asyncio.sleep(interval_seconds)
+
+
+def start_periodic_task(name: str, interval_seconds: float, func: Callable[[], Awaitable[None]]) -> None:
+    """Schedule an async job to run every interval_seconds on the running loop."""
+    task = asyncio.get_running_loop().create_task(
+        _run_periodic(name, interval_seconds, func), name=name
+    )
+    _tasks.append(task)
+    logger.info(f"Started periodic task {name} (every {interval_seconds}s)")
+
+
+async def stop_periodic_tasks() -> None:
+    """Cancel all periodic tasks and wait for them to finish."""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import hashlib
+import threading
+import time
+
+from app.core.config import settings
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of decoded JWT claims.
+
+    Entries are keyed by a SHA-256 digest of the raw token so the bearer
+    credential itself is never kept in memory, and they are evicted as soon
+    as the token's ``exp`` claim has passed.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return the cached claims for a token, or None on a miss."""
+        if self.max_size <= 0:
+            return None
+
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, payload = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def set(self, token: str, payload: Dict[str, Any]) -> None:
+        """Store decoded claims until the token expires."""
+        if self.max_size <= 0:
+            return
+
+        expires_at = payload.get("exp")
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for the metrics endpoint."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Per-worker cache used by the auth dependencies
+token_cache = TokenCache(max_size=settings.JWT_CACHE_SIZE)
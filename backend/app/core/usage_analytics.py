@@ -0,0 +1,196 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.models import AggregationWatermark, Subscription, ToolUsage, ToolUsageHourly
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = "tool_usage_hourly"
+BUCKETS = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+
+
+def bucket_floor(value: datetime, bucket: str) -> datetime:
+    """Return the start of the bucket containing value; weeks start on Monday."""
+    value = value.replace(minute=0, second=0, microsecond=0)
+    if bucket == "hour":
+        return value
+    value = value.replace(hour=0)
+    if bucket == "week":
+        value -= timedelta(days=value.weekday())
+    return value
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Timestamps are stored as naive UTC; convert aware inputs."""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _plan_at(subscriptions: List[Tuple[int, Optional[datetime]]], started_at: datetime) -> int:
+    for plan_id, end_date in subscriptions:
+        if end_date is None or end_date > started_at:
+            return plan_id
+    return 0
+
+
+async def _aggregate_batch() -> bool:
+    """
+    Fold the next batch of settled tool_usage rows into tool_usage_hourly.
+    Returns whether a full batch was processed, i.e. more rows may be waiting.
+    """
+    # Rows younger than this may have neighbours with lower ids whose
+    # transactions have not committed yet
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.USAGE_AGGREGATE_SETTLE_SECONDS)
+
+    async with AsyncSessionLocal() as db:
+        # Locking the watermark row keeps concurrent workers from folding the same rows twice
+        watermark = (await db.execute(
+            select(AggregationWatermark)
+            .where(AggregationWatermark.name == WATERMARK_NAME)
+            .with_for_update()
+        )).scalar_one_or_none()
+        if watermark is None:
+            watermark = AggregationWatermark(name=WATERMARK_NAME, last_id=0)
+            db.add(watermark)
+            try:
+                await db.flush()
+            except IntegrityError:
+                # Another worker created it first; pick it up on the next run
+                await db.rollback()
+                return False
+
+        rows = (await db.execute(
+            select(ToolUsage.id, ToolUsage.user_id, ToolUsage.tool_id, ToolUsage.started_at)
+            .where(ToolUsage.id > watermark.last_id)
+            .order_by(ToolUsage.id)
+            .limit(settings.USAGE_AGGREGATE_BATCH_SIZE)
+        )).all()
+
+        settled = []
+        for row in rows:
+            if row.started_at >= cutoff:
+                break
+            settled.append(row)
+        if not settled:
+            watermark.processed_until = min(cutoff, rows[0].started_at) if rows else cutoff
+            await db.commit()
+            return False
+
+        # Attribute each usage to the plan the user was on when it started
+        subscriptions: Dict[int, List[Tuple[int, Optional[datetime]]]] = {}
+        result = await db.execute(
+            select(Subscription.user_id, Subscription.plan_id, Subscription.end_date)
+            .where(
+                Subscription.user_id.in_({row.user_id for row in settled}),
+                Subscription.status == "active",
+            )
+            .order_by(Subscription.id)
+        )
+        for user_id, plan_id, end_date in result:
+            subscriptions.setdefault(user_id, []).append((plan_id, end_date))
+
+        counts: Counter = Counter()
+        for row in settled:
+            plan_id = _plan_at(subscriptions.get(row.user_id, []), row.started_at)
+            counts[(bucket_floor(row.started_at, "hour"), row.tool_id, plan_id)] += 1
+
+        # Merge into existing buckets; the watermark lock serializes writers
+        buckets = [key[0] for key in counts]
+        existing = {
+            (rollup.bucket_start, rollup.tool_id, rollup.plan_id): rollup
+            for rollup in (await db.execute(
+                select(ToolUsageHourly).where(
+                    ToolUsageHourly.bucket_start >= min(buckets),
+                    ToolUsageHourly.bucket_start <= max(buckets),
+                    ToolUsageHourly.tool_id.in_({key[1] for key in counts}),
+                )
+            )).scalars()
+        }
+        for (bucket_start, tool_id, plan_id), count in counts.items():
+            rollup = existing.get((bucket_start, tool_id, plan_id))
+            if rollup is None:
+                db.add(ToolUsageHourly(
+                    bucket_start=bucket_start, tool_id=tool_id, plan_id=plan_id, usage_count=count
+                ))
+            else:
+                rollup.usage_count += count
+
+        full_batch = len(rows) == settings.USAGE_AGGREGATE_BATCH_SIZE
+        watermark.last_id = settled[-1].id
+        if len(settled) < len(rows):
+            watermark.processed_until = rows[len(settled)].started_at
+        elif full_batch:
+            watermark.processed_until = settled[-1].started_at
+        else:
+            watermark.processed_until = cutoff
+        await db.commit()
+
+    logger.debug(f"Aggregated {len(settled)} tool usages up to id {settled[-1].id}")
+    return full_batch and len(settled) == len(rows)
+
+
+async def aggregate_usage() -> None:
+    """Fold new tool usages into the hourly rollup, a bounded number of batches per run."""
+    for _ in range(settings.USAGE_AGGREGATE_MAX_BATCHES):
+        if not await _aggregate_batch():
+            break
+
+
+async def usage_series(
+    db: AsyncSession,
+    start: datetime,
+    end: datetime,
+    bucket: str,
+    tool_id: Optional[int] = None,
+    plan_id: Optional[int] = None,
+) -> Dict:
+    """
+    Return usage counts per bucket in [start, end) from the hourly rollup,
+    with empty buckets filled with zero.
+    """
+    start = bucket_floor(start, bucket)
+    query = (
+        select(ToolUsageHourly.bucket_start, func.sum(ToolUsageHourly.usage_count))
+        .where(ToolUsageHourly.bucket_start >= start, ToolUsageHourly.bucket_start < end)
+        .group_by(ToolUsageHourly.bucket_start)
+    )
+    if tool_id is not None:
+        query = query.where(ToolUsageHourly.tool_id == tool_id)
+    if plan_id is not None:
+        query = query.where(ToolUsageHourly.plan_id == plan_id)
+
+    counts: Counter = Counter()
+    for bucket_start, count in await db.execute(query):
+        counts[bucket_floor(bucket_start, bucket)] += int(count)
+
+    series = []
+    step = BUCKETS[bucket]
+    current = start
+    while current < end:
+        series.append({"start": current, "count": counts.get(current, 0)})
+        current += step
+
+    processed_until = await db.scalar(
+        select(AggregationWatermark.processed_until).where(AggregationWatermark.name == WATERMARK_NAME)
+    )
+    return {
+        "bucket": bucket,
+        "from": start,
+        "to": end,
+        "series": series,
+        "total": sum(counts.values()),
+        "processedUntil": processed_until,
+    }
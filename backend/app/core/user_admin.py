@@ -0,0 +1,199 @@
+from typing import Dict, List, Optional
+import logging
+import re
+
+from fastapi import HTTPException
+from sqlalchemy import and_, delete, exists, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.models import Role, Subscription, User, user_roles
+from app.schemas.user import UserFilter
+
+logger = logging.getLogger(__name__)
+
+# Characters with a meaning in MySQL boolean full-text queries
+FULLTEXT_OPERATORS = re.compile(r'[+\-><()~*"@]+')
+
+
+def _has_role(role_name: str):
+    return User.id.in_(
+        select(user_roles.c.user_id)
+        .join(Role, Role.id == user_roles.c.role_id)
+        .where(Role.name == role_name)
+    )
+
+
+def user_filter_conditions(user_filter: UserFilter) -> List:
+    """Translate a UserFilter into WHERE clauses on User, each backed by an index."""
+    conditions = []
+    if user_filter.email:
+        # A prefix LIKE is a range scan on the unique email index
+        escaped = user_filter.email.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        conditions.append(User.email.like(f"{escaped}%", escape="\\"))
+    if user_filter.name:
+        # Every word must match, as a prefix, through the FULLTEXT index
+        words = FULLTEXT_OPERATORS.sub(" ", user_filter.name).split()
+        if not words:
+            raise HTTPException(status_code=400, detail="Name search needs at least one word")
+        conditions.append(User.full_name.match(" ".join(f"+{word}*" for word in words)))
+    if user_filter.is_active is not None:
+        conditions.append(User.is_active == user_filter.is_active)
+    if user_filter.is_verified is not None:
+        conditions.append(User.is_verified == user_filter.is_verified)
+    if user_filter.role:
+        conditions.append(_has_role(user_filter.role))
+    if user_filter.plan_id is not None:
+        conditions.append(
+            User.id.in_(
+                select(Subscription.user_id).where(
+                    Subscription.plan_id == user_filter.plan_id,
+                    Subscription.status == "active",
+                )
+            )
+        )
+    if user_filter.created_from:
+        conditions.append(User.created_at >= user_filter.created_from)
+    if user_filter.created_to:
+        conditions.append(User.created_at < user_filter.created_to)
+    return conditions
+
+
+async def resolve_bulk_targets(
+    db: AsyncSession,
+    user_ids: Optional[List[int]],
+    user_filter: Optional[UserFilter],
+) -> List[int]:
+    """Return the ids a bulk operation applies to, refusing more than ADMIN_BULK_MAX_USERS."""
+    if user_ids is not None:
+        ids = list(dict.fromkeys(user_ids))
+    else:
+        result = await db.execute(
+            select(User.id)
+            .where(*user_filter_conditions(user_filter))
+            .order_by(User.id)
+            .limit(settings.ADMIN_BULK_MAX_USERS + 1)
+        )
+        ids = list(result.scalars())
+    if len(ids) > settings.ADMIN_BULK_MAX_USERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Bulk operations are limited to {settings.ADMIN_BULK_MAX_USERS} users; narrow the selection",
+        )
+    return ids
+
+
+def _result(user_id: int, status: str, detail: Optional[str] = None) -> Dict:
+    return {"id": user_id, "status": status, "detail": detail}
+
+
+async def _apply_chunk(
+    db: AsyncSession,
+    action: str,
+    role: Optional[Role],
+    ids: List[int],
+    current_user_id: int,
+) -> List[Dict]:
+    # One query for the state the rules look at: existence, active flag,
+    # admin role and the role being changed
+    columns = [User.id, User.is_active, _has_role("admin").label("is_admin")]
+    if role is not None:
+        columns.append(_has_role(role.name).label("has_role"))
+    rows = {row.id: row for row in (await db.execute(select(*columns).where(User.id.in_(ids))))}
+
+    results: Dict[int, Dict] = {}
+    targets: List[int] = []
+    for user_id in ids:
+        row = rows.get(user_id)
+        if row is None:
+            results[user_id] = _result(user_id, "not_found")
+        elif action == "activate":
+            if row.is_active:
+                results[user_id] = _result(user_id, "unchanged")
+            else:
+                targets.append(user_id)
+        elif action == "deactivate":
+            if user_id == current_user_id:
+                results[user_id] = _result(user_id, "forbidden", "Cannot deactivate yourself")
+            elif row.is_admin:
+                results[user_id] = _result(user_id, "forbidden", "Cannot deactivate another admin")
+            elif not row.is_active:
+                results[user_id] = _result(user_id, "unchanged")
+            else:
+                targets.append(user_id)
+        elif action == "add_role":
+            if row.has_role:
+                results[user_id] = _result(user_id, "unchanged")
+            else:
+                targets.append(user_id)
+        elif action == "remove_role":
+            if role.name == "admin" and user_id == current_user_id:
+                results[user_id] = _result(user_id, "forbidden", "Cannot remove admin role from yourself")
+            elif not row.has_role:
+                results[user_id] = _result(user_id, "unchanged")
+            else:
+                targets.append(user_id)
+
+    if targets:
+        if action in ("activate", "deactivate"):
+            await db.execute(
+                update(User)
+                .where(User.id.in_(targets))
+                .values(is_active=action == "activate")
+                .execution_options(synchronize_session=False)
+            )
+        elif action == "add_role":
+            # The NOT EXISTS keeps a concurrent grant from failing the chunk
+            await db.execute(
+                insert(user_roles).from_select(
+                    ["user_id", "role_id"],
+                    select(User.id, literal(role.id))
+                    .where(
+                        User.id.in_(targets),
+                        ~exists().where(and_(
+                            user_roles.c.user_id == User.id,
+                            user_roles.c.role_id == role.id,
+                        )),
+                    ),
+                )
+            )
+        else:
+            await db.execute(
+                delete(user_roles).where(
+                    user_roles.c.role_id == role.id,
+                    user_roles.c.user_id.in_(targets),
+                )
+            )
+        await db.commit()
+        for user_id in targets:
+            results[user_id] = _result(user_id, "updated")
+
+    return [results[user_id] for user_id in ids]
+
+
+async def apply_bulk_action(
+    db: AsyncSession,
+    action: str,
+    role_name: Optional[str],
+    ids: List[int],
+    current_user_id: int,
+) -> List[Dict]:
+    """
+    Apply an admin action to many users with one UPDATE, INSERT ... SELECT
+    or DELETE per chunk of ADMIN_BULK_CHUNK_SIZE ids, committing each chunk.
+    Returns one result per id: updated, unchanged, not_found or forbidden.
+    """
+    role = None
+    if role_name is not None and action in ("add_role", "remove_role"):
+        role = (await db.execute(select(Role).where(Role.name == role_name))).scalar_one_or_none()
+        if role is None:
+            raise HTTPException(status_code=400, detail=f"Role {role_name} not found")
+
+    results: List[Dict] = []
+    for start in range(0, len(ids), settings.ADMIN_BULK_CHUNK_SIZE):
+        chunk = ids[start:start + settings.ADMIN_BULK_CHUNK_SIZE]
+        results.extend(await _apply_chunk(db, action, role, chunk, current_user_id))
+
+    updated = sum(1 for result in results if result["status"] == "updated")
+    logger.info(f"Admin {current_user_id} ran bulk {action} on {len(ids)} users, {updated} updated")
+    return results
@@ -0,0 +1,149 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+import queue
+import threading
+import traceback
+
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.core.request_context import get_request_id, get_route, get_user_id
+from app.db.session import engine
+from app.db.slow_query import SKIP_OPTION
+from app.models.models import SystemLog
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 10000
+MAX_TRACEBACK_LENGTH = 20000
+# LogRecord attributes that are not extra fields passed by the caller
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class DatabaseLogHandler(logging.Handler):
+    """
+    Writes log records to system_logs without blocking the code that logs.
+
+    emit() only formats the record and puts it on a bounded queue; a
+    background thread takes up to DB_LOG_BATCH_SIZE records at a time and
+    writes them with one multi-row insert on the sync engine. When the
+    queue is full, or a batch cannot be written, records are dropped and
+    counted rather than slowing requests down.
+    """
+
+    def __init__(self, level: int = logging.WARNING, excluded_loggers: Optional[List[str]] = None):
+        super().__init__(level)
+        # Our own logger is always excluded so a failing write cannot loop
+        self.excluded_loggers = tuple(excluded_loggers or ()) + (__name__,)
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize=settings.DB_LOG_QUEUE_SIZE)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.queued = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.write_errors = 0
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="db-log-writer", daemon=True)
+            self._thread.start()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.name.startswith(self.excluded_loggers):
+            return False
+        return super().filter(record)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            additional_data = {
+                "logger": record.name,
+                "module": record.module,
+                "function": record.funcName,
+                "line": record.lineno,
+                "request_id": get_request_id(),
+                "route": get_route(),
+                "user_id": get_user_id(),
+            }
+            # Fields passed with extra=, such as error_id
+            for key, value in vars(record).items():
+                if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                    additional_data[key] = value if isinstance(value, (str, int, float, bool)) else repr(value)
+            if record.exc_info:
+                additional_data["traceback"] = "".join(
+                    traceback.format_exception(*record.exc_info)
+                )[-MAX_TRACEBACK_LENGTH:]
+
+            self._queue.put_nowait({
+                "level": record.levelname,
+                "message": record.getMessage()[:MAX_MESSAGE_LENGTH],
+                "source": record.name[:100],
+                "created_at": datetime.utcfromtimestamp(record.created),
+                "additional_data": additional_data,
+            })
+            self.queued += 1
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+    def _next_batch(self, timeout: float) -> List[Dict]:
+        try:
+            rows = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(rows) < settings.DB_LOG_BATCH_SIZE:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _write(self, rows: List[Dict]) -> None:
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(SystemLog).execution_options(**{SKIP_OPTION: True}), rows)
+        except Exception as e:
+            self.write_errors += 1
+            self.dropped += len(rows)
+            logger.error(f"Failed to write {len(rows)} log records to system_logs: {e}")
+            return
+        self.written += len(rows)
+        self.batches += 1
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            rows = self._next_batch(settings.DB_LOG_FLUSH_INTERVAL_SECONDS)
+            if rows:
+                self._write(rows)
+
+    def close(self) -> None:
+        """Stop the writer thread and write what is still queued."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=settings.DB_LOG_FLUSH_INTERVAL_SECONDS + 5)
+            self._thread = None
+        while True:
+            rows = self._next_batch(0)
+            if not rows:
+                break
+            self._write(rows)
+        super().close()
+
+    def stats(self) -> Dict:
+        return {
+            "level": logging.getLevelName(self.level),
+            "queued": self.queued,
+            "pending": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "write_errors": self.write_errors,
+        }
+
+
+db_log_handler = DatabaseLogHandler(
+    level=logging.getLevelName(settings.DB_LOG_LEVEL.upper()),
+    excluded_loggers=[name.strip() for name in settings.DB_LOG_EXCLUDED_LOGGERS.split(",") if name.strip()],
+)
@@ -0,0 +1,120 @@
+"""
+Daily partitions of system_logs on MySQL.
+
+The table is partitioned by RANGE (TO_DAYS(created_at)), one partition per
+UTC day named pYYYYMMDD plus a catch-all pmax, so time-bounded queries
+only read the days they cover. maintain_partitions() splits upcoming days
+off pmax ahead of time and drops whole partitions once they fall out of
+SYSTEM_LOG_RETENTION_DAYS, which is a metadata change instead of a
+row-by-row DELETE. Where the table is not partitioned (other databases,
+or before the migration) retention falls back to batched deletes.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+import logging
+
+from sqlalchemy import delete, select, text
+import redis
+
+from app.core.config import settings
+from app.db.redis import get_redis, redis_call, RedisUnavailableError
+from app.db.session import async_engine
+from app.models.models import SystemLog
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_LOCK_KEY = "system_logs:maintenance_lock"
+CATCH_ALL_PARTITION = "pmax"
+DELETE_BATCH_SIZE = 5000
+MAX_DELETE_BATCHES = 100  # per run, bounds the fallback's work
+
+
+def to_days(day: date) -> int:
+    """MySQL TO_DAYS() of a date."""
+    return day.toordinal() + 365
+
+
+def partition_name(day: date) -> str:
+    return f"p{day.strftime('%Y%m%d')}"
+
+
+def partition_definition(day: date) -> str:
+    """Partition holding the rows created on day."""
+    return f"PARTITION {partition_name(day)} VALUES LESS THAN ({to_days(day + timedelta(days=1))})"
+
+
+async def _partitions(conn) -> List[Tuple[str, Optional[int]]]:
+    """Return (name, upper bound in TO_DAYS) of each partition in order; pmax has no bound."""
+    result = await conn.execute(text(
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'system_logs' "
+        "AND PARTITION_NAME IS NOT NULL ORDER BY PARTITION_ORDINAL_POSITION"
+    ))
+    return [
+        (name, None if description == "MAXVALUE" else int(description))
+        for name, description in result
+    ]
+
+
+async def _delete_expired_rows(cutoff: datetime) -> int:
+    deleted = 0
+    async with async_engine.begin() as conn:
+        for _ in range(MAX_DELETE_BATCHES):
+            ids = (await conn.execute(
+                select(SystemLog.id).where(SystemLog.created_at < cutoff).limit(DELETE_BATCH_SIZE)
+            )).scalars().all()
+            if not ids:
+                break
+            await conn.execute(delete(SystemLog).where(SystemLog.id.in_(ids), SystemLog.created_at < cutoff))
+            deleted += len(ids)
+    return deleted
+
+
+async def maintain_partitions() -> None:
+    """Create the partitions of the coming days and drop those past retention; one worker at a time."""
+    try:
+        if not await redis_call(get_redis().set, MAINTENANCE_LOCK_KEY, 1, nx=True, ex=300):
+            return
+    except redis.RedisError as e:
+        if not isinstance(e, RedisUnavailableError):
+            logger.error(f"Redis error taking system logs maintenance lock: {e}")
+        return
+
+    today = datetime.utcnow().date()
+    # Partitions whose bound is at or before the first retained day only hold expired rows
+    first_kept_day = today - timedelta(days=settings.SYSTEM_LOG_RETENTION_DAYS - 1)
+
+    partitions: List[Tuple[str, Optional[int]]] = []
+    if async_engine.dialect.name == "mysql":
+        async with async_engine.connect() as conn:
+            partitions = await _partitions(conn)
+    if not partitions:
+        deleted = await _delete_expired_rows(datetime.combine(first_kept_day, datetime.min.time()))
+        if deleted:
+            logger.info(f"Deleted {deleted} expired system logs from the unpartitioned table")
+        return
+
+    last_bound = max((bound for _, bound in partitions if bound is not None), default=None)
+    new_days = [
+        today + timedelta(days=offset)
+        for offset in range(settings.SYSTEM_LOG_PARTITIONS_AHEAD_DAYS + 1)
+        if last_bound is None or to_days(today + timedelta(days=offset + 1)) > last_bound
+    ]
+    expired = [
+        name for name, bound in partitions
+        if bound is not None and bound <= to_days(first_kept_day)
+    ]
+
+    async with async_engine.connect() as conn:
+        if new_days:
+            # pmax is empty while partitions are kept ahead, so reorganizing it copies nothing
+            definitions = ", ".join(partition_definition(day) for day in new_days)
+            await conn.execute(text(
+                f"ALTER TABLE system_logs REORGANIZE PARTITION {CATCH_ALL_PARTITION} INTO "
+                f"({definitions}, PARTITION {CATCH_ALL_PARTITION} VALUES LESS THAN MAXVALUE)"
+            ))
+            logger.info(f"Added system_logs partitions up to {new_days[-1].isoformat()}")
+        if expired:
+            await conn.execute(text(f"ALTER TABLE system_logs DROP PARTITION {', '.join(expired)}"))
+            logger.info(f"Dropped expired system_logs partitions {', '.join(expired)}")
@@ -0,0 +1,108 @@
+from typing import Dict, List
+import asyncio
+import logging
+import os
+import time
+import traceback
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+from app.core.metrics import Histogram
+from app.core.request_context import get_route
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _app_call_site(limit: int = 4) -> str:
+    """Return the innermost application frames that led to the current checkout."""
+    frames: List[traceback.FrameSummary] = []
+    # Async engine checkouts run in a greenlet, so the request's own frames
+    # are only reachable through the awaiting task
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    if task is not None:
+        frames.extend(
+            traceback.FrameSummary(frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name)
+            for frame in task.get_stack()
+        )
+    frames.extend(traceback.extract_stack())
+
+    app_frames = [
+        frame for frame in frames
+        if frame.filename.startswith(APP_DIR) and frame.filename != __file__
+    ]
+    return " <- ".join(
+        f"{os.path.relpath(frame.filename, os.path.dirname(APP_DIR))}:{frame.lineno} {frame.name}"
+        for frame in reversed(app_frames[-limit:])
+    ) or "unknown"
+
+
+class _InstrumentedPoolMixin:
+    """
+    Records how long checkouts wait for a connection and logs the call site
+    of slow or timed out checkouts.
+    Metrics live on the class so they survive Pool.recreate().
+    """
+
+    checkout_wait: Histogram
+    timeouts: int
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.checkout_wait.observe(time.perf_counter() - start)
+            type(self).timeouts += 1
+            logger.error(
+                f"Database pool exhausted after {time.perf_counter() - start:.3f}s "
+                f"(route {get_route()}, {_app_call_site()})"
+            )
+            raise
+
+        waited = time.perf_counter() - start
+        self.checkout_wait.observe(waited)
+        if waited * 1000 >= settings.DB_SLOW_CHECKOUT_MS:
+            logger.warning(
+                f"Slow database connection checkout: waited {waited * 1000:.0f} ms "
+                f"with {self.checkedout()} in use (route {get_route()}, {_app_call_site()})"
+            )
+        return connection
+
+    def stats(self) -> Dict:
+        return {
+            "pool_size": self.size(),
+            "max_overflow": self._max_overflow,
+            "in_use": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(0, self.overflow()),
+            "timeouts": type(self).timeouts,
+            "checkout_wait": self.checkout_wait.snapshot(),
+        }
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    """QueuePool for the sync engine."""
+
+    checkout_wait = Histogram()
+    timeouts = 0
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """QueuePool for the async engine."""
+
+    checkout_wait = Histogram()
+    timeouts = 0
+
+
+class InstrumentedReplicaQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """QueuePool for the read replica engines, aggregated across replicas."""
+
+    checkout_wait = Histogram()
+    timeouts = 0
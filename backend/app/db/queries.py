@@ -0,0 +1,52 @@
+"""
+Prebuilt statements for the queries run on almost every request.
+
+Each statement is constructed once at import with bindparam() placeholders
+and executed with a parameter dict, e.g.
+
+    await db.execute(USER_BY_ID, {"user_id": user_id})
+
+Building a select() per call costs the construction itself plus a fresh
+cache key walk before SQLAlchemy can find the compiled form; a module level
+statement memoizes its cache key, so each call goes straight to the
+compiled cache.
+"""
+
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.orm import selectinload
+
+from app.models.models import PlanTool, Subscription, Tool, ToolUsage, User
+
+# Relationships read from the current user by the auth checks and routes
+USER_LOAD_OPTIONS = (
+    selectinload(User.roles),
+    selectinload(User.subscriptions).selectinload(Subscription.plan),
+)
+
+# Params: user_id
+USER_BY_ID = select(User).options(*USER_LOAD_OPTIONS).where(User.id == bindparam("user_id"))
+
+# Params: tool_id
+ACTIVE_TOOL_BY_ID = select(Tool).where(Tool.id == bindparam("tool_id"), Tool.is_active == True)
+
+# Params: plan_id, tool_id
+PLAN_TOOL = select(PlanTool).where(
+    PlanTool.plan_id == bindparam("plan_id"),
+    PlanTool.tool_id == bindparam("tool_id"),
+)
+
+# Params: plan_id
+PLAN_TOOLS_FOR_PLAN = select(PlanTool).where(PlanTool.plan_id == bindparam("plan_id"))
+
+# Params: user_id, tool_id, since
+USAGE_COUNT_SINCE = select(func.count(ToolUsage.id)).where(
+    ToolUsage.user_id == bindparam("user_id"),
+    ToolUsage.tool_id == bindparam("tool_id"),
+    ToolUsage.started_at >= bindparam("since"),
+)
+
+# Params: user_id, since
+USAGE_COUNTS_BY_TOOL_SINCE = select(ToolUsage.tool_id, func.count(ToolUsage.id)).where(
+    ToolUsage.user_id == bindparam("user_id"),
+    ToolUsage.started_at >= bindparam("since"),
+).group_by(ToolUsage.tool_id)
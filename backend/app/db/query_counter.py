@@ -0,0 +1,89 @@
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+import logging
+import re
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Collapses IN lists and literals so statements that differ only in values share a shape
+_PLACEHOLDER = r"(?:%s|%\(\w+\)s|\?|:\w+)"
+_IN_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_SPACE = re.compile(r"\s+")
+
+
+def query_shape(statement: str) -> str:
+    """Return a statement with its values stripped, for grouping repeated queries."""
+    shape = _STRING.sub("?", statement)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("(?)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+class QueryStats:
+    """
+    Statements executed while handling one request (or inside one block).
+    Statements recorded here are also recorded in the parent, so a test
+    collecting around a request still sees what the middleware counts.
+    """
+
+    __slots__ = ("count", "shapes", "parent")
+
+    def __init__(self, parent: Optional["QueryStats"] = None):
+        self.count = 0
+        self.shapes: Counter = Counter()
+        self.parent = parent
+
+    def record(self, statement: str) -> None:
+        self.count += 1
+        self.shapes[query_shape(statement)] += 1
+        if self.parent is not None:
+            self.parent.record(statement)
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Return shapes executed at least threshold times, most repeated first."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    @property
+    def max_repeats(self) -> int:
+        return max(self.shapes.values(), default=0)
+
+
+# Stats of the request being handled. The async engine runs statements in a
+# greenlet that shares the request's context, so this sees them too.
+query_stats_var: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    stats = query_stats_var.get()
+    if stats is not None:
+        stats.record(statement)
+
+
+def install_query_counter() -> None:
+    """Count statements on every engine for requests that are being tracked."""
+    if not event.contains(Engine, "before_cursor_execute", _count_statement):
+        event.listen(Engine, "before_cursor_execute", _count_statement)
+
+
+@contextmanager
+def collect_queries() -> Iterator[QueryStats]:
+    """
+    Count the statements executed inside the block by the current context,
+    including requests made through an in-process ASGI client. Statements
+    from other tasks and threads, such as the periodic jobs, are not
+    counted. Meant for tests.
+    """
+    install_query_counter()
+    stats = QueryStats(parent=query_stats_var.get())
+    token = query_stats_var.set(stats)
+    try:
+        yield stats
+    finally:
+        query_stats_var.reset(token)
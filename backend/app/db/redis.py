@@ -0,0 +1,124 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+import time
+
+import redis
+import redis.asyncio as aioredis
+
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import settings
+from app.core.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedConnectionPool(aioredis.BlockingConnectionPool):
+    """Blocking connection pool that records how long callers wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        self.wait_time = Histogram()
+        super().__init__(*args, **kwargs)
+
+    async def get_connection(self, command_name, *keys, **options):
+        start = time.perf_counter()
+        try:
+            return await super().get_connection(command_name, *keys, **options)
+        finally:
+            self.wait_time.observe(time.perf_counter() - start)
+
+    def stats(self) -> Dict:
+        in_use = self.max_connections - self.pool.qsize()
+        created = len(self._connections)
+        return {
+            "max_connections": self.max_connections,
+            "created": created,
+            "in_use": in_use,
+            "idle": max(0, created - in_use),
+            "wait_time": self.wait_time.snapshot(),
+        }
+
+
+class RedisUnavailableError(redis.RedisError):
+    """Raised instead of calling Redis while its circuit is open."""
+
+
+# Shared client, created on startup and closed on shutdown
+redis_client: Optional[aioredis.Redis] = None
+
+# Trips after repeated errors or timeouts so a slow Redis costs no waiting
+redis_breaker = CircuitBreaker(
+    "redis",
+    failure_threshold=settings.REDIS_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=settings.REDIS_BREAKER_RESET_SECONDS,
+)
+
+
+async def init_redis() -> None:
+    """Create the shared Redis connection pool."""
+    global redis_client
+
+    pool = InstrumentedConnectionPool.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        decode_responses=True,
+    )
+    redis_client = aioredis.Redis(connection_pool=pool)
+    logger.info(f"Redis pool created (max {settings.REDIS_MAX_CONNECTIONS} connections)")
+
+
+async def close_redis() -> None:
+    """Close the shared Redis connection pool."""
+    global redis_client
+
+    if redis_client is None:
+        return
+    await redis_client.close()
+    await redis_client.connection_pool.disconnect()
+    redis_client = None
+    logger.info("Redis pool closed")
+
+
+def get_redis() -> aioredis.Redis:
+    """Return the shared Redis client."""
+    if redis_client is None:
+        raise RuntimeError("Redis client is not initialized")
+    return redis_client
+
+
+async def redis_call(func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+    """
+    Run a Redis operation through the circuit breaker.
+    Raises RedisUnavailableError while the circuit is open, and
+    redis.TimeoutError when the call exceeds REDIS_CALL_TIMEOUT.
+    """
+    if not redis_breaker.allow_request():
+        raise RedisUnavailableError("Redis circuit is open")
+
+    try:
+        result = await asyncio.wait_for(func(*args, **kwargs), settings.REDIS_CALL_TIMEOUT)
+    except asyncio.TimeoutError as e:
+        redis_breaker.record_failure()
+        raise redis.TimeoutError("Redis call timed out") from e
+    except (redis.RedisError, OSError):
+        redis_breaker.record_failure()
+        raise
+    except BaseException:
+        # Cancellation or an error unrelated to Redis says nothing about its
+        # health, but must not leave a half-open probe in flight forever
+        redis_breaker.abandon_probe()
+        raise
+
+    redis_breaker.record_success()
+    return result
+
+
+def get_redis_pool_stats() -> Optional[Dict]:
+    """Return pool usage and wait times for the metrics endpoint."""
+    if redis_client is None:
+        return None
+    return redis_client.connection_pool.stats()
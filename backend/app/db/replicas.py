@@ -0,0 +1,159 @@
+from typing import Dict, List, Optional
+import itertools
+import logging
+import time
+
+from sqlalchemy import text
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+import redis
+
+from app.core.config import settings
+from app.db.pool import InstrumentedReplicaQueuePool
+from app.db.redis import get_redis, redis_call, RedisUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+def _pin_key(user_id: str) -> str:
+    return f"db:pin:{user_id}"
+
+
+class Replica:
+    """A read replica and its last measured replication lag."""
+
+    def __init__(self, url: str):
+        self.name = make_url(url).host or url
+        self.engine: AsyncEngine = create_async_engine(
+            url,
+            poolclass=InstrumentedReplicaQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_pre_ping=True,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            connect_args={
+                "charset": "utf8mb4"
+            }
+        )
+        self.lag_seconds: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def is_usable(self, now: float) -> bool:
+        """A replica is usable while its last lag check is recent and within bounds."""
+        if self.lag_seconds is None or self.checked_at is None:
+            return False
+        if now - self.checked_at > settings.DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS * 3:
+            return False
+        return self.lag_seconds <= settings.DB_REPLICA_MAX_LAG_SECONDS
+
+    async def check_lag(self) -> None:
+        """Read Seconds_Behind_Master from the replica's replication status."""
+        try:
+            async with self.engine.connect() as conn:
+                try:
+                    result = await conn.execute(text("SHOW REPLICA STATUS"))
+                except Exception:
+                    # Older servers only know the SLAVE spelling
+                    result = await conn.execute(text("SHOW SLAVE STATUS"))
+                row = result.mappings().first()
+        except Exception as e:
+            self.lag_seconds = None
+            self.error = str(e)
+            logger.error(f"Replica {self.name} lag check failed: {e}")
+            return
+
+        self.checked_at = time.time()
+        if row is None:
+            self.lag_seconds = None
+            self.error = "replication is not configured"
+            return
+
+        lag = row.get("Seconds_Behind_Master", row.get("Seconds_Behind_Source"))
+        # NULL means the replication threads are not running
+        self.lag_seconds = float(lag) if lag is not None else None
+        self.error = None if lag is not None else "replication is stopped"
+
+    def stats(self) -> Dict:
+        return {
+            "lag_seconds": self.lag_seconds,
+            "usable": self.is_usable(time.time()),
+            "checked_at": self.checked_at,
+            "error": self.error,
+            "pool": self.engine.pool.stats(),
+        }
+
+
+class ReplicaSet:
+    """
+    Chooses a replica for read-only sessions.
+
+    Replicas whose lag exceeds DB_REPLICA_MAX_LAG_SECONDS, or whose lag has
+    not been checked recently, are skipped; when none is usable reads fall
+    back to the primary.
+    """
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._cycle = itertools.cycle(self.replicas) if self.replicas else None
+        self.replica_reads = 0
+        self.primary_fallbacks = 0
+        self.pinned_reads = 0
+
+    def choose(self) -> Optional[Replica]:
+        """Return the next usable replica round robin, or None for the primary."""
+        if not self.replicas:
+            return None
+        now = time.time()
+        for _ in range(len(self.replicas)):
+            replica = next(self._cycle)
+            if replica.is_usable(now):
+                self.replica_reads += 1
+                return replica
+        self.primary_fallbacks += 1
+        return None
+
+    async def check_lag(self) -> None:
+        """Refresh the lag of every replica."""
+        for replica in self.replicas:
+            await replica.check_lag()
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> Dict:
+        return {
+            "replicas": {replica.name: replica.stats() for replica in self.replicas},
+            "replica_reads": self.replica_reads,
+            "primary_fallbacks": self.primary_fallbacks,
+            "pinned_reads": self.pinned_reads,
+        }
+
+
+replica_set = ReplicaSet([
+    url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()
+])
+
+
+async def pin_to_primary(user_id: str) -> None:
+    """Send a user's reads to the primary for a while after they wrote something."""
+    try:
+        await redis_call(
+            get_redis().set, _pin_key(user_id), 1, ex=settings.DB_READ_YOUR_WRITES_SECONDS
+        )
+    except redis.RedisError as e:
+        if not isinstance(e, RedisUnavailableError):
+            logger.error(f"Redis error pinning user {user_id} to primary: {e}")
+
+
+async def is_pinned_to_primary(user_id: str) -> bool:
+    """Return whether a user wrote recently enough that replicas may not have the write yet."""
+    try:
+        return bool(await redis_call(get_redis().exists, _pin_key(user_id)))
+    except redis.RedisError as e:
+        if not isinstance(e, RedisUnavailableError):
+            logger.error(f"Redis error reading primary pin for user {user_id}: {e}")
+        # Without the pin we cannot tell, so stay consistent
+        return True
@@ -1,15 +1,24 @@
-from sqlalchemy import create_engine
+from typing import Awaitable, Callable, Dict, List
+
+from sqlalchemy import Delete, Insert, Update, create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-import redis
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import settings
+from app.core.request_context import get_user_id
+from app.db.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from app.db.replicas import replica_set, pin_to_primary, is_pinned_to_primary
 
-# Create SQLAlchemy engine
+# Create SQLAlchemy engine (startup tasks and background threads)
 engine = create_engine(
     settings.DATABASE_URL,
+    poolclass=InstrumentedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
     pool_pre_ping=True,
-    pool_recycle=3600,
+    pool_recycle=settings.DB_POOL_RECYCLE,
     connect_args={
         "charset": "utf8mb4"
     }
@@ -18,13 +27,104 @@ engine = create_engine(
 # Create sessionmaker
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create Redis connection
-redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+# Async engine used by the request handlers so queries don't block the event loop
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    poolclass=InstrumentedAsyncQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_pre_ping=True,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    connect_args={
+        "charset": "utf8mb4"
+    }
+)
+
+class RoutingSession(Session):
+    """
+    Sends the reads of a read-only session to the replica chosen for it and
+    everything else, including flushes and DML, to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica")
+        if replica is not None and not self._flushing and not isinstance(clause, (Insert, Update, Delete)):
+            return replica.engine.sync_engine
+        return async_engine.sync_engine
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _record_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _record_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+# Async callbacks run with the session's info dict after each successful
+# commit, for work that must not happen if the transaction rolls back
+_after_commit_hooks: List[Callable[[Dict], Awaitable[None]]] = []
+
+
+def after_commit_hook(func: Callable[[Dict], Awaitable[None]]) -> Callable[[Dict], Awaitable[None]]:
+    """Register func to run after every committed RoutingAsyncSession transaction."""
+    _after_commit_hooks.append(func)
+    return func
+
+
+class RoutingAsyncSession(AsyncSession):
+    """
+    AsyncSession that pins the current user to the primary after they commit
+    a write and runs the registered after-commit hooks.
+    """
+
+    async def commit(self) -> None:
+        await super().commit()
+        # Checked after commit, which flushes pending changes first
+        info = self.sync_session.info
+        wrote = info.pop("wrote", False)
+        user_id = get_user_id()
+        if wrote and user_id is not None and replica_set.replicas:
+            await pin_to_primary(user_id)
+        for hook in _after_commit_hooks:
+            await hook(info)
+
+
+# Objects stay usable after commit; lazy loads are not possible on an
+# AsyncSession, so relationships must be loaded explicitly
+AsyncSessionLocal = async_sessionmaker(
+    class_=RoutingAsyncSession,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+def get_db_pool_stats() -> Dict:
+    """Return connection pool occupancy and checkout waits for the metrics endpoint."""
+    return {
+        "async": async_engine.pool.stats(),
+        "sync": engine.pool.stats(),
+    }
 
 # Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Dependency for read-only endpoints: reads go to a replica within the lag
+# bound unless the current user wrote something in the last
+# DB_READ_YOUR_WRITES_SECONDS, in which case they stay on the primary
+async def get_read_db():
+    replica = None
+    if replica_set.replicas:
+        user_id = get_user_id()
+        if user_id is not None and await is_pinned_to_primary(user_id):
+            replica_set.pinned_reads += 1
+        else:
+            replica = replica_set.choose()
+    async with AsyncSessionLocal(info={"replica": replica}) as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
@@ -0,0 +1,143 @@
+from collections import deque
+from datetime import date, datetime
+from typing import Any, Deque, Dict, List
+import logging
+import random
+import time
+
+from sqlalchemy import event, insert
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.request_context import get_request_id, get_route
+from app.db.query_counter import query_shape
+from app.db.session import AsyncSessionLocal
+from app.models.models import SystemLog
+
+logger = logging.getLogger(__name__)
+
+SOURCE = "slow_query"
+# Statements flagged with this execution option are not recorded, so writing
+# the log itself cannot feed back into it
+SKIP_OPTION = "skip_slow_query_log"
+MAX_STATEMENT_LENGTH = 4000
+MAX_RECORDED_ROWS = 3  # parameter sets kept from an executemany
+
+
+def _redact_value(value: Any) -> Any:
+    """Keep values that identify rows, hide anything that could be user data."""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, str):
+        return f"<str:{len(value)}>"
+    if isinstance(value, (bytes, bytearray)):
+        return f"<bytes:{len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def redact_parameters(parameters: Any, executemany: bool) -> Any:
+    """Return DBAPI parameters with strings and other payloads replaced by type and length."""
+    if executemany:
+        return [redact_parameters(row, False) for row in list(parameters)[:MAX_RECORDED_ROWS]]
+    if isinstance(parameters, dict):
+        return {key: _redact_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_redact_value(value) for value in parameters]
+    return _redact_value(parameters)
+
+
+class SlowQueryRecorder:
+    """
+    Times every statement and keeps a sample of the slow ones for system_logs.
+
+    Statements at or above SLOW_QUERY_THRESHOLD_MS are recorded with
+    probability SLOW_QUERY_SAMPLE_RATE into a bounded buffer; flush() writes
+    the buffer in one insert. Fast statements only cost two perf_counter
+    calls. Each row stores its sample rate so totals can be estimated.
+    """
+
+    def __init__(self):
+        self._buffer: Deque[Dict] = deque(maxlen=settings.SLOW_QUERY_BUFFER_SIZE)
+        self.slow = 0
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.flush_errors = 0
+
+    def install(self) -> None:
+        if not event.contains(Engine, "before_cursor_execute", self._before_execute):
+            event.listen(Engine, "before_cursor_execute", self._before_execute)
+            event.listen(Engine, "after_cursor_execute", self._after_execute)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._slow_query_start = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_slow_query_start", None)
+        if start is None:
+            return
+        duration_ms = (time.perf_counter() - start) * 1000
+        if duration_ms < settings.SLOW_QUERY_THRESHOLD_MS:
+            return
+        self.slow += 1
+        if context.execution_options.get(SKIP_OPTION) or random.random() >= settings.SLOW_QUERY_SAMPLE_RATE:
+            return
+
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self.recorded += 1
+        self._buffer.append({
+            "level": "WARNING",
+            "message": query_shape(statement),
+            "source": SOURCE,
+            "created_at": datetime.utcnow(),
+            "additional_data": {
+                "statement": statement[:MAX_STATEMENT_LENGTH],
+                "parameters": redact_parameters(parameters, executemany),
+                "duration_ms": round(duration_ms, 2),
+                "sample_rate": settings.SLOW_QUERY_SAMPLE_RATE,
+                "route": get_route(),
+                "request_id": get_request_id(),
+                "database": conn.engine.url.database,
+            },
+        })
+
+    async def flush(self) -> None:
+        """Write the buffered slow queries to system_logs in one batch."""
+        rows: List[Dict] = []
+        while self._buffer:
+            rows.append(self._buffer.popleft())
+        if not rows:
+            return
+
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    insert(SystemLog).execution_options(**{SKIP_OPTION: True}),
+                    rows,
+                )
+                await db.commit()
+        except Exception as e:
+            self.flush_errors += 1
+            self.dropped += len(rows)
+            logger.error(f"Failed to write {len(rows)} slow queries to system_logs: {e}")
+            return
+        self.written += len(rows)
+
+    def stats(self) -> Dict:
+        return {
+            "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+            "sample_rate": settings.SLOW_QUERY_SAMPLE_RATE,
+            "slow": self.slow,
+            "recorded": self.recorded,
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "dropped": self.dropped,
+            "flush_errors": self.flush_errors,
+        }
+
+
+slow_query_recorder = SlowQueryRecorder()
@@ -1,7 +1,6 @@
 from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-import time
 from typing import List
 import logging
 import os
@@ -10,8 +9,22 @@ from app.core.config import settings
 from app.core.init_db import init_db
 from app.api.routes import api_router
 from app.middleware.rate_limiter import RateLimitMiddleware
+from app.middleware.request_context import RequestContextMiddleware
+from app.middleware.query_counter import QueryCountMiddleware
 from app.middleware.error_handler import error_handler
-from app.core.security import create_admin_user
+from app.core.security import create_admin_user, configure_password_hashing, purge_expired_one_time_tokens
+from app.core.tasks import start_periodic_task, stop_periodic_tasks
+from app.core.rate_limit import rate_limiter
+from app.core.admin_stats import admin_stats
+from app.core.usage_analytics import aggregate_usage
+from app.core.leaderboards import reconcile as reconcile_leaderboards
+from app.core.exports import cancel_jobs as cancel_export_jobs, purge_expired_exports
+from app.db.redis import init_redis, close_redis
+from app.db.session import async_engine
+from app.db.replicas import replica_set
+from app.db.slow_query import slow_query_recorder
+from app.db.log_handler import db_log_handler
+from app.db.log_partitions import maintain_partitions as maintain_log_partitions
 
 # Configure logging
 logging.basicConfig(
@@ -30,29 +43,34 @@ app = FastAPI(
 # CORS_ORIGINS_STR = os.getenv("CORS_ORIGINS", "http://localhost:3000")
 # CORS_ORIGINS = [origin.strip() for origin in CORS_ORIGINS_STR.split(",")]
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000","http://localhost:8000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Add rate limiting middleware
-app.add_middleware(RateLimitMiddleware)
+# Middleware pipeline, outermost first. All of it is pure ASGI so responses
+# stream through untouched. Request ids and timing wrap everything, CORS
+# answers preflights before they count against the rate limits and adds its
+# headers to 429s, and rate limiting runs before routing. Query counting,
+# when enabled, sits innermost so it sees the route the limiter resolved.
+middleware_pipeline = [
+    (RequestContextMiddleware, {}),
+    (
+        CORSMiddleware,
+        {
+            "allow_origins": ["http://localhost:3000","http://localhost:8000"],
+            "allow_credentials": True,
+            "allow_methods": ["*"],
+            "allow_headers": ["*"],
+            "expose_headers": ["X-Request-ID", "X-Process-Time", "Retry-After", "X-Query-Count", "X-Query-Repeats"],
+        },
+    ),
+    (RateLimitMiddleware, {}),
+]
+if settings.QUERY_COUNT_ENABLED:
+    middleware_pipeline.append((QueryCountMiddleware, {}))
+# add_middleware puts each new middleware outside the previous ones
+for middleware_class, options in reversed(middleware_pipeline):
+    app.add_middleware(middleware_class, **options)
 
 # Include all API routes
 app.include_router(api_router, prefix="")
 
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    return response
-
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     return await error_handler(request, exc)
@@ -60,12 +78,79 @@ async def global_exception_handler(request: Request, exc: Exception):
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting up the application")
+    await init_redis()
+    if settings.PASSWORD_HASH_CALIBRATE:
+        await configure_password_hashing()
     await init_db()
+    if settings.DB_LOG_ENABLED:
+        # Attached after init_db so the table exists before the first write
+        db_log_handler.start()
+        logging.getLogger().addHandler(db_log_handler)
     await create_admin_user()
+    start_periodic_task(
+        "purge_one_time_tokens",
+        settings.ONE_TIME_TOKEN_PURGE_INTERVAL_SECONDS,
+        purge_expired_one_time_tokens,
+    )
+    if settings.RATE_LIMIT_LOCAL_ENABLED:
+        start_periodic_task(
+            "rate_limit_sync",
+            settings.RATE_LIMIT_SYNC_INTERVAL_SECONDS,
+            rate_limiter.sync,
+        )
+    start_periodic_task(
+        "admin_stats_reconcile",
+        settings.ADMIN_STATS_RECONCILE_INTERVAL_SECONDS,
+        admin_stats.reconcile,
+    )
+    start_periodic_task(
+        "leaderboard_reconcile",
+        settings.LEADERBOARD_RECONCILE_INTERVAL_SECONDS,
+        reconcile_leaderboards,
+    )
+    start_periodic_task(
+        "usage_aggregate",
+        settings.USAGE_AGGREGATE_INTERVAL_SECONDS,
+        aggregate_usage,
+    )
+    start_periodic_task(
+        "purge_expired_exports",
+        settings.EXPORT_PURGE_INTERVAL_SECONDS,
+        purge_expired_exports,
+    )
+    start_periodic_task(
+        "system_log_partitions",
+        settings.SYSTEM_LOG_MAINTENANCE_INTERVAL_SECONDS,
+        maintain_log_partitions,
+    )
+    if settings.SLOW_QUERY_ENABLED:
+        slow_query_recorder.install()
+        start_periodic_task(
+            "slow_query_flush",
+            settings.SLOW_QUERY_FLUSH_INTERVAL_SECONDS,
+            slow_query_recorder.flush,
+        )
+    if replica_set.replicas:
+        await replica_set.check_lag()
+        start_periodic_task(
+            "replica_lag_check",
+            settings.DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS,
+            replica_set.check_lag,
+        )
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down the application")
+    await stop_periodic_tasks()
+    await cancel_export_jobs()
+    await rate_limiter.sync()
+    await close_redis()
+    await slow_query_recorder.flush()
+    if settings.DB_LOG_ENABLED:
+        logging.getLogger().removeHandler(db_log_handler)
+        db_log_handler.close()
+    await async_engine.dispose()
+    await replica_set.dispose()
 
 @app.get("/api/health", tags=["Health"])
 async def health_check():
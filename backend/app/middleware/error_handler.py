@@ -3,7 +3,7 @@ from fastapi.responses import JSONResponse
 from sqlalchemy.exc import SQLAlchemyError
 from jose.exceptions import JWTError
 import logging
-import traceback
+import uuid
 
 logger = logging.getLogger(__name__)
 
@@ -12,23 +12,24 @@ async def error_handler(request: Request, exc: Exception) -> JSONResponse:
     Global error handler for the application.
     Handles different types of exceptions and returns appropriate responses.
     """
-    error_id = None
+    error_id = uuid.uuid4().hex
     status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
     detail = "An unexpected error occurred"
     
-    # Log the error with traceback
-    logger.error(f"Error handling request: {request.url.path}")
-    logger.error(f"Exception: {exc}")
-    logger.error(traceback.format_exc())
+    # Log the error with traceback as one record; the database log handler
+    # saves it to system_logs, where it can be found by error_id
+    logger.error(
+        f"Error handling request: {request.method} {request.url.path}: {type(exc).__name__}: {exc}",
+        exc_info=exc,
+        extra={"error_id": error_id, "request_id": getattr(request.state, "request_id", None)},
+    )
     
     # Handle different types of exceptions
     if isinstance(exc, SQLAlchemyError):
-        logger.error(f"Database error: {exc}")
         status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
         detail = "A database error occurred"
     
     elif isinstance(exc, JWTError):
-        logger.error(f"JWT error: {exc}")
         status_code = status.HTTP_401_UNAUTHORIZED
         detail = "Authentication error"
     
@@ -37,9 +38,6 @@ async def error_handler(request: Request, exc: Exception) -> JSONResponse:
         status_code = exc.status_code
         detail = exc.detail if hasattr(exc, "detail") else str(exc)
     
-    # Save the error to the system logs db if needed
-    # This would require a service that handles system logs
-    
     # Return a JSON response with the error details
     return JSONResponse(
         status_code=status_code,
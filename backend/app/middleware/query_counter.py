@@ -0,0 +1,50 @@
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import logging
+
+from app.core.config import settings
+from app.core.request_context import get_route
+from app.db.query_counter import QueryStats, install_query_counter, query_stats_var
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCountMiddleware:
+    """
+    Pure ASGI middleware that counts the SQL statements each request runs.
+
+    The count and the most repeated query shape are returned in the
+    X-Query-Count and X-Query-Repeats response headers, and requests that run
+    the same shape N_PLUS_ONE_THRESHOLD times or more are logged as likely N+1
+    patterns. Headers carry the count up to the start of the response, which
+    covers everything a handler does before returning.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        install_query_counter()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(parent=query_stats_var.get())
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-Query-Count"] = str(stats.count)
+                headers["X-Query-Repeats"] = str(stats.max_repeats)
+            await send(message)
+
+        token = query_stats_var.set(stats)
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            query_stats_var.reset(token)
+            for shape, count in stats.repeated(settings.N_PLUS_ONE_THRESHOLD):
+                logger.warning(
+                    f"Possible N+1 on {scope['method']} {get_route() or scope['path']}: "
+                    f"{count} of {stats.count} queries were: {shape}"
+                )
@@ -1,58 +1,128 @@
-from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
-import time
-from typing import Dict, Optional
-import redis
+from fastapi import status
+from fastapi.responses import JSONResponse
+from functools import lru_cache
+from jose import JWTError
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Optional, Tuple
 import logging
 
 from app.core.config import settings
-from app.db.session import redis_client
+from app.core.rate_limit import rate_limiter
+from app.core.request_context import route_var, user_id_var
+from app.core.security import decode_access_token
 
 logger = logging.getLogger(__name__)
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        client_ip = request.client.host if request.client else "unknown"
-        path = request.url.path
-        
-        # Different rate limits for different paths
-        if path.startswith("/api/auth"):
+AUTH_PATH_PREFIXES = ("/auth", "/api/auth")
+UNMATCHED_ROUTE = "<unmatched>"
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI middleware that applies the sliding window rate limits.
+
+    Also records the matched route template and user id in the request
+    context for code further down the stack.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._router = None
+        # Bounded so unmatched or id-bearing paths cannot grow memory
+        self._route_template = lru_cache(maxsize=4096)(self._match_route_template)
+
+    def _match_route_template(self, method: str, path: str) -> str:
+        """Return the path template of the route matching a request, e.g. /tools/{tool_id}."""
+        scope = {"type": "http", "method": method, "path": path, "root_path": ""}
+        partial = None
+        for route in self._router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+            if match == Match.PARTIAL and partial is None:
+                partial = route.path
+        return partial or UNMATCHED_ROUTE
+
+    @staticmethod
+    def _get_identity(headers: Headers) -> Tuple[Optional[str], Optional[str]]:
+        """Return (user_id, plan) from a valid bearer token, or (None, None)."""
+        authorization = headers.get("authorization", "")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None, None
+        try:
+            payload = decode_access_token(token)
+        except JWTError:
+            return None, None
+        return payload.get("sub"), payload.get("plan")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        if self._router is None:
+            self._router = scope["app"].router
+        route = self._route_template(scope["method"], scope["path"])
+        window = 60  # 1 minute in seconds
+
+        # Auth endpoints are limited per IP; everything else per user when
+        # authenticated, with the budget set by the user's plan
+        user_id, plan = (None, None)
+        if route.startswith(AUTH_PATH_PREFIXES):
             limit = settings.RATE_LIMIT_AUTH_PER_MINUTE
-            window = 60  # 1 minute in seconds
         else:
-            limit = settings.RATE_LIMIT_PER_MINUTE
-            window = 60  # 1 minute in seconds
-        
-        # Create a rate limit key specific to the IP and path
-        rate_limit_key = f"rate_limit:{client_ip}:{path}"
-        
-        # Check if rate limit is exceeded
-        current_count = 0
-        try:
-            current_count = redis_client.get(rate_limit_key)
-            if current_count is None:
-                redis_client.set(rate_limit_key, 1, ex=window)
+            user_id, plan = self._get_identity(Headers(scope=scope))
+            if user_id is None:
+                limit = settings.RATE_LIMIT_PER_MINUTE
             else:
-                current_count = int(current_count)
-                if current_count >= limit:
-                    logger.warning(f"Rate limit exceeded for IP: {client_ip}, path: {path}")
-                    return HTTPException(
-                        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                        detail="Too many requests",
-                        headers={"Retry-After": str(window)},
-                    )
-                
-                redis_client.incr(rate_limit_key)
-        except redis.RedisError as e:
-            # In case of Redis failure, log and continue
-            logger.error(f"Redis error in rate limiter: {e}")
-        
-        # Continue with the request
-        response = await call_next(request)
-        
+                limit = settings.RATE_LIMIT_PLAN_TIERS.get(
+                    plan or settings.RATE_LIMIT_DEFAULT_TIER,
+                    settings.RATE_LIMIT_PER_MINUTE,
+                )
+
+        # Key by the matched route template so path ids do not create new keys
+        if user_id is not None:
+            rate_limit_key = f"user:{user_id}:{route}"
+        else:
+            rate_limit_key = f"ip:{client_ip}:{route}"
+
+        # Check and count the request; falls back to a local-only limit
+        # while Redis is unavailable
+        result = await rate_limiter.hit(rate_limit_key, limit, window)
+
+        if not result.allowed:
+            logger.warning(f"Rate limit exceeded for {rate_limit_key}")
+            response = JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"detail": "Too many requests"},
+                headers={
+                    "Retry-After": str(result.reset_after),
+                    "X-RateLimit-Limit": str(result.limit),
+                    "X-RateLimit-Remaining": "0",
+                    "X-RateLimit-Reset": str(result.reset_after),
+                },
+            )
+            await response(scope, receive, send)
+            return
+
         # Add rate limit headers to the response
-        response.headers["X-RateLimit-Limit"] = str(limit)
-        response.headers["X-RateLimit-Remaining"] = str(max(0, limit - ((current_count or 0) + 1)))
-        response.headers["X-RateLimit-Reset"] = str(window)
-        
-        return response
\ No newline at end of file
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-RateLimit-Limit"] = str(result.limit)
+                headers["X-RateLimit-Remaining"] = str(result.remaining)
+                headers["X-RateLimit-Reset"] = str(result.reset_after)
+            await send(message)
+
+        # Continue with the request
+        route_token = route_var.set(route)
+        user_token = user_id_var.set(user_id)
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            route_var.reset(route_token)
+            user_id_var.reset(user_token)
@@ -0,0 +1,49 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import re
+import time
+import uuid
+
+from app.core.request_context import request_id_var
+
+# Incoming ids are echoed back, so only accept short, header-safe values
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI middleware that assigns a request id and times the request.
+
+    The id is taken from a well-formed X-Request-ID header or generated, stored
+    in the request context and returned in the X-Request-ID response header
+    together with X-Process-Time.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        request_id = Headers(scope=scope).get("x-request-id")
+        if not request_id or not REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = request_id
+                headers["X-Process-Time"] = str(time.perf_counter() - start_time)
+            await send(message)
+
+        # Also kept on request.state for the exception handlers, which run
+        # outside this middleware after the context has been reset
+        scope.setdefault("state", {})["request_id"] = request_id
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            request_id_var.reset(token)
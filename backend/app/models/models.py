@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, JSON, Table, Text, Float
+from sqlalchemy import Boolean, Column, DDL, ForeignKey, Integer, String, DateTime, JSON, Table, Text, Float, Index, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime, timedelta
@@ -11,11 +11,19 @@ user_roles = Table(
     Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
     Column('role_id', Integer, ForeignKey('roles.id'), primary_key=True),
-    Column('assigned_at', DateTime, default=func.now())
+    Column('assigned_at', DateTime, default=func.now()),
+    # Finds the users of a role; the primary key covers the other direction
+    Index('ix_user_roles_role_id_user_id', 'role_id', 'user_id'),
 )
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Admin user search: filters that walk the id order, and full-name search
+        Index("ix_users_is_active_id", "is_active", "id"),
+        Index("ix_users_created_at_id", "created_at", "id"),
+        Index("ix_users_full_name_fulltext", "full_name", mysql_prefix="FULLTEXT"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(255), unique=True, index=True, nullable=False)
@@ -23,10 +31,6 @@ class User(Base):
     full_name = Column(String(255))
     is_active = Column(Boolean, default=True)
     is_verified = Column(Boolean, default=False)
-    verification_token = Column(String(255))
-    verification_token_expires = Column(DateTime)
-    reset_password_token = Column(String(255))
-    reset_token_expires = Column(DateTime)
     stripe_customer_id = Column(String(255), unique=True, nullable=True)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -36,6 +40,7 @@ class User(Base):
     tool_usages = relationship("ToolUsage", back_populates="user")
     saved_progresses = relationship("SavedProgress", back_populates="user")
     refresh_tokens = relationship("RefreshToken", back_populates="user")
+    one_time_tokens = relationship("OneTimeToken", back_populates="user", cascade="all, delete-orphan")
     subscriptions = relationship("Subscription", back_populates="user")
 
     def has_role(self, role_name: str) -> bool:
@@ -100,7 +105,7 @@ class ToolUsage(Base):
     status = Column(String(20), default="STARTED", nullable=False)  # STARTED, IN_PROGRESS, COMPLETED, FAILED
     input_data = Column(JSON)
     result_data = Column(JSON)
-    started_at = Column(DateTime, default=func.now())
+    started_at = Column(DateTime, default=func.now(), index=True)
     completed_at = Column(DateTime)
 
     # Relationships
@@ -142,17 +147,68 @@ class RefreshToken(Base):
         return datetime.utcnow() > self.expires_at
 
 
+class OneTimeToken(Base):
+    __tablename__ = "one_time_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    purpose = Column(String(32), nullable=False)  # verify_email, reset_password
+    token_hash = Column(String(64), unique=True, nullable=False, index=True)  # SHA-256 hex digest
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=func.now())
+
+    # Relationships
+    user = relationship("User", back_populates="one_time_tokens")
+
+    @property
+    def is_expired(self) -> bool:
+        return datetime.utcnow() > self.expires_at
+
+
 class SystemLog(Base):
+    """
+    Application logs, range partitioned by day on MySQL (see
+    app.db.log_partitions). Partitioning needs created_at in the primary
+    key and rules out FULLTEXT indexes on message. The mapping keeps id as
+    the only primary key so the table can be created on any backend; the
+    MySQL DDL below and the migration widen it to (id, created_at).
+    """
     __tablename__ = "system_logs"
+    __table_args__ = (
+        # Filters of the log search, each walking created_at within a partition
+        Index("ix_system_logs_level_created_at", "level", "created_at"),
+        Index("ix_system_logs_source_created_at", "source", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    level = Column(String(10), nullable=False, index=True)
+    level = Column(String(10), nullable=False)
     message = Column(Text, nullable=False)
     source = Column(String(100))
-    created_at = Column(DateTime, default=func.now(), index=True)
+    created_at = Column(DateTime, nullable=False, default=func.now(), index=True)
     additional_data = Column(JSON)
 
 
+# Tables created outside the migrations get the partitioned layout too,
+# starting with a single catch-all partition the maintenance job splits
+# days off. ix_system_logs_id keeps id indexed for AUTO_INCREMENT once it
+# leaves the primary key.
+event.listen(
+    SystemLog.__table__,
+    "after_create",
+    DDL(
+        "ALTER TABLE system_logs DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)"
+    ).execute_if(dialect="mysql"),
+)
+event.listen(
+    SystemLog.__table__,
+    "after_create",
+    DDL(
+        "ALTER TABLE system_logs PARTITION BY RANGE (TO_DAYS(created_at)) "
+        "(PARTITION pmax VALUES LESS THAN MAXVALUE)"
+    ).execute_if(dialect="mysql"),
+)
+
+
 class SubscriptionPlan(Base):
     __tablename__ = "subscription_plans"
 
@@ -176,6 +232,9 @@ class SubscriptionPlan(Base):
 
 class Subscription(Base):
     __tablename__ = "subscriptions"
+    __table_args__ = (
+        Index("ix_subscriptions_plan_id_status_user_id", "plan_id", "status", "user_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -221,9 +280,28 @@ class Payment(Base):
     status = Column(String(50), default="pending")  # pending, succeeded, failed
     payment_method = Column(String(50))
     payment_details = Column(JSON, nullable=True)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=func.now(), index=True)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
     # Relationships
     user = relationship("User")
-    subscription = relationship("Subscription")
\ No newline at end of file
+    subscription = relationship("Subscription")
+
+class ToolUsageHourly(Base):
+    """Tool usages started per hour, tool and plan, filled by the usage aggregator."""
+    __tablename__ = "tool_usage_hourly"
+
+    bucket_start = Column(DateTime, primary_key=True)  # start of the hour, UTC
+    tool_id = Column(Integer, ForeignKey("tools.id", ondelete="CASCADE"), primary_key=True)
+    plan_id = Column(Integer, primary_key=True, default=0)  # 0 for users without a subscription
+    usage_count = Column(Integer, nullable=False, default=0)
+
+
+class AggregationWatermark(Base):
+    """Progress of a background aggregation through its source table."""
+    __tablename__ = "aggregation_watermarks"
+
+    name = Column(String(50), primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)  # highest source row id folded in
+    processed_until = Column(DateTime)  # rows started before this are all included
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, Field, validator
-from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, EmailStr, Field, validator, model_validator
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 import re
 
@@ -77,10 +77,16 @@ class User(UserInDBBase):
     roles: List[str] = []
     active_subscription: Optional[Dict[str, Any]] = None
     
+    @validator("roles", pre=True)
+    def role_names(cls, v):
+        """Return roles loaded from the ORM by name."""
+        return [getattr(role, "name", role) for role in v or []]
+    
     @validator("active_subscription", pre=True)
     def extract_subscription_info(cls, v, values, **kwargs):
         """Format subscription info for the response."""
-        if isinstance(v, Subscription):
+        # The ORM object; Subscription here is the response schema
+        if v is not None and not isinstance(v, (dict, Subscription)):
             return {
                 "id": v.id,
                 "plan_name": v.plan.name if v.plan else "Unknown",
@@ -104,4 +110,30 @@ class Role(BaseModel):
     description: Optional[str] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+# Admin user search and bulk operation filters
+class UserFilter(BaseModel):
+    email: Optional[str] = Field(None, min_length=1, max_length=255, description="Email prefix")
+    name: Optional[str] = Field(None, min_length=1, max_length=255, description="Words of the full name")
+    is_active: Optional[bool] = None
+    is_verified: Optional[bool] = None
+    role: Optional[str] = None
+    plan_id: Optional[int] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
+# Bulk admin operation on a list of ids or on every user matching a filter
+class BulkUserAction(BaseModel):
+    action: Literal["activate", "deactivate", "add_role", "remove_role"]
+    role: Optional[str] = None
+    user_ids: Optional[List[int]] = Field(None, min_length=1)
+    filter: Optional[UserFilter] = None
+
+    @model_validator(mode="after")
+    def check_target(self):
+        """Exactly one of user_ids and filter; role actions need a role."""
+        if (self.user_ids is None) == (self.filter is None):
+            raise ValueError("Provide either user_ids or filter")
+        if self.action in ("add_role", "remove_role") and not self.role:
+            raise ValueError(f"{self.action} needs a role")
+        return self
@@ -0,0 +1 @@
+# Helpers for the application's test suites
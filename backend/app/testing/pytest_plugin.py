@@ -0,0 +1,46 @@
+"""
+Pytest plugin with fixtures for the application's tests.
+
+Enable it from a conftest.py with:
+
+    pytest_plugins = ["app.testing.pytest_plugin"]
+"""
+
+from contextlib import contextmanager
+from typing import Callable, ContextManager, Iterator, Optional
+
+import pytest
+
+from app.db.query_counter import QueryStats, collect_queries
+
+
+@contextmanager
+def _query_budget(max_queries: int, max_repeats: Optional[int] = None) -> Iterator[QueryStats]:
+    # Counted through the request context, so requests must run in the
+    # test's own task, e.g. with httpx.AsyncClient and ASGITransport;
+    # TestClient runs the app on another thread and would count nothing
+    with collect_queries() as stats:
+        yield stats
+
+    problems = []
+    if stats.count > max_queries:
+        problems.append(f"{stats.count} queries, budget is {max_queries}")
+    if max_repeats is not None and stats.max_repeats > max_repeats:
+        problems.append(f"a query shape ran {stats.max_repeats} times, at most {max_repeats} allowed")
+    if problems:
+        shapes = "\n".join(f"  {count} x {shape}" for shape, count in stats.shapes.most_common())
+        pytest.fail(f"Query budget exceeded: {'; '.join(problems)}\n{shapes}", pytrace=False)
+
+
+@pytest.fixture
+def query_budget() -> Callable[..., ContextManager[QueryStats]]:
+    """
+    Assert how many statements a block may run, e.g.
+
+        with query_budget(max_queries=4, max_repeats=1):
+            await client.get("/tools/", headers=headers)
+
+    max_repeats bounds how often any single query shape may run, which is
+    what an N+1 regression trips first.
+    """
+    return _query_budget
@@ -0,0 +1 @@
+# Benchmarks for sizing and regression-checking hot paths of the backend
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Load test showing how request throughput scales with concurrency on one worker.
+
+Logs in against a running API, then hits a database-backed endpoint at
+increasing concurrency levels and reports throughput and latency for each.
+Run the server with a single worker (e.g. uvicorn app.main:app --workers 1)
+so the numbers are per worker. With blocking database calls throughput stays
+flat as concurrency grows; with the async engine it should keep rising until
+the database or the connection pool becomes the bottleneck. Raise the
+account's rate limit tier (RATE_LIMIT_PLAN_TIERS) first or most requests
+will be answered with 429.
+
+Usage:
+    python -m benchmarks.db_concurrency --email admin@example.com --password ...
+        [--base-url http://localhost:8000] [--path /users/me/stats] [--levels 1 4 16]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    """Return an access token for the given credentials."""
+    response = await client.post("/authlogin", data={"username": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_level(client: httpx.AsyncClient, path: str, headers: dict, concurrency: int, requests: int):
+    """Send requests with a fixed number in flight and return (req/s, latencies, errors)."""
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, headers=headers)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, latencies, errors
+
+
+async def main_async(args):
+    limits = httpx.Limits(max_connections=max(args.levels), max_keepalive_connections=max(args.levels))
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        token = await login(client, args.email, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        # Warm up connection pools on both sides
+        await run_level(client, args.path, headers, 4, 50)
+
+        print(f"{'concurrency':>11} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+        for concurrency in args.levels:
+            throughput, latencies, errors = await run_level(
+                client, args.path, headers, concurrency, args.requests
+            )
+            latencies.sort()
+            p50 = statistics.median(latencies) * 1000
+            p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+            print(f"{concurrency:>11} {throughput:>9.1f} {p50:>8.1f} {p95:>8.1f} {errors:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-worker throughput at increasing concurrency")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="API base URL")
+    parser.add_argument("--email", required=True, help="Account to log in with")
+    parser.add_argument("--password", required=True, help="Password of the account")
+    parser.add_argument("--path", default="/users/me/stats", help="Database-backed endpoint to load")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per concurrency level")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="Concurrency levels")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-request middleware overhead.
+
+Drives a minimal FastAPI app in-process over ASGI (no sockets) with three
+stacks: no middleware, the previous BaseHTTPMiddleware stack (process time
+and rate limiting), and the pure ASGI pipeline used by the application.
+The rate limiter's Redis call is replaced by a constant result so only the
+middleware itself is measured.
+
+Usage:
+    python -m benchmarks.middleware_overhead [--requests 20000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.rate_limit import RateLimitResult, rate_limiter
+from app.middleware.rate_limiter import RateLimitMiddleware
+from app.middleware.request_context import RequestContextMiddleware
+
+CORS_OPTIONS = {
+    "allow_origins": ["http://localhost:3000"],
+    "allow_credentials": True,
+    "allow_methods": ["*"],
+    "allow_headers": ["*"],
+}
+
+
+async def constant_hit(key, limit, window, cost=1):
+    return RateLimitResult(allowed=True, limit=limit, remaining=limit - 1, reset_after=60)
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        return {"id": item_id}
+
+    return app
+
+
+def baseline_app() -> FastAPI:
+    return build_app()
+
+
+def legacy_app() -> FastAPI:
+    """The stack before the ASGI rewrite: two BaseHTTPMiddleware layers."""
+    app = build_app()
+    limiter = RateLimitMiddleware(app.router)
+
+    async def rate_limit(request: Request, call_next):
+        if limiter._router is None:
+            limiter._router = request.app.router
+        route = limiter._route_template(request.method, request.url.path)
+        result = await rate_limiter.hit(f"ip:{request.client.host}:{route}", 60, 60)
+        response = await call_next(request)
+        response.headers["X-RateLimit-Limit"] = str(result.limit)
+        response.headers["X-RateLimit-Remaining"] = str(result.remaining)
+        response.headers["X-RateLimit-Reset"] = str(result.reset_after)
+        return response
+
+    async def process_time(request: Request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        response.headers["X-Process-Time"] = str(time.time() - start_time)
+        return response
+
+    app.add_middleware(CORSMiddleware, **CORS_OPTIONS)
+    app.add_middleware(BaseHTTPMiddleware, dispatch=rate_limit)
+    app.add_middleware(BaseHTTPMiddleware, dispatch=process_time)
+    return app
+
+
+def asgi_app() -> FastAPI:
+    """The current pipeline from app.main."""
+    app = build_app()
+    app.add_middleware(RateLimitMiddleware)
+    app.add_middleware(CORSMiddleware, **CORS_OPTIONS)
+    app.add_middleware(RequestContextMiddleware)
+    return app
+
+
+async def run(app: FastAPI, requests: int) -> float:
+    """Send requests through the app and return the mean time per request in microseconds."""
+
+    def make_channel():
+        """Return a receive/send pair that behaves like a server connection."""
+        sent = False
+        finished = asyncio.Event()
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # Like a server, report a disconnect once the response is complete
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished.set()
+
+        return receive, send
+
+    def scope(i):
+        return {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": f"/items/{i}",
+            "raw_path": f"/items/{i}".encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"host", b"bench")],
+            "client": ("127.0.0.1", 50000),
+            "server": ("bench", 80),
+        }
+
+    # Warm up caches and lazy router state
+    for i in range(200):
+        await app(scope(i), *make_channel())
+
+    start = time.perf_counter()
+    for i in range(requests):
+        await app(scope(i), *make_channel())
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-request middleware overhead")
+    parser.add_argument("--requests", type=int, default=20000, help="Requests per stack")
+    args = parser.parse_args()
+
+    rate_limiter.hit = constant_hit
+
+    baseline = asyncio.run(run(baseline_app(), args.requests))
+    legacy = asyncio.run(run(legacy_app(), args.requests))
+    current = asyncio.run(run(asgi_app(), args.requests))
+
+    print(f"No middleware:          {baseline:8.1f} us/request")
+    print(f"BaseHTTPMiddleware:     {legacy:8.1f} us/request (+{legacy - baseline:.1f} us)")
+    print(f"Pure ASGI pipeline:     {current:8.1f} us/request (+{current - baseline:.1f} us)")
+
+
+if __name__ == "__main__":
+    main()
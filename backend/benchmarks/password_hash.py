@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark password hashing throughput on this machine.
+
+Calibrates the hashing cost the same way the first worker does at startup,
+then reports hashes per second for one core and for the whole hash pool so
+login capacity per node can be sized.
+
+Usage:
+    python -m benchmarks.password_hash [--seconds 5] [--workers N] [--target-ms 250]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.security import calibrate_password_hashing, get_password_hash
+
+
+def hash_for(seconds: float) -> int:
+    """Hash passwords back to back for the given time and return the count."""
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        get_password_hash("benchmark-password")
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark password hashing throughput")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each measurement")
+    parser.add_argument("--workers", type=int, default=settings.PASSWORD_HASH_WORKERS, help="Hash pool size to measure")
+    parser.add_argument("--target-ms", type=float, default=settings.PASSWORD_HASH_TARGET_MS, help="Calibration target per hash")
+    args = parser.parse_args()
+
+    cost = calibrate_password_hashing(args.target_ms)
+    cores = os.cpu_count() or 1
+    print(f"Scheme: {cost['scheme']}, cost: {cost['rounds']}, ~{cost['measured_ms']} ms per hash")
+    print(f"CPU cores: {cores}, hash pool workers: {args.workers}")
+
+    single = hash_for(args.seconds) / args.seconds
+    print(f"Single thread: {single:.2f} hashes/s")
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        counts = list(executor.map(hash_for, [args.seconds] * args.workers))
+    total = sum(counts) / args.seconds
+    per_core = total / min(args.workers, cores)
+
+    print(f"Hash pool: {total:.2f} hashes/s ({per_core:.2f} hashes/s per core)")
+    print(f"Estimated login capacity: {total * 60:.0f} logins/min per node")
+
+
+if __name__ == "__main__":
+    main()
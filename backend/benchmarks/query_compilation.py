@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark Python CPU time of the hot per-request queries.
+
+Runs the statements from app.db.queries against an in-memory SQLite
+database, once rebuilt with select() on every call as the routes used to
+do, and once as the prebuilt statements with bound parameters. Both paths
+hit SQLAlchemy's compiled cache; the difference is statement construction
+and cache key generation, which the prebuilt statements only pay once.
+The "request" row runs the queries an authenticated call to a premium
+tool makes.
+
+Usage:
+    python -m benchmarks.query_compilation [--iterations 5000]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app.db.base_class import Base
+from app.db.queries import (
+    ACTIVE_TOOL_BY_ID,
+    PLAN_TOOL,
+    USAGE_COUNT_SINCE,
+    USER_BY_ID,
+    USER_LOAD_OPTIONS,
+)
+from app.models.models import PlanTool, Subscription, SubscriptionPlan, Tool, ToolUsage, User
+
+SINCE = datetime(2000, 1, 1)
+
+
+def seed(session: Session):
+    """Create one user with a subscription to a plan containing one premium tool."""
+    plan = SubscriptionPlan(name="Professional", price_monthly=10, price_yearly=100)
+    tool = Tool(name="Premium", is_premium=True)
+    user = User(email="bench@example.com", hashed_password="x", is_active=True)
+    session.add_all([plan, tool, user])
+    session.flush()
+    session.add_all([
+        PlanTool(plan_id=plan.id, tool_id=tool.id, usage_limit=100),
+        Subscription(user_id=user.id, plan_id=plan.id, status="active"),
+        ToolUsage(user_id=user.id, tool_id=tool.id, status="COMPLETED", started_at=datetime.utcnow()),
+    ])
+    session.commit()
+    return user.id, plan.id, tool.id
+
+
+def rebuilt_queries(user_id: int, plan_id: int, tool_id: int):
+    return {
+        "user by id": lambda session: session.execute(
+            select(User).options(*USER_LOAD_OPTIONS).where(User.id == user_id)
+        ).scalar_one(),
+        "active tool by id": lambda session: session.execute(
+            select(Tool).where(Tool.id == tool_id, Tool.is_active == True)
+        ).scalar_one(),
+        "plan tool": lambda session: session.execute(
+            select(PlanTool).where(PlanTool.plan_id == plan_id, PlanTool.tool_id == tool_id)
+        ).scalars().first(),
+        "monthly usage count": lambda session: session.scalar(
+            select(func.count(ToolUsage.id)).where(
+                ToolUsage.user_id == user_id,
+                ToolUsage.tool_id == tool_id,
+                ToolUsage.started_at >= SINCE,
+            )
+        ),
+    }
+
+
+def prebuilt_queries(user_id: int, plan_id: int, tool_id: int):
+    return {
+        "user by id": lambda session: session.execute(
+            USER_BY_ID, {"user_id": user_id}
+        ).scalar_one(),
+        "active tool by id": lambda session: session.execute(
+            ACTIVE_TOOL_BY_ID, {"tool_id": tool_id}
+        ).scalar_one(),
+        "plan tool": lambda session: session.execute(
+            PLAN_TOOL, {"plan_id": plan_id, "tool_id": tool_id}
+        ).scalars().first(),
+        "monthly usage count": lambda session: session.scalar(
+            USAGE_COUNT_SINCE, {"user_id": user_id, "tool_id": tool_id, "since": SINCE}
+        ),
+    }
+
+
+def measure(session: Session, query, iterations: int) -> float:
+    """Return the CPU time per call in microseconds."""
+    for _ in range(200):
+        query(session)
+    start = time.process_time()
+    for _ in range(iterations):
+        query(session)
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CPU time of the hot per-request queries")
+    parser.add_argument("--iterations", type=int, default=5000, help="Calls per query")
+    args = parser.parse_args()
+
+    # The whole schema is created, so a model that only builds on MySQL
+    # fails here rather than in development setups on other backends
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        ids = seed(session)
+        rebuilt = rebuilt_queries(*ids)
+        prebuilt = prebuilt_queries(*ids)
+
+        print(f"{'query':<22} {'rebuilt us':>11} {'prebuilt us':>12} {'saved':>7}")
+        total_rebuilt = total_prebuilt = 0.0
+        for name in rebuilt:
+            before = measure(session, rebuilt[name], args.iterations)
+            after = measure(session, prebuilt[name], args.iterations)
+            total_rebuilt += before
+            total_prebuilt += after
+            print(f"{name:<22} {before:>11.1f} {after:>12.1f} {1 - after / before:>7.0%}")
+        print(
+            f"{'request':<22} {total_rebuilt:>11.1f} {total_prebuilt:>12.1f} "
+            f"{1 - total_prebuilt / total_rebuilt:>7.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
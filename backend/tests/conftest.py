@@ -0,0 +1,82 @@
+import os
+
+# Settings are read at import time, so these must be set before the app is imported
+os.environ.setdefault("PASSWORD_HASH_CALIBRATE", "false")
+os.environ.setdefault("BCRYPT_MIN_ROUNDS", "4")
+os.environ.setdefault("QUERY_COUNT_ENABLED", "true")
+
+import fakeredis
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+
+import app.db.redis as app_redis
+import app.db.session as app_session
+from app.core.security import create_access_token
+from app.db.base_class import Base
+from app.main import app
+from app.models.models import PlanTool, Role, Subscription, SubscriptionPlan, Tool, User
+
+pytest_plugins = ["app.testing.pytest_plugin"]
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def seeded_db(tmp_path, monkeypatch):
+    """
+    SQLite database with an admin, a user subscribed to a plan, and a free
+    and two premium tools. Returns the ids of the admin and the user.
+    """
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        admin_role, user_role = Role(name="admin"), Role(name="user")
+        plan = SubscriptionPlan(name="Professional", price_monthly=10, price_yearly=100)
+        tools = [
+            Tool(name="Free tool", is_premium=False),
+            Tool(name="Premium tool", is_premium=True),
+            Tool(name="Checklist", is_premium=True),
+        ]
+        admin = User(email="admin@example.com", hashed_password="x", is_verified=True, roles=[admin_role])
+        user = User(email="user@example.com", hashed_password="x", is_verified=True, roles=[user_role])
+        db.add_all([plan, *tools, admin, user])
+        db.flush()
+        db.add_all([PlanTool(plan_id=plan.id, tool_id=tool.id) for tool in tools[1:]])
+        db.add(Subscription(user_id=user.id, plan_id=plan.id, status="active"))
+        db.commit()
+        ids = (admin.id, user.id)
+    engine.dispose()
+
+    async_engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://", 1))
+    monkeypatch.setattr(app_session, "async_engine", async_engine)
+    yield ids
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(app_redis, "redis_client", client)
+    return client
+
+
+@pytest.fixture
+async def client(seeded_db, fake_redis):
+    # Requests run in the test's task, so query budgets see their statements
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def auth_headers():
+    """Build the Authorization header of a user, with the plan claim set by login."""
+    def build(user_id: int, plan: str = None) -> dict:
+        return {"Authorization": f"Bearer {create_access_token(user_id, additional_data={'plan': plan})}"}
+    return build
@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy import select
+
+from app.core.admin_stats import COUNTERS_KEY
+from app.db.session import AsyncSessionLocal
+from app.models.models import Tool
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_counted_insert_updates_counters(seeded_db, fake_redis):
+    async with AsyncSessionLocal() as db:
+        db.add(Tool(name="New tool", is_premium=False))
+        await db.commit()
+    counters = await fake_redis.hgetall(COUNTERS_KEY)
+    assert counters["tools"] == "1"
+    assert "updated_at" in counters
+
+
+async def test_uncounted_write_publishes_nothing(seeded_db, fake_redis):
+    async with AsyncSessionLocal() as db:
+        tool = (await db.execute(select(Tool).limit(1))).scalar_one()
+        tool.description = "Updated"
+        await db.commit()
+    assert await fake_redis.hgetall(COUNTERS_KEY) == {}
+
+
+async def test_cancelled_out_changes_publish_nothing(seeded_db, fake_redis):
+    async with AsyncSessionLocal() as db:
+        tool = Tool(name="Short lived", is_premium=False)
+        db.add(tool)
+        await db.flush()
+        await db.delete(tool)
+        await db.commit()
+    assert await fake_redis.hgetall(COUNTERS_KEY) == {}
@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy import select
+
+from app.core import user_admin
+from app.db.session import AsyncSessionLocal
+from app.models.models import Role, User
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def users(seeded_db):
+    """The seeded admin and user plus a second admin and an inactive user."""
+    admin_id, user_id = seeded_db
+    async with AsyncSessionLocal() as db:
+        admin_role = (await db.execute(select(Role).where(Role.name == "admin"))).scalar_one()
+        other_admin = User(email="other-admin@example.com", hashed_password="x", roles=[admin_role])
+        inactive = User(email="inactive@example.com", hashed_password="x", is_active=False)
+        db.add_all([other_admin, inactive])
+        await db.commit()
+        return {"admin": admin_id, "user": user_id, "other_admin": other_admin.id, "inactive": inactive.id}
+
+
+async def _bulk(client, auth_headers, admin_id, **operation):
+    return await client.post("/admin/users/bulk", json=operation, headers=auth_headers(admin_id))
+
+
+def _statuses(response):
+    assert response.status_code == 200
+    return {result["id"]: result["status"] for result in response.json()["results"]}
+
+
+async def test_deactivate_applies_the_protection_rules(client, users, auth_headers, monkeypatch):
+    # Chunks of two still produce one result per id, in request order
+    monkeypatch.setattr(user_admin.settings, "ADMIN_BULK_CHUNK_SIZE", 2)
+    ids = [users["admin"], users["other_admin"], users["user"], users["inactive"], 999]
+    response = await _bulk(client, auth_headers, users["admin"], action="deactivate", user_ids=ids)
+    assert [result["id"] for result in response.json()["results"]] == ids
+    assert _statuses(response) == {
+        users["admin"]: "forbidden",
+        users["other_admin"]: "forbidden",
+        users["user"]: "updated",
+        users["inactive"]: "unchanged",
+        999: "not_found",
+    }
+    assert response.json()["summary"] == {"forbidden": 2, "updated": 1, "unchanged": 1, "not_found": 1}
+
+    async with AsyncSessionLocal() as db:
+        assert (await db.get(User, users["user"])).is_active is False
+        assert (await db.get(User, users["other_admin"])).is_active is True
+
+
+async def test_role_changes(client, users, auth_headers):
+    ids = [users["user"], users["other_admin"]]
+    response = await _bulk(client, auth_headers, users["admin"], action="add_role", role="admin", user_ids=ids)
+    assert _statuses(response) == {users["user"]: "updated", users["other_admin"]: "unchanged"}
+
+    response = await _bulk(
+        client, auth_headers, users["admin"],
+        action="remove_role", role="admin", user_ids=[users["admin"], users["user"]],
+    )
+    assert _statuses(response) == {users["admin"]: "forbidden", users["user"]: "updated"}
+
+
+async def test_unknown_role_is_refused(client, users, auth_headers):
+    response = await _bulk(
+        client, auth_headers, users["admin"], action="add_role", role="missing", user_ids=[users["user"]]
+    )
+    assert response.status_code == 400
+
+
+async def test_filter_selects_the_targets(client, users, auth_headers):
+    response = await _bulk(
+        client, auth_headers, users["admin"], action="activate", filter={"is_active": False}
+    )
+    assert _statuses(response) == {users["inactive"]: "updated"}
+
+
+async def test_selection_over_the_limit_is_refused(client, users, auth_headers, monkeypatch):
+    monkeypatch.setattr(user_admin.settings, "ADMIN_BULK_MAX_USERS", 3)
+    response = await _bulk(client, auth_headers, users["admin"], action="activate", filter={"email": "o"})
+    assert response.status_code == 200
+    response = await _bulk(client, auth_headers, users["admin"], action="activate", filter={})
+    assert response.status_code == 400
+
+
+async def test_needs_ids_or_a_filter(client, users, auth_headers):
+    response = await _bulk(client, auth_headers, users["admin"], action="activate")
+    assert response.status_code == 422
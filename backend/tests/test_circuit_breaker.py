@@ -0,0 +1,120 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import redis
+
+from app.core import circuit_breaker
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.rate_limit import SlidingWindowRateLimiter
+from app.db import redis as app_redis
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(circuit_breaker, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def _open(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow_request()
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=10)
+    breaker.record_failure()
+    breaker.record_success()
+    _open(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    assert breaker.stats()["rejected_calls"] == 1
+
+
+def test_single_probe_after_reset_timeout(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10)
+    _open(breaker)
+    clock.now += 10
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one call probes the dependency at a time
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=10)
+    _open(breaker)
+    clock.now += 10
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    assert breaker.stats()["times_opened"] == 2
+
+
+def test_abandoned_or_stale_probe_allows_another(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10)
+    _open(breaker)
+    clock.now += 10
+    assert breaker.allow_request()
+    breaker.abandon_probe()
+    assert breaker.allow_request()
+
+    # A probe never resolved stops blocking after another reset_timeout
+    assert not breaker.allow_request()
+    clock.now += 10
+    assert breaker.allow_request()
+
+
+@pytest.mark.anyio
+async def test_cancelled_call_releases_the_probe(fake_redis, clock, monkeypatch):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10)
+    monkeypatch.setattr(app_redis, "redis_breaker", breaker)
+    _open(breaker)
+    clock.now += 10
+
+    task = asyncio.create_task(app_redis.redis_call(asyncio.sleep, 10))
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert await app_redis.redis_call(fake_redis.ping)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.anyio
+async def test_rate_limiter_counts_locally_while_the_circuit_is_open(fake_redis, clock, monkeypatch):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10)
+    monkeypatch.setattr(app_redis, "redis_breaker", breaker)
+    _open(breaker)
+    limiter = SlidingWindowRateLimiter(prefix="test_rate_limit")
+    limiter.local_enabled = False
+    limiter.degraded_workers = 2
+
+    # The limit is split across workers while each counts on its own
+    results = [await limiter.hit("k", 4, 60) for _ in range(3)]
+    assert [result.allowed for result in results] == [True, True, False]
+    assert limiter.degraded_hits == 3
+    assert await fake_redis.keys("test_rate_limit:*") == []
+
+
+@pytest.mark.anyio
+async def test_redis_errors_trip_the_breaker(clock, monkeypatch):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10)
+    monkeypatch.setattr(app_redis, "redis_breaker", breaker)
+
+    async def failing():
+        raise redis.ConnectionError("connection refused")
+
+    for _ in range(2):
+        with pytest.raises(redis.ConnectionError):
+            await app_redis.redis_call(failing)
+    with pytest.raises(app_redis.RedisUnavailableError):
+        await app_redis.redis_call(failing)
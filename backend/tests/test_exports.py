@@ -0,0 +1,91 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from app.core import exports
+from app.core.exports import CsvEncoder, NdjsonEncoder, check_format, export_stream
+
+pytestmark = pytest.mark.anyio
+
+
+def test_empty_csv_export_still_has_its_header():
+    encoder = CsvEncoder(["id", "email"])
+    assert encoder.encode([]) == b"id,email\r\n"
+    assert encoder.finish() == b""
+
+    encoder = CsvEncoder(["id", "email"])
+    assert encoder.finish() == b"id,email\r\n"
+
+
+def test_ndjson_writes_one_object_per_row():
+    encoder = NdjsonEncoder(["id", "email"])
+    data = encoder.encode([(1, "a@example.com"), (2, None)])
+    assert [json.loads(line) for line in data.decode().splitlines()] == [
+        {"id": 1, "email": "a@example.com"},
+        {"id": 2, "email": None},
+    ]
+
+
+def test_parquet_cannot_be_gzipped():
+    assert check_format("parquet", compress=True) is not None
+    assert check_format("csv", compress=True) is None
+
+
+async def _export(dataset, fmt, compress=False) -> bytes:
+    return b"".join([chunk async for chunk in export_stream(dataset, fmt, compress)])
+
+
+async def test_gzip_export_is_one_gzip_stream_of_the_plain_export(seeded_db, monkeypatch):
+    # Several chunks, so the compressor is fed more than once
+    monkeypatch.setattr(exports.settings, "EXPORT_CHUNK_SIZE", 1)
+    plain = await _export("users", "csv")
+    compressed = await _export("users", "csv", compress=True)
+    assert compressed[:2] == b"\x1f\x8b"
+    assert gzip.decompress(compressed) == plain
+
+    rows = list(csv.reader(io.StringIO(plain.decode())))
+    assert rows[0][:2] == ["id", "email"]
+    assert sorted(row[1] for row in rows[1:]) == ["admin@example.com", "user@example.com"]
+    # Secrets never leave the database
+    assert "hashed_password" not in rows[0]
+
+
+async def test_empty_dataset_exports_a_header(seeded_db):
+    data = await _export("payments", "csv")
+    assert data.decode().splitlines() == [
+        "id,user_id,subscription_id,stripe_payment_id,amount,currency,status,payment_method,created_at"
+    ]
+
+
+async def test_streamed_export_endpoint(client, seeded_db, auth_headers):
+    admin_id, _ = seeded_db
+    response = await client.get(
+        "/admin/exports/users", params={"format": "ndjson", "gzip": True}, headers=auth_headers(admin_id)
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"].endswith('.ndjson.gz"')
+    assert len(gzip.decompress(response.content).splitlines()) == 2
+
+
+async def test_export_job_writes_a_file_to_download(client, seeded_db, auth_headers, tmp_path, monkeypatch):
+    export_dir = tmp_path / "exports"
+    monkeypatch.setattr(exports.settings, "EXPORT_DIR", str(export_dir))
+    headers = auth_headers(seeded_db[0])
+    response = await client.post("/admin/exports/tool_usage/jobs", headers=headers)
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+
+    await asyncio.gather(*exports._running_jobs.values())
+    job = (await client.get(f"/admin/exports/jobs/{job_id}", headers=headers)).json()
+    assert job["status"] == "completed"
+
+    response = await client.get(job["download_url"], headers=headers)
+    assert response.status_code == 200
+    assert response.text.startswith("id,user_id,tool_id")
+    # Only the finished file is left behind
+    assert [path.suffix for path in export_dir.iterdir()] == [".csv"]
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core import leaderboards
+from app.db.session import AsyncSessionLocal
+from app.models.models import ToolUsage
+
+pytestmark = pytest.mark.anyio
+
+
+async def _add_usages(user_id: int, tool_ids, started_at: datetime) -> None:
+    async with AsyncSessionLocal() as db:
+        db.add_all([ToolUsage(user_id=user_id, tool_id=tool_id, started_at=started_at) for tool_id in tool_ids])
+        await db.commit()
+
+
+async def test_reconcile_rebuilds_boards_from_a_replica(seeded_db, fake_redis, monkeypatch):
+    admin_id, user_id = seeded_db
+    await _add_usages(user_id, [1, 2, 2], datetime.utcnow())
+    await _add_usages(admin_id, [2], datetime.utcnow() - timedelta(days=400))
+    await fake_redis.flushall()
+
+    chosen = []
+    monkeypatch.setattr(leaderboards.replica_set, "choose", lambda: chosen.append(True))
+    await leaderboards.reconcile()
+    assert chosen == [True]
+
+    month = datetime.utcnow().strftime("%Y-%m")
+    assert await leaderboards.read_leaderboard("tools", None, 10) == [(2, 3), (1, 1)]
+    assert await leaderboards.read_leaderboard("tools", month, 10) == [(2, 2), (1, 1)]
+    assert await leaderboards.read_leaderboard("users", month, 1) == [(user_id, 3)]
+
+
+async def test_committed_usages_update_the_boards(seeded_db, fake_redis):
+    _, user_id = seeded_db
+    await leaderboards.reconcile()
+    await _add_usages(user_id, [3, 3], datetime.utcnow())
+    assert await leaderboards.read_leaderboard("tools", None, 1) == [(3, 2)]
+
+
+async def test_missing_month_board_is_not_served(seeded_db, fake_redis):
+    await leaderboards.reconcile()
+    assert await leaderboards.read_leaderboard("tools", "2001-01", 10) is None
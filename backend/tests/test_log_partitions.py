@@ -0,0 +1,78 @@
+from datetime import date, datetime, timedelta
+import importlib.util
+import os
+
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+import pytest
+from sqlalchemy import create_engine, inspect, select, text
+
+from app.db import log_partitions
+from app.db import session as app_session
+from app.db.log_partitions import maintain_partitions, partition_definition, partition_name, to_days
+from app.db.session import AsyncSessionLocal
+from app.models.models import SystemLog
+
+MIGRATION = os.path.join(
+    os.path.dirname(__file__), os.pardir, "alembic", "versions", "system_logs_partitioning.py"
+)
+
+
+def test_to_days_matches_mysql():
+    # SELECT TO_DAYS('2000-01-01') is 730485
+    assert to_days(date(2000, 1, 1)) == 730485
+    assert to_days(date(2026, 10, 19)) - to_days(date(2026, 10, 18)) == 1
+
+
+def test_partition_holds_its_day():
+    day = date(2026, 10, 19)
+    assert partition_name(day) == "p20261019"
+    assert partition_definition(day) == f"PARTITION p20261019 VALUES LESS THAN ({to_days(date(2026, 10, 20))})"
+
+
+@pytest.mark.anyio
+async def test_retention_deletes_expired_rows_of_an_unpartitioned_table(seeded_db, fake_redis, monkeypatch):
+    monkeypatch.setattr(log_partitions, "async_engine", app_session.async_engine)
+    monkeypatch.setattr(log_partitions.settings, "SYSTEM_LOG_RETENTION_DAYS", 7)
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        db.add_all([
+            SystemLog(level="ERROR", message="old", created_at=now - timedelta(days=8)),
+            SystemLog(level="ERROR", message="kept", created_at=now - timedelta(days=6)),
+            SystemLog(level="ERROR", message="new", created_at=now),
+        ])
+        await db.commit()
+
+    await maintain_partitions()
+    async with AsyncSessionLocal() as db:
+        messages = (await db.execute(select(SystemLog.message).order_by(SystemLog.id))).scalars().all()
+    assert messages == ["kept", "new"]
+
+    # Held by the first run, so a second worker does nothing
+    assert await fake_redis.exists(log_partitions.MAINTENANCE_LOCK_KEY)
+
+
+def test_migration_replaces_the_level_index_of_the_init_schema(tmp_path):
+    spec = importlib.util.spec_from_file_location("system_logs_partitioning", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'migration.db'}")
+    with engine.begin() as conn:
+        # system_logs as created by database/init/01-schema.sql before partitioning
+        conn.execute(text(
+            "CREATE TABLE system_logs (id INTEGER PRIMARY KEY, level VARCHAR(10) NOT NULL, "
+            "message TEXT NOT NULL, source VARCHAR(100), created_at DATETIME, additional_data JSON)"
+        ))
+        conn.execute(text("CREATE INDEX idx_level ON system_logs (level)"))
+        conn.execute(text("CREATE INDEX idx_created_at ON system_logs (created_at)"))
+
+        with Operations.context(MigrationContext.configure(conn)):
+            migration.upgrade()
+            assert {index["name"] for index in inspect(conn).get_indexes("system_logs")} == {
+                "idx_created_at", "ix_system_logs_level_created_at", "ix_system_logs_source_created_at",
+            }
+            migration.downgrade()
+        assert {index["name"] for index in inspect(conn).get_indexes("system_logs")} == {
+            "idx_created_at", "ix_system_logs_level",
+        }
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+
+from fastapi import HTTPException
+import pytest
+
+from app.core import security
+from app.core.login_throttle import get_lockout_remaining, record_failed_login, reset_failed_logins
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def throttle_settings(monkeypatch):
+    settings = security.settings
+    monkeypatch.setattr(settings, "LOGIN_MAX_FAILURES_PER_ACCOUNT", 3)
+    monkeypatch.setattr(settings, "LOGIN_MAX_FAILURES_PER_IP", 100)
+    monkeypatch.setattr(settings, "LOGIN_LOCKOUT_BASE_SECONDS", 30)
+    monkeypatch.setattr(settings, "LOGIN_LOCKOUT_MAX_SECONDS", 100)
+    return settings
+
+
+async def _fail(times: int, account: str = "User@Example.com", ip: str = "10.0.0.1") -> None:
+    for _ in range(times):
+        await record_failed_login(account, ip)
+
+
+async def test_account_is_locked_out_after_max_failures(fake_redis, throttle_settings):
+    await _fail(2)
+    assert await get_lockout_remaining("user@example.com", "10.0.0.2") == 0
+    await _fail(1)
+    # The account is locked from any address, whatever the case of the email
+    assert 0 < await get_lockout_remaining("USER@example.com", "10.0.0.2") <= 30
+
+
+async def test_consecutive_lockouts_double_up_to_the_cap(fake_redis, throttle_settings):
+    durations = []
+    for _ in range(4):
+        await _fail(3)
+        durations.append(await fake_redis.ttl("login:lock:account:user@example.com"))
+        await fake_redis.delete("login:lock:account:user@example.com")
+    assert durations == [30, 60, 100, 100]
+
+
+async def test_successful_login_resets_the_account_but_not_the_ip(fake_redis, throttle_settings):
+    throttle_settings.LOGIN_MAX_FAILURES_PER_IP = 4
+    await _fail(2)
+    await reset_failed_logins("user@example.com")
+    await _fail(2)
+    assert await fake_redis.exists("login:lock:account:user@example.com") == 0
+    # The IP still counts all four failures
+    assert await get_lockout_remaining("other@example.com", "10.0.0.1") > 0
+
+
+async def test_hash_slot_is_held_until_the_pool_finishes(monkeypatch):
+    monkeypatch.setattr(security.settings, "PASSWORD_HASH_WORKERS", 1)
+    monkeypatch.setattr(security.settings, "PASSWORD_HASH_QUEUE_MAX", 0)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_hash():
+        started.set()
+        release.wait(5)
+
+    task = asyncio.create_task(security._run_in_hash_pool(slow_hash))
+    await asyncio.to_thread(started.wait, 5)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    # The caller gave up but bcrypt is still running, so the pool stays full
+    assert security.get_hash_pool_stats()["in_flight"] == 1
+    with pytest.raises(HTTPException) as shed:
+        await security._run_in_hash_pool(slow_hash)
+    assert shed.value.status_code == 503
+
+    release.set()
+    for _ in range(100):
+        if security.get_hash_pool_stats()["in_flight"] == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert security.get_hash_pool_stats()["in_flight"] == 0
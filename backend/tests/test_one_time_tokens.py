@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core.security import consume_one_time_token, hash_one_time_token, store_one_time_token
+from app.db.session import AsyncSessionLocal
+from app.models.models import OneTimeToken, User
+
+pytestmark = pytest.mark.anyio
+
+
+async def _store(user_id: int, token: str, expires_in: timedelta, purpose: str = "reset_password") -> None:
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_id)
+        await store_one_time_token(db, user, purpose, token, datetime.utcnow() + expires_in)
+        await db.commit()
+
+
+async def _consume(token: str, purpose: str = "reset_password"):
+    async with AsyncSessionLocal() as db:
+        user = await consume_one_time_token(db, token, purpose)
+        await db.commit()
+        return user
+
+
+async def test_token_is_stored_hashed(seeded_db):
+    _, user_id = seeded_db
+    await _store(user_id, "secret-token", timedelta(hours=1))
+    async with AsyncSessionLocal() as db:
+        stored = (await db.execute(select(OneTimeToken.token_hash))).scalar_one()
+    assert stored == hash_one_time_token("secret-token")
+    assert "secret-token" not in stored
+
+
+async def test_token_can_only_be_used_once(seeded_db):
+    _, user_id = seeded_db
+    await _store(user_id, "secret-token", timedelta(hours=1))
+    user = await _consume("secret-token")
+    assert user is not None and user.id == user_id
+    assert await _consume("secret-token") is None
+
+
+async def test_expired_token_is_refused(seeded_db):
+    _, user_id = seeded_db
+    await _store(user_id, "secret-token", timedelta(seconds=-1))
+    assert await _consume("secret-token") is None
+
+
+async def test_token_is_bound_to_its_purpose(seeded_db):
+    _, user_id = seeded_db
+    await _store(user_id, "secret-token", timedelta(hours=1), purpose="verify_email")
+    assert await _consume("secret-token", purpose="reset_password") is None
+    assert await _consume("secret-token", purpose="verify_email") is not None
+
+
+async def test_new_token_replaces_outstanding_one(seeded_db):
+    _, user_id = seeded_db
+    await _store(user_id, "first-token", timedelta(hours=1))
+    await _store(user_id, "second-token", timedelta(hours=1))
+    assert await _consume("first-token") is None
+    async with AsyncSessionLocal() as db:
+        assert await db.scalar(select(func.count(OneTimeToken.id))) == 1
+    assert await _consume("second-token") is not None
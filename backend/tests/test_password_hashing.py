@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from app.core import security
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def hashing(monkeypatch):
+    """Calibrate against a fixed 2 ms per hash at cost 4 and restore the context afterwards."""
+    saved_context, saved_cost = security.pwd_context.to_dict(), dict(security.hash_cost)
+    calibrations = []
+
+    def time_hash(context, samples=3):
+        calibrations.append(context)
+        return 2.0
+
+    monkeypatch.setattr(security, "_time_hash", time_hash)
+    monkeypatch.setattr(security.settings, "PASSWORD_HASH_SCHEME", "bcrypt")
+    monkeypatch.setattr(security.settings, "BCRYPT_MIN_ROUNDS", 4)
+    monkeypatch.setattr(security.settings, "PASSWORD_HASH_TARGET_MS", 16)
+    yield calibrations
+    security.pwd_context.load(saved_context)
+    security.hash_cost.clear()
+    security.hash_cost.update(saved_cost)
+
+
+async def test_first_worker_calibrates_and_stores_the_cost(fake_redis, hashing):
+    cost = await security.configure_password_hashing()
+    assert cost["rounds"] == 7
+    assert len(hashing) == 1
+    stored = json.loads(await fake_redis.get("password_hash:cost:v1:bcrypt:16"))
+    assert stored["rounds"] == 7
+    assert await fake_redis.ttl("password_hash:cost:v1:bcrypt:16") == -1
+
+
+async def test_other_workers_reuse_the_stored_cost(fake_redis, hashing):
+    await fake_redis.set(
+        "password_hash:cost:v1:bcrypt:16",
+        json.dumps({"scheme": "bcrypt", "rounds": 5, "measured_ms": 4.0}),
+    )
+    cost = await security.configure_password_hashing()
+    assert cost["rounds"] == 5
+    assert hashing == []
+    assert security.pwd_context.hash("password").startswith("$2b$05$")
+
+
+async def test_new_calibration_version_recalibrates(fake_redis, hashing, monkeypatch):
+    await security.configure_password_hashing()
+    monkeypatch.setattr(security.settings, "PASSWORD_HASH_CALIBRATION_VERSION", "2")
+    await security.configure_password_hashing()
+    assert len(hashing) == 2
+    assert await fake_redis.exists("password_hash:cost:v2:bcrypt:16")
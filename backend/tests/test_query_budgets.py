@@ -0,0 +1,81 @@
+"""
+Query budgets of the hot endpoints. Authentication accounts for four
+statements: the user and eager loads of roles, subscriptions and plans.
+Raise a budget only together with the change that needs it.
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from app.core.admin_stats import admin_stats
+from app.db.session import AsyncSessionLocal
+from app.models.models import Tool
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_list_tools(client, seeded_db, auth_headers, query_budget):
+    _, user_id = seeded_db
+    # Tools, this month's usage counts by tool and the plan's tools, however many tools
+    with query_budget(max_queries=7, max_repeats=1):
+        response = await client.get("/tools/", headers=auth_headers(user_id, "Professional"))
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+
+
+async def test_read_current_user(client, seeded_db, auth_headers, query_budget):
+    _, user_id = seeded_db
+    with query_budget(max_queries=4, max_repeats=1):
+        response = await client.get("/users/me", headers=auth_headers(user_id))
+    assert response.status_code == 200
+    assert response.json()["roles"] == ["user"]
+    assert response.json()["active_subscription"]["plan_name"] == "Professional"
+
+
+async def test_admin_stats_from_database(client, seeded_db, auth_headers, query_budget):
+    admin_id, _ = seeded_db
+    # Without a snapshot the totals are counted from the database
+    with query_budget(max_queries=7, max_repeats=1):
+        response = await client.get("/admin/stats", headers=auth_headers(admin_id))
+    assert response.status_code == 200
+    assert response.json()["totalUsers"] == 2
+
+
+async def test_admin_stats_from_snapshot(client, seeded_db, auth_headers, query_budget):
+    admin_id, _ = seeded_db
+    await admin_stats.reconcile()
+    # The snapshot is served from Redis; only authentication touches the database
+    with query_budget(max_queries=4, max_repeats=1):
+        response = await client.get("/admin/stats", headers=auth_headers(admin_id))
+    assert response.status_code == 200
+    assert response.json()["totalTools"] == 3
+
+
+async def test_budget_exceeded_fails(seeded_db, query_budget):
+    with pytest.raises(pytest.fail.Exception, match="Query budget exceeded"):
+        with query_budget(max_queries=1):
+            async with AsyncSessionLocal() as db:
+                await db.execute(select(Tool))
+                await db.execute(select(Tool))
+
+
+async def test_budget_ignores_other_tasks(seeded_db, query_budget):
+    started = asyncio.Event()
+
+    async def background_job():
+        # Stands in for a periodic task running while a request is measured
+        async with AsyncSessionLocal() as db:
+            started.set()
+            for _ in range(5):
+                await db.execute(select(Tool))
+                await asyncio.sleep(0)
+
+    job = asyncio.create_task(background_job())
+    await started.wait()
+    with query_budget(max_queries=1) as stats:
+        async with AsyncSessionLocal() as db:
+            await db.execute(select(Tool))
+        await job
+    assert stats.count == 1
@@ -0,0 +1,139 @@
+from types import SimpleNamespace
+import asyncio
+
+import pytest
+
+from app.core import rate_limit
+from app.core.rate_limit import SlidingWindowRateLimiter
+
+pytestmark = pytest.mark.anyio
+
+WINDOW = 60
+# A quarter of the way into a window
+START = 1_000_035.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=START)
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def _limiter(local_enabled: bool) -> SlidingWindowRateLimiter:
+    limiter = SlidingWindowRateLimiter(prefix="test_rate_limit")
+    limiter.local_enabled = local_enabled
+    limiter.error_bound = 0.1
+    limiter.sync_interval = 1.0
+    return limiter
+
+
+async def _redis_count(fake_redis, limiter, key: str, now: float) -> int:
+    current_key, _ = limiter.window_keys(key, WINDOW, int(now // WINDOW))
+    return int(await fake_redis.get(current_key) or 0)
+
+
+async def test_local_tier_admits_at_most_its_allowance_between_syncs(fake_redis, clock):
+    limiter = _limiter(local_enabled=True)
+    assert (await limiter.hit("k", 100, WINDOW)).allowed  # exact, seeds the local state
+
+    for _ in range(30):
+        assert (await limiter.hit("k", 100, WINDOW)).allowed
+    # 10 hits (error_bound * limit) locally, the rest through the exact path
+    assert limiter.local_hits == 10
+    assert limiter.redis_hits == 21
+    assert await _redis_count(fake_redis, limiter, "k", clock.now) == 21
+
+
+async def test_sync_flushes_pending_hits_and_refills_the_budget(fake_redis, clock):
+    limiter = _limiter(local_enabled=True)
+    await limiter.hit("k", 100, WINDOW)
+    for _ in range(10):
+        await limiter.hit("k", 100, WINDOW)
+    assert limiter._states["k"].local_budget == 0
+
+    await limiter.sync()
+    state = limiter._states["k"]
+    assert state.pending == 0
+    assert state.current == 11
+    assert state.local_budget == 10
+    assert await _redis_count(fake_redis, limiter, "k", clock.now) == 11
+
+    await limiter.hit("k", 100, WINDOW)
+    assert limiter.local_hits == 11
+
+
+async def test_limit_change_resets_the_local_state(fake_redis, clock):
+    limiter = _limiter(local_enabled=True)
+    await limiter.hit("k", 100, WINDOW)
+    for _ in range(5):
+        await limiter.hit("k", 100, WINDOW)
+
+    # A plan change goes through the exact path and rebuilds the state
+    clock.now += WINDOW
+    await limiter.hit("k", 200, WINDOW)
+    state = limiter._states["k"]
+    assert (state.limit, state.window_index, state.pending) == (200, int(clock.now // WINDOW), 0)
+
+    # The hits admitted locally under the old limit still reach Redis
+    await limiter.sync()
+    assert await _redis_count(fake_redis, limiter, "k", START) == 6
+
+
+async def test_window_rollover_parks_pending_hits_until_sync(fake_redis, clock):
+    limiter = _limiter(local_enabled=True)
+    await limiter.hit("k", 100, WINDOW)
+    for _ in range(3):
+        await limiter.hit("k", 100, WINDOW)
+
+    clock.now += WINDOW
+    await limiter.hit("k", 100, WINDOW)
+    assert limiter._unflushed == {("k", WINDOW, int(START // WINDOW)): 3}
+
+    await limiter.sync()
+    assert limiter._unflushed == {}
+    assert await _redis_count(fake_redis, limiter, "k", START) == 4
+
+
+async def test_exact_limit_counts_only_allowed_hits(fake_redis, clock):
+    limiter = _limiter(local_enabled=False)
+    results = [await limiter.hit("k", 3, WINDOW) for _ in range(5)]
+    assert [result.allowed for result in results] == [True, True, True, False, False]
+    assert [result.remaining for result in results[:3]] == [2, 1, 0]
+    assert await _redis_count(fake_redis, limiter, "k", clock.now) == 3
+
+
+async def test_concurrent_hits_never_exceed_the_limit(fake_redis, clock):
+    limiter = _limiter(local_enabled=False)
+    results = await asyncio.gather(*(limiter.hit("k", 5, WINDOW) for _ in range(20)))
+    assert sum(result.allowed for result in results) == 5
+    assert await _redis_count(fake_redis, limiter, "k", clock.now) == 5
+
+
+async def test_retry_after_is_when_the_previous_window_has_decayed(fake_redis, clock):
+    limiter = _limiter(local_enabled=False)
+    for _ in range(2):
+        await limiter.hit("k", 2, WINDOW)
+
+    # A quarter into the next window the previous 2 hits still weigh 1.5
+    clock.now += WINDOW
+    denied = await limiter.hit("k", 2, WINDOW)
+    assert not denied.allowed
+    # One hit fits once their weight drops to 1, (0.75 - 0.5) * 60 = 15 seconds later
+    assert denied.reset_after == 15
+
+    clock.now += 14
+    assert not (await limiter.hit("k", 2, WINDOW)).allowed
+    clock.now += 1
+    assert (await limiter.hit("k", 2, WINDOW)).allowed
+
+
+async def test_denied_request_gets_retry_after_header(client, monkeypatch):
+    monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_PER_MINUTE", 2)
+    monkeypatch.setattr(rate_limit.rate_limiter, "local_enabled", False)
+    for _ in range(2):
+        assert (await client.get("/api/health")).status_code != 429
+    response = await client.get("/api/health")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    assert response.headers["X-RateLimit-Remaining"] == "0"
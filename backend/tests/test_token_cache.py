@@ -0,0 +1,40 @@
+import time
+
+from app.core.token_cache import TokenCache
+
+
+def test_cached_claims_are_returned_until_the_token_expires(monkeypatch):
+    cache = TokenCache(max_size=10)
+    now = time.time()
+    cache.set("token", {"sub": "1", "exp": now + 60})
+    assert cache.get("token") == {"sub": "1", "exp": now + 60}
+
+    monkeypatch.setattr("app.core.token_cache.time.time", lambda: now + 60)
+    assert cache.get("token") is None
+    assert cache.stats()["size"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TokenCache(max_size=2)
+    exp = time.time() + 60
+    cache.set("a", {"sub": "a", "exp": exp})
+    cache.set("b", {"sub": "b", "exp": exp})
+    cache.get("a")
+    cache.set("c", {"sub": "c", "exp": exp})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_raw_token_is_not_kept():
+    cache = TokenCache(max_size=10)
+    cache.set("secret-token", {"sub": "1", "exp": time.time() + 60})
+    assert "secret-token" not in cache._entries
+
+
+def test_zero_size_disables_the_cache():
+    cache = TokenCache(max_size=0)
+    cache.set("token", {"sub": "1", "exp": time.time() + 60})
+    assert cache.get("token") is None
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.core import usage_analytics
+from app.core.usage_analytics import WATERMARK_NAME, aggregate_usage, bucket_floor, usage_series
+from app.db.session import AsyncSessionLocal
+from app.models.models import AggregationWatermark, ToolUsage, ToolUsageHourly
+
+pytestmark = pytest.mark.anyio
+
+HOUR = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=3)
+
+
+def test_bucket_floor():
+    value = datetime(2026, 10, 22, 13, 45, 10)  # a Thursday
+    assert bucket_floor(value, "hour") == datetime(2026, 10, 22, 13)
+    assert bucket_floor(value, "day") == datetime(2026, 10, 22)
+    assert bucket_floor(value, "week") == datetime(2026, 10, 19)
+
+
+async def _add_usages(*usages) -> None:
+    async with AsyncSessionLocal() as db:
+        db.add_all([
+            ToolUsage(user_id=user_id, tool_id=tool_id, started_at=started_at)
+            for user_id, tool_id, started_at in usages
+        ])
+        await db.commit()
+
+
+async def _rollups():
+    async with AsyncSessionLocal() as db:
+        rollups = (await db.execute(select(ToolUsageHourly))).scalars().all()
+        watermark = await db.get(AggregationWatermark, WATERMARK_NAME)
+    return {(r.bucket_start, r.tool_id, r.plan_id): r.usage_count for r in rollups}, watermark
+
+
+async def test_rollup_counts_settled_usages_once_per_plan(seeded_db, fake_redis, monkeypatch):
+    admin_id, user_id = seeded_db
+    monkeypatch.setattr(usage_analytics.settings, "USAGE_AGGREGATE_BATCH_SIZE", 2)
+    await _add_usages(
+        (user_id, 1, HOUR + timedelta(minutes=5)),
+        (user_id, 1, HOUR + timedelta(minutes=50)),
+        (admin_id, 1, HOUR + timedelta(minutes=55)),
+        (user_id, 2, HOUR + timedelta(hours=1, minutes=1)),
+        (user_id, 2, HOUR + timedelta(hours=1, minutes=2)),
+    )
+
+    await aggregate_usage()
+    await aggregate_usage()
+    rollups, watermark = await _rollups()
+    # The subscribed user counts towards plan 1, the admin towards no plan
+    assert rollups == {
+        (HOUR, 1, 1): 2,
+        (HOUR, 1, 0): 1,
+        (HOUR + timedelta(hours=1), 2, 1): 2,
+    }
+    assert watermark.last_id == 5
+
+
+async def test_watermark_stops_at_unsettled_usages(seeded_db, fake_redis):
+    _, user_id = seeded_db
+    recent = datetime.utcnow()
+    await _add_usages((user_id, 1, HOUR), (user_id, 1, recent), (user_id, 1, HOUR + timedelta(minutes=1)))
+
+    await aggregate_usage()
+    rollups, watermark = await _rollups()
+    # The recent usage may have neighbours still committing, so nothing past it is folded
+    assert rollups == {(HOUR, 1, 1): 1}
+    assert watermark.last_id == 1
+    assert watermark.processed_until == recent
+
+
+async def test_series_reads_the_rollup(seeded_db, fake_redis):
+    _, user_id = seeded_db
+    await _add_usages((user_id, 1, HOUR), (user_id, 2, HOUR + timedelta(hours=1)))
+    await aggregate_usage()
+
+    async with AsyncSessionLocal() as db:
+        series = await usage_series(db, HOUR - timedelta(hours=1), HOUR + timedelta(hours=2), "hour", plan_id=1)
+    assert [point["count"] for point in series["series"]] == [0, 1, 1]
+    assert series["total"] == 2
+    assert series["processedUntil"] is not None
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+import pytest
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.db.session import AsyncSessionLocal
+from app.models.models import User
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def many_users(seeded_db):
+    created = datetime.utcnow() - timedelta(days=10)
+    async with AsyncSessionLocal() as db:
+        db.add_all([
+            User(
+                email=f"member{number:02d}@example.com",
+                hashed_password="x",
+                is_active=number % 3 != 0,
+                created_at=created + timedelta(hours=number),
+            )
+            for number in range(1, 13)
+        ])
+        await db.commit()
+    return seeded_db
+
+
+async def _pages(client, headers, params):
+    items, pages, cursor = [], 0, None
+    while True:
+        response = await client.get(
+            "/admin/users/search", params={**params, **({"cursor": cursor} if cursor else {})}, headers=headers
+        )
+        assert response.status_code == 200
+        body = response.json()
+        items.extend(body["items"])
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return items, pages
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(["2026-10-19T00:00:00", 42])
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 2) == ["2026-10-19T00:00:00", 42]
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", encode_cursor([1]), encode_cursor({"id": 1})])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, 2)
+    assert error.value.status_code == 400
+
+
+async def test_pages_cover_every_user_once_newest_first(client, many_users, auth_headers):
+    admin_id, _ = many_users
+    items, pages = await _pages(client, auth_headers(admin_id), {"limit": 5})
+    ids = [item["id"] for item in items]
+    assert pages == 3
+    assert len(ids) == 14
+    assert ids == sorted(ids, reverse=True)
+
+
+async def test_email_prefix_pages_in_email_order(client, many_users, auth_headers):
+    admin_id, _ = many_users
+    items, _ = await _pages(client, auth_headers(admin_id), {"email": "member", "is_active": True, "limit": 3})
+    emails = [item["email"] for item in items]
+    assert emails == sorted(emails)
+    assert len(emails) == 8
+    assert all(item["is_active"] for item in items)
+
+
+async def test_invalid_cursor_is_a_bad_request(client, many_users, auth_headers):
+    admin_id, _ = many_users
+    response = await client.get(
+        "/admin/users/search", params={"cursor": "garbage"}, headers=auth_headers(admin_id)
+    )
+    assert response.status_code == 400
@@ -7,13 +7,13 @@ CREATE TABLE IF NOT EXISTS users (
     full_name VARCHAR(255),
     is_active BOOLEAN DEFAULT true,
     is_verified BOOLEAN DEFAULT false,
-    verification_token VARCHAR(255),
-    verification_token_expires DATETIME,
-    reset_password_token VARCHAR(255),
-    reset_token_expires DATETIME,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    INDEX idx_user_email (email)
+    INDEX idx_user_email (email),
+    -- Admin user search: filters that walk the id order, and full-name search
+    INDEX ix_users_is_active_id (is_active, id),
+    INDEX ix_users_created_at_id (created_at, id),
+    FULLTEXT INDEX ix_users_full_name_fulltext (full_name)
 );
 
 -- Roles table
@@ -30,6 +30,7 @@ CREATE TABLE IF NOT EXISTS user_roles (
     role_id INT NOT NULL,
     assigned_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     PRIMARY KEY (user_id, role_id),
+    INDEX ix_user_roles_role_id_user_id (role_id, user_id),
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     FOREIGN KEY (role_id) REFERENCES roles(id) ON DELETE CASCADE
 );
@@ -57,7 +58,26 @@ CREATE TABLE IF NOT EXISTS tool_usage (
     completed_at DATETIME,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     FOREIGN KEY (tool_id) REFERENCES tools(id) ON DELETE CASCADE,
-    INDEX idx_user_tool (user_id, tool_id)
+    INDEX idx_user_tool (user_id, tool_id),
+    INDEX ix_tool_usage_started_at (started_at)
+);
+
+-- Tool usages started per hour, tool and plan, filled by the usage aggregator
+CREATE TABLE IF NOT EXISTS tool_usage_hourly (
+    bucket_start DATETIME NOT NULL, -- start of the hour, UTC
+    tool_id INT NOT NULL,
+    plan_id INT NOT NULL DEFAULT 0, -- 0 for users without a subscription
+    usage_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket_start, tool_id, plan_id),
+    FOREIGN KEY (tool_id) REFERENCES tools(id) ON DELETE CASCADE
+);
+
+-- Progress of background aggregations through their source tables
+CREATE TABLE IF NOT EXISTS aggregation_watermarks (
+    name VARCHAR(50) NOT NULL PRIMARY KEY,
+    last_id INT NOT NULL DEFAULT 0,
+    processed_until DATETIME,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
 
 -- Saved form progress table
@@ -87,14 +107,36 @@ CREATE TABLE IF NOT EXISTS refresh_tokens (
     INDEX idx_user_id (user_id)
 );
 
--- System logs
-CREATE TABLE IF NOT EXISTS system_logs (
+-- One-time verification and password reset tokens (SHA-256 digests only)
+CREATE TABLE IF NOT EXISTS one_time_tokens (
     id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    purpose VARCHAR(32) NOT NULL, -- verify_email, reset_password
+    token_hash CHAR(64) NOT NULL,
+    expires_at DATETIME NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    UNIQUE KEY idx_token_hash (token_hash),
+    INDEX idx_user_id (user_id),
+    INDEX idx_expires_at (expires_at)
+);
+
+-- System logs, range partitioned by day. The maintenance job splits daily
+-- partitions off pmax and drops them after the retention period; every
+-- unique key must include created_at, and FULLTEXT is not available.
+CREATE TABLE IF NOT EXISTS system_logs (
+    id INT AUTO_INCREMENT,
     level VARCHAR(10) NOT NULL,
     message TEXT NOT NULL,
     source VARCHAR(100),
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     additional_data JSON,
-    INDEX idx_level (level),
-    INDEX idx_created_at (created_at)
-);
\ No newline at end of file
+    PRIMARY KEY (id, created_at),
+    INDEX ix_system_logs_id (id),
+    INDEX ix_system_logs_created_at (created_at),
+    INDEX ix_system_logs_level_created_at (level, created_at),
+    INDEX ix_system_logs_source_created_at (source, created_at)
+)
+PARTITION BY RANGE (TO_DAYS(created_at)) (
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);